@@ -0,0 +1,190 @@
+import random
+import datetime as dt
+from datetime import datetime
+
+class SyntheticVoiceState:
+    """
+    Stand-in for discord.VoiceState
+    """
+
+    def __init__(self, channel, self_deaf=False, deaf=False, afk=False):
+        self.channel = channel
+        self.self_deaf = self_deaf
+        self.deaf = deaf
+        self.afk = afk
+
+
+class SyntheticPermissions:
+    """
+    Stand-in for discord.Permissions
+    """
+
+    def __init__(self, administrator):
+        self.administrator = administrator
+
+
+class SyntheticMember:
+    """
+    Stand-in for discord.Member with the attributes the commands and Fire use
+    """
+
+    def __init__(self, guild, memberId, name, administrator=False):
+        self.guild = guild
+        self.id = memberId
+        self.name = name
+        self.display_name = name
+        self.mention = '<@!{0}>'.format(memberId)
+        self.avatar_url = 'https://cdn.discordapp.com/embed/avatars/0.png'
+        self.guild_permissions = SyntheticPermissions(administrator)
+        self.voice = None
+
+    def __str__(self):
+        return self.name + '#0001'
+
+
+class SyntheticVoiceChannel:
+    """
+    Stand-in for discord.VoiceChannel
+    """
+
+    def __init__(self, channelId, name):
+        self.id = channelId
+        self.name = name
+        self.members = []
+
+
+class SyntheticGuild:
+    """
+    Stand-in for discord.Guild with generated members, voice channels and history
+
+    Attributes
+    __________
+    id (int): The guild id
+    name (str): The guild name
+    members (list(SyntheticMember)): All members, the first one is an admin
+    voice_channels (list(SyntheticVoiceChannel)): The voice channels
+    owner (SyntheticMember): The admin member, used to start and complete bets
+
+    Functions
+    __________
+    get_member(memberId) -> SyntheticMember
+        The member with the id (None if there is none)
+    voiceMinutes() -> dict: { discord.member.id(str): int }
+        One minute for every member in voice, the input of Fire.incrementTimes
+    populate(db, days, bets, seed)
+        Writes days of history, points and bets for the guild to a storage backend
+    """
+
+    def __init__(self, guildId, members, voiceChannels, inVoice=0.2, seed=0):
+        """
+        Parameters
+        ----------
+        guildId : int
+        members : int
+            Number of members to generate
+        voiceChannels : int
+            Number of voice channels to generate
+        inVoice : float
+            Share of the members sitting in a voice channel
+        seed : int
+            Seed for the random generator so runs can be compared
+        """
+
+        rng = random.Random(seed)
+
+        self.id = guildId
+        self.name = 'Synthetic Guild {0}'.format(guildId)
+        self.icon_url = 'https://cdn.discordapp.com/embed/avatars/0.png'
+        self.members = [
+            SyntheticMember(self, guildId * 1000000 + i, 'member{0}'.format(i), administrator=(i == 0))
+            for i in range(members)
+        ]
+        self.voice_channels = [SyntheticVoiceChannel(guildId * 1000 + i, 'voice{0}'.format(i)) for i in range(voiceChannels)]
+        self.owner = self.members[0]
+        self.__members = {member.id: member for member in self.members}
+
+        if self.voice_channels:
+            for member in rng.sample(self.members, int(len(self.members) * inVoice)):
+                channel = rng.choice(self.voice_channels)
+                member.voice = SyntheticVoiceState(channel, self_deaf=rng.random() < 0.1)
+                channel.members.append(member)
+
+    def get_member(self, memberId):
+        return self.__members.get(int(memberId))
+
+    def voiceMinutes(self):
+        return {
+            str(member.id): 1
+            for channel in self.voice_channels
+            for member in channel.members
+            if not member.voice.self_deaf and not member.voice.afk and not member.voice.deaf
+        }
+
+    def populate(self, db, days, bets, seed=0):
+        """
+        Writes days of history, points and bets for the guild to a storage backend
+
+        The documents have the layout Fire reads (*total*, *dayIndex* with its day
+        documents, *discordPoints* and the *bets* index with a document per bet);
+        *userStats* is left out so Fire builds it on the first load like it does for
+        an existing guild
+
+        Parameters
+        ----------
+        db : StorageBackend
+        days : int
+            Number of days of history, ending today
+        bets : int
+            Number of open bets, each with a third of the members betting on it
+        seed : int
+            Seed for the random generator so runs can be compared
+        """
+
+        rng = random.Random(seed)
+        collection = db.collection(str(self.id))
+        today = datetime.today() - dt.timedelta(hours=6)
+        totals = {}
+        dayKeys = []
+
+        for i in range(days):
+            dayKey = (today - dt.timedelta(days=i)).strftime('%Y-%m-%d')
+            users = {}
+
+            for member in rng.sample(self.members, max(1, len(self.members) // 4)):
+                users[str(member.id)] = rng.randint(1, 600)
+                totals[str(member.id)] = totals.get(str(member.id), 0) + users[str(member.id)]
+
+            collection.document('dayIndex').collection('days').document(dayKey).set(users)
+            dayKeys.append(dayKey)
+
+        collection.document('total').set({'users': totals})
+        collection.document('dayIndex').set({'days': dayKeys})
+        collection.document('discordPoints').set({str(member.id): rng.randint(100, 100000) for member in self.members})
+
+        bets_ref = collection.document('bets')
+        active = {}
+        for betId in range(1, bets + 1):
+            options = {'option{0}'.format(i): 0 for i in range(1, 4)}
+            acceptedBy = {}
+
+            for member in rng.sample(self.members, max(1, len(self.members) // 3)):
+                option = rng.choice(sorted(options))
+                amount = rng.randint(1, 1000)
+                options[option] += amount
+                acceptedBy[str(member.id)] = {'betOption': option, 'amount': amount}
+
+            bet = {
+                'acceptedBy': acceptedBy,
+                'options': options,
+                'betTitle': 'Synthetic bet {0}'.format(betId),
+                'startedAt': today.strftime('%m/%d/%Y'),
+                'startedBy': self.owner.id,
+                'completed': False,
+                'winningOption': '',
+                'closed': False,
+                'betId': betId,
+            }
+            bets_ref.collection('active').document(str(betId)).set(bet)
+            active[str(betId)] = {key: bet[key] for key in ('betId', 'betTitle', 'startedBy', 'closed')}
+
+        bets_ref.set({'numBets': bets, 'active': active})
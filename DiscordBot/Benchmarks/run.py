@@ -0,0 +1,212 @@
+"""
+Offline benchmarks for Fire and the command renderers
+
+Runs against a synthetic guild stored in Storage.MemoryFirestore (or, with --backend sqlite,
+in a temporary Storage.SqliteBackend file), so no Discord server or Firebase project is
+needed. Run from the DiscordBot directory:
+
+    python -m Benchmarks.run --members 5000 --days 90 --bets 50
+    python -m Benchmarks.run --backend sqlite
+    python -m Benchmarks.run --compare Benchmarks/results/<earlier run>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from Fire import Fire
+from Storage.MemoryFirestore import MemoryFirestore
+from Storage.SqliteBackend import SqliteBackend
+from Commands.TimeLogger import TimeLogger
+from Commands.DiscordPoints import DiscordPoints
+from Commands.DiscordBets import DiscordBets
+from Benchmarks.SyntheticGuild import SyntheticGuild
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+async def runBenchmarks(members, voiceChannels, days, bets, repeat, seed, backend='memory'):
+    """
+    Times every benchmark case against a freshly generated guild
+
+    Parameters
+    ----------
+    members : int
+    voiceChannels : int
+    days : int
+    bets : int
+    repeat : int
+        Number of warm calls per case (after one cold call)
+    seed : int
+    backend : str
+        'memory' or 'sqlite'
+
+    Returns
+    ----------
+    dict: { case name: dict of timings in seconds and document reads / writes }
+    """
+
+    if backend == 'sqlite':
+        with tempfile.TemporaryDirectory() as directory:
+            return await runCases(SqliteBackend(os.path.join(directory, 'benchmark.sqlite3')),
+                                  members, voiceChannels, days, bets, repeat, seed)
+
+    return await runCases(MemoryFirestore(), members, voiceChannels, days, bets, repeat, seed)
+
+
+async def runCases(db, members, voiceChannels, days, bets, repeat, seed):
+    """
+    Times every benchmark case against a guild generated in db (closed when done)
+    """
+
+    guild = SyntheticGuild(1, members, voiceChannels, seed=seed)
+    guild.populate(db, days, bets, seed=seed)
+
+    fire = Fire(db)
+    io = {'read': 0, 'write': 0}
+    fire.ioListeners.append(lambda kind, path, size: io.__setitem__(kind, io[kind] + 1))
+
+    timeLogger = TimeLogger(fire)
+    discordPoints = DiscordPoints(fire)
+    discordBets = DiscordBets(fire)
+    user = guild.members[len(guild.members) // 2]
+
+    # Renderers with a render cache are timed twice: emptying the cache before every call
+    # (what the renderer itself costs) and as '(cached)' with the cache left in place
+    cases = [
+        ('Fire.incrementTimes', lambda i: fire.incrementTimes(guild, guild.voiceMinutes()), repeat, None),
+        ('TimeLogger.getTotalLogEmbed', lambda i: timeLogger.getTotalLogEmbed(1 + i % 5, guild), repeat, timeLogger.renderCache),
+        ('TimeLogger.getWeekLogEmbed', lambda i: timeLogger.getWeekLogEmbed(1 + i % 5, guild), repeat, timeLogger.renderCache),
+        ('TimeLogger.getMyLogEmbed', lambda i: timeLogger.getMyLogEmbed(guild, user), repeat, None),
+        ('DiscordPoints.getDiscordPointsEmbed', lambda i: discordPoints.getDiscordPointsEmbed(1 + i % 5, guild), repeat, discordPoints.renderCache),
+        ('DiscordBets.getAllActiveBets', lambda i: discordBets.getAllActiveBets(guild), repeat, discordBets.renderCache),
+        # Every call completes a different bet
+        ('Fire.postCompleteBet', lambda i: fire.postCompleteBet(guild, guild.owner, str(i + 1), '1'), min(repeat, bets - 1), None),
+    ]
+
+    results = {}
+
+    for name, call, warmCalls, renderCache in cases:
+        runs = [(name, renderCache)]
+        if renderCache != None:
+            runs.append((name + ' (cached)', None))
+
+        for runName, uncached in runs:
+            io['read'] = io['write'] = 0
+            timings = []
+
+            for i in range(warmCalls + 1):
+                if uncached != None:
+                    uncached.invalidate(guild.id)
+
+                start = time.perf_counter()
+                await call(i)
+                timings.append(time.perf_counter() - start)
+
+            results[runName] = summarize(timings, io['read'], io['write'])
+
+    await fire.close()
+
+    return results
+
+
+def summarize(timings, reads, writes):
+    """
+    Summary of the timings of one case: the first (cold) call separately from the rest
+
+    Returns
+    ----------
+    dict
+    """
+
+    cold, warm = timings[0], sorted(timings[1:]) or [timings[0]]
+
+    return {
+        'cold': cold,
+        'calls': len(timings),
+        'min': warm[0],
+        'median': statistics.median(warm),
+        'mean': statistics.mean(warm),
+        'p95': warm[min(len(warm) - 1, int(len(warm) * 0.95))],
+        'max': warm[-1],
+        'reads': reads,
+        'writes': writes,
+    }
+
+
+def compare(previous, current):
+    """
+    Prints how the median of every case changed since an earlier run
+    """
+
+    print('\n{0:<46} {1:>12} {2:>12} {3:>8}'.format('case', 'before (ms)', 'now (ms)', 'change'))
+
+    for name, result in current['results'].items():
+        before = previous['results'].get(name)
+        if before == None:
+            continue
+
+        change = result['median'] / before['median'] if before['median'] > 0 else float('inf')
+        print('{0:<46} {1:>12.3f} {2:>12.3f} {3:>7.2f}x'.format(name, before['median'] * 1000, result['median'] * 1000, change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for Fire and the command renderers')
+    parser.add_argument('--members', type=int, default=2000, help='members in the synthetic guild')
+    parser.add_argument('--voice-channels', type=int, default=10, help='voice channels in the synthetic guild')
+    parser.add_argument('--days', type=int, default=60, help='days of time history')
+    parser.add_argument('--bets', type=int, default=30, help='open bets')
+    parser.add_argument('--repeat', type=int, default=20, help='warm calls per case')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic data')
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory', help='storage backend to run against')
+    parser.add_argument('--output', help='JSON file for the results (default: Benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare the medians against')
+    args = parser.parse_args()
+
+    if args.members < 1 or args.bets < 2:
+        parser.error('--members must be at least 1 and --bets at least 2')
+
+    results = asyncio.run(runBenchmarks(args.members, args.voice_channels, args.days, args.bets, args.repeat, args.seed, args.backend))
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'members': args.members,
+            'voiceChannels': args.voice_channels,
+            'days': args.days,
+            'bets': args.bets,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'backend': args.backend,
+        },
+        'results': results,
+    }
+
+    print('{0:<46} {1:>10} {2:>12} {3:>10} {4:>7} {5:>7}'.format('case', 'cold (ms)', 'median (ms)', 'p95 (ms)', 'reads', 'writes'))
+    for name, result in results.items():
+        print('{0:<46} {1:>10.3f} {2:>12.3f} {3:>10.3f} {4:>7} {5:>7}'.format(
+            name, result['cold'] * 1000, result['median'] * 1000, result['p95'] * 1000, result['reads'], result['writes']))
+
+    output = args.output
+    if output == None:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        output = os.path.join(RESULTS_DIRECTORY, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print('\nSaved results to ' + output)
+
+    if args.compare != None:
+        with open(args.compare) as f:
+            compare(json.load(f), run)
+
+
+if __name__ == '__main__':
+    main()
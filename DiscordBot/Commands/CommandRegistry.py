@@ -0,0 +1,152 @@
+import time
+from .utils import getUsageEmbed, getMissingPermissionsEmbed
+from Storage.Accounting import currentActivity
+
+class Command:
+    """
+    A command that can be dispatched by the CommandRegistry
+
+    Attributes
+    __________
+    name (str): The command including its prefix (e.g. '-totallog')
+    handler (coroutine function): async handler(message, args)
+    aliases (tuple(str)): Other names that run the same command
+    usage (str): Usage string shown when the arguments do not match argCounts
+    description (str): Short description of the command
+    category (str): Section of the help message the command belongs to
+    maxArgs (int): Arguments after the first maxArgs - 1 are kept as one string (-1 for no limit)
+    argCounts (tuple(int)): Accepted numbers of arguments (None to accept any)
+    adminOnly (bool): Whether only server admins may run the command
+    calls (int): Number of times the command was dispatched
+    totalTime (float): Seconds spent in the handler over all calls
+    maxTime (float): Seconds spent in the slowest call
+    """
+
+    def __init__(self, name, handler, aliases=(), usage=None, description="", category="Misc.",
+                 maxArgs=-1, argCounts=None, adminOnly=False):
+        self.name = name
+        self.handler = handler
+        self.aliases = tuple(aliases)
+        self.usage = usage
+        self.description = description
+        self.category = category
+        self.maxArgs = maxArgs
+        self.argCounts = argCounts
+        self.adminOnly = adminOnly
+        self.calls = 0
+        self.totalTime = 0.0
+        self.maxTime = 0.0
+
+    def parseArgs(self, content):
+        """
+        Split the message content into the arguments after the command name
+
+        Parameters
+        ----------
+        content : str
+            The full message content
+
+        Returns
+        ----------
+        list(str)
+        """
+
+        return content.split(" ", self.maxArgs)[1:]
+
+
+class CommandRegistry:
+    """
+    Resolves a message to its command with one dict lookup on the first token
+
+    Attributes
+    __________
+    prefix (str): Character every command starts with
+    listeners (list): Functions called as listener(command, seconds) after every dispatch
+
+    Functions
+    __________
+    register(name, handler, **metadata) -> Command
+        Registers a command and its aliases
+    resolve(content) -> Command, args(list(str))
+        Finds the command for a message (None if there is no such command)
+    async dispatch(message) -> bool
+        Runs the command for the message, returns whether a command was found
+    commands() -> list(Command)
+        All registered commands (without aliases) in registration order
+    """
+
+    def __init__(self, prefix='-'):
+        self.prefix = prefix
+        self.listeners = []
+        self.__commands = {}
+        self.__ordered = []
+
+    def register(self, name, handler, **metadata):
+        """
+        Registers a command and its aliases
+
+        Parameters
+        ----------
+        name : str
+            The command including its prefix
+        handler : coroutine function
+            async handler(message, args)
+        **metadata
+            Any of the optional Command attributes (aliases, usage, description, ...)
+
+        Returns
+        ----------
+        Command
+        """
+
+        command = Command(name, handler, **metadata)
+
+        for key in (name,) + command.aliases:
+            if key in self.__commands:
+                raise ValueError("Command already registered: " + key)
+            self.__commands[key] = command
+
+        self.__ordered.append(command)
+        return command
+
+    def resolve(self, content):
+        if not content.startswith(self.prefix):
+            return None, []
+
+        command = self.__commands.get(content.split(" ", 1)[0])
+        if command == None:
+            return None, []
+
+        return command, command.parseArgs(content)
+
+    async def dispatch(self, message):
+        command, args = self.resolve(message.content)
+
+        if command == None:
+            return False
+
+        start = time.perf_counter()
+        # Database calls made by the handler are charged to the command
+        activity = currentActivity.set(command.name)
+
+        try:
+            if command.adminOnly and not message.author.guild_permissions.administrator:
+                await message.channel.send(embed=getMissingPermissionsEmbed("Oops.. you have to be an admin to use this command"))
+            elif command.argCounts != None and len(args) not in command.argCounts:
+                await message.channel.send(embed=getUsageEmbed(command.usage))
+            else:
+                await command.handler(message, args)
+        finally:
+            currentActivity.reset(activity)
+            elapsed = time.perf_counter() - start
+            command.calls += 1
+            command.totalTime += elapsed
+            command.maxTime = max(command.maxTime, elapsed)
+
+            for listener in self.listeners:
+                listener(command, elapsed)
+
+        return True
+
+    def commands(self):
+        return list(self.__ordered)
@@ -1,9 +1,10 @@
 import discord
-import itertools
+import heapq
 import re
 
 from datetime import datetime
 from .utils import *
+from .RenderCache import RenderCache
 
 class DiscordBets:
     """
@@ -12,6 +13,8 @@ class DiscordBets:
     Attributes
     __________
     fire (Fire obj): The fire instance where information is fetched/updated
+    renderCache (RenderCache obj): Rendered bet embeds, dropped whenever the bets change
+    maxWinnersShown (int): Number of winners listed when a bet is completed (the rest are counted)
 
     Functions
     __________
@@ -34,17 +37,20 @@ class DiscordBets:
         Adds a bet using the information from messageString (expected: [BetId] [Option Number] [Amount]).
         Returns the bet embed with the updated information or an error/usage embed
 
-    def getAllActiveBets(guild) -> (discord.Embed)
+    async def getAllActiveBets(guild) -> (discord.Embed)
         Gets all of the active (open/closed) bets within the guild
     
-    def showBetForUser(self, guild, user) -> (discord.Embed)
+    async def showBetForUser(self, guild, user) -> (discord.Embed)
         Gets all of the active bets for the user
 
     """
     fire = None
+    renderCache = None
+    maxWinnersShown = 20
 
     def __init__(self, fire):
         self.fire = fire
+        self.renderCache = RenderCache(fire)
 
     async def createBet(self, guild, user, messageString):
         messageAndOptions = re.findall("\[(.*?)\]", messageString)
@@ -66,7 +72,7 @@ class DiscordBets:
             now = datetime.now()
             betStartedAt = now.strftime("%H:%M on %m/%d/%Y")
 
-            betId = self.fire.postNewBet(guild, user.id, betTitle, betOptions, betStartedAt)
+            betId = await self.fire.postNewBet(guild, user.id, betTitle, betOptions, betStartedAt)
 
             return self.__createBetEmbed(guild, user.display_name, betTitle, betOptions, str(betId), "Open", betStartedAt)
         except Exception as e:
@@ -77,30 +83,35 @@ class DiscordBets:
         try:
             # Errors out if betId is not an int and goes to the exception part
             betIdInt = int(betId)
-            betDict = self.fire.fetchAllBets(guild)
-            memberDict = await self.fire.fetchAllMembers(guild)
 
-            for key in betDict: 
-                if key != 'numBets' and int(betDict[key]['betId']) == betIdInt:
+            embed = self.renderCache.get(guild.id, 'showbet', betIdInt)
+            if embed != None:
+                return embed
+
+            version = self.renderCache.version()
+            betDict = await self.fire.fetchBet(guild, str(betIdInt))
 
-                    startedByUser = memberDict[int(betDict[key]['startedBy'])]
-                    status = "Open"
+            if betDict == None:
+                return getOopsEmbed("Couldn't find a bet with that id")
 
-                    if betDict[key]['completed']:
-                        status = "Completed"
-                    elif betDict[key]['closed']:
-                        status = "Closed"
+            memberDict = await self.fire.fetchAllMembers(guild)
+            startedByUser = memberDict[int(betDict['startedBy'])]
+            status = "Open"
 
-                    return self.__createBetEmbed(guild, startedByUser, betDict[key]['betTitle'], betDict[key]['options'], str(betDict[key]['betId']), status, betDict[key]['startedAt'])
+            if betDict['completed']:
+                status = "Completed"
+            elif betDict['closed']:
+                status = "Closed"
 
-            return getOopsEmbed("Couldn't find a bet with that id")
+            embed = self.__createBetEmbed(guild, startedByUser, betDict['betTitle'], betDict['options'], str(betDict['betId']), status, betDict['startedAt'])
+            return self.renderCache.put(guild.id, 'showbet', betIdInt, embed, ('bets',), version=version)
 
         except Exception as e:
             print(e)
             return getUsageEmbed("-showbet [bet id]\n\n example: -showbet 7")
 
     async def closeBet(self, guild, user, betId):
-        betDict, error = self.fire.postCloseBet(guild, user, str(betId))
+        betDict, error = await self.fire.postCloseBet(guild, user, str(betId))
         memberDict = await self.fire.fetchAllMembers(guild)
 
         if error:
@@ -121,7 +132,7 @@ class DiscordBets:
         # BetList = [BetId, Option Number, Cost]
         betList = messageString.split(" ")
         if len(betList) == 3:
-            betDict, error = self.fire.postBet(guild, user, betList[0], betList[1], int(betList[2]))
+            betDict, error = await self.fire.postBet(guild, user, betList[0], betList[1], int(betList[2]))
         
             if error != None:
                 return getOopsEmbed(error)
@@ -133,27 +144,23 @@ class DiscordBets:
         else:
             return getUsageEmbed("-bet [bet id] [option number] [discord points amount]\n\n example: -bet 3 2 500")
 
-    def getAllActiveBets(self, guild):
-        betDict = self.fire.fetchAllBets(guild)
-        activeBets = []
+    async def getAllActiveBets(self, guild):
+        embed = self.renderCache.get(guild.id, 'allbets')
+        if embed != None:
+            return embed
 
-        for key in betDict: 
-            if key != 'numBets' and not betDict[key]['completed']:
-                activeBets.append(betDict[key])
+        version = self.renderCache.version()
+        activeBets = await self.fire.fetchActiveBets(guild)
         
         if len(activeBets) > 0:
-            return self.__createAllBetsEmbed(activeBets)
+            embed = self.__createAllBetsEmbed(activeBets)
         else:
-            return self.__createNoBetsEmbed()
+            embed = self.__createNoBetsEmbed()
 
-    def showBetForUser(self, guild, user):
-        betDict = self.fire.fetchAllBets(guild)
-        activeBets = []
+        return self.renderCache.put(guild.id, 'allbets', None, embed, ('bets',), version=version)
 
-        for key in betDict:
-            if key != 'numBets' and int(betDict[key]['startedBy']) == user.id:
-                if not betDict[key]['completed']:
-                    activeBets.append(betDict[key])
+    async def showBetForUser(self, guild, user):
+        activeBets = await self.fire.fetchBetsByCreator(guild, user.id)
 
         if len(activeBets) > 0:
             return self.__createMyBetsEmbed(user, activeBets)
@@ -179,7 +186,7 @@ class DiscordBets:
         return embed
 
     def __createCompletedBetEmbed(self, guild, betDict, userDict):
-        userString, amountString = self.__createUserAmountStrings(userDict)
+        userString, amountString = self.__createUserAmountStrings(guild, userDict)
 
         now = datetime.today()
         embed = discord.Embed(title=betDict['betTitle'], description=" ", timestamp=now, colour=discord.Colour.green())
@@ -246,18 +253,21 @@ class DiscordBets:
 
         return betOptionIds, betOptionTitles, betOptionTotalAmount
     
-    def __createUserAmountStrings(self, userDict):
+    def __createUserAmountStrings(self, guild, userDict):
         usersString = ""
         amountString = ""
 
-        # This sorts the dictionary by highest-value and converts it to a list
-        # It takes form [(user_0.id, value_0) ...(user_n.id, value_n)]
-        sortedUserDict = [(k, userDict[k]) for k in sorted(userDict, key=userDict.get, reverse=True)]
+        # The highest amounts as a list, it takes form [(user_0.id, value_0) ...(user_n.id, value_n)]
+        sortedUserDict = heapq.nlargest(self.maxWinnersShown, userDict.items(), key=lambda item: item[1])
 
         for element in sortedUserDict:
-            usersString += element[0] + "\n"
+            # The payout already happened, so a member who left is shown by id instead of failing
+            usersString += (self.fire.memberDirectory.displayName(guild, element[0]) or element[0]) + "\n"
             amountString += str(element[1]) + "\n"
 
+        if len(userDict) > len(sortedUserDict):
+            usersString += "and " + str(len(userDict) - len(sortedUserDict)) + " more\n"
+
         return usersString, amountString
     
     def __getActiveBetsStrings(self, activeBets):
@@ -265,14 +275,12 @@ class DiscordBets:
         betTitles = ""
         betStatus = ""
 
-        activeBets = sorted(activeBets, key=lambda k: k['betId']) 
-
         for bet in activeBets:
             numLines, formattedBetTitle = formatString(str(bet['betTitle']))
             betIds += str(bet['betId']) + ('\n' * numLines)
             betTitles += formattedBetTitle + '\n'
 
-            if bet['completed']:
+            if bet.get('completed'):
                 betStatus += 'completed' + ('\n' * numLines)
             elif bet['closed']:
                 betStatus += 'closed' + ('\n' * numLines)
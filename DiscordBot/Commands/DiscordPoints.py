@@ -2,6 +2,7 @@ from datetime import datetime
 import discord
 import itertools
 from .utils import formatString, getUsageEmbed, getOopsEmbed
+from .RenderCache import RenderCache
 
 
 # IDEAS
@@ -14,19 +15,23 @@ class DiscordPoints:
     Attributes
     __________
     fire (Fire obj): The fire instance where information is fetched/updated
+    renderCache (RenderCache obj): Rendered points and rewards embeds
 
     Functions
     __________
     async getDiscordPointsEmbed(page, guild) -> (discord.Embed)
         Makes an embedded message with total points for each user
-    def createNewReward(guild, rewardString) -> (discord.Embed)
+    async def createNewReward(guild, rewardString) -> (discord.Embed)
         Adds a reward and returns the updated list of rewards as an embedded msg
     """
 
     fire = None
+    renderCache = None
+    pointsTtl = 60
 
     def __init__(self, fire):
         self.fire = fire
+        self.renderCache = RenderCache(fire)
 
     async def getDiscordPointsEmbed(self, page, guild):
         """
@@ -42,19 +47,25 @@ class DiscordPoints:
         discord.Embed
             Embedded message of Discord Points for each member of the guild
         """
-        d = self.fire.fetchDiscordPoints(guild)
+        embed = self.renderCache.get(guild.id, 'points', page)
+        if embed != None:
+            return embed
 
-        # This sorts the dictionary by highest-value and converts it to a list
-        # It takes form [(user_0.id, value_0) ...(user_n.id, value_n)]
-        info_arr = [(k, d[k]) for k in sorted(d, key=d.get, reverse=True)]
+        version = self.renderCache.version()
+        requestedPage = page
 
-        userString, pointsString, description = await self.__createdEmbedStrings(guild, info_arr, page)
+        # Rows take form [(rank_0, user_0.id, value_0) ...] for just this page
+        rows, page, pages = await self.fire.fetchLeaderboardPage(guild, 'points', page)
+
+        userString, pointsString, description = await self.__createdEmbedStrings(guild, rows, page, pages)
 
         title = "Discord Points"
 
-        return self.__createPointsEmbed(title, description, userString, pointsString)
+        # New members get their first points from the tick, hence the ttl
+        embed = self.__createPointsEmbed(title, description, userString, pointsString)
+        return self.renderCache.put(guild.id, 'points', requestedPage, embed, ('discordPoints',), self.pointsTtl, version=version)
 
-    def createNewReward(self, guild, rewardString):
+    async def createNewReward(self, guild, rewardString):
         """
         Create new reward for the guild
 
@@ -81,15 +92,17 @@ class DiscordPoints:
             rewardCost = int(rewardStringList[len(rewardStringList) - 1])
             rewardTitle = self.__parseRewardStringList(rewardStringList)
 
-            self.fire.postNewReward(guild, rewardTitle, rewardCost)
+            # Taken before the write, so rewards read before it can never be cached as the new list
+            version = self.renderCache.version()
+            await self.fire.postNewReward(guild, rewardTitle, rewardCost)
 
-            return self.getRewardsEmbed(guild)
+            return await self.__renderRewardsEmbed(guild, version)
         except Exception as e:
             print("ERROR ", e)
             return getUsageEmbed(
                 "-addreward [Desired Reward] [Price of the Reward]\n\nexample: -addreward CSGO with friends 500")
 
-    def getRewardsEmbed(self, guild):
+    async def getRewardsEmbed(self, guild):
         """
         Get all of the current rewards for the guild
 
@@ -104,18 +117,43 @@ class DiscordPoints:
             Embedded message with all of the rewards for the guild
         """
 
-        rewards_dict = self.fire.fetchAllRewards(guild)
+        embed = self.renderCache.get(guild.id, 'rewards')
+        if embed != None:
+            return embed
+
+        return await self.__renderRewardsEmbed(guild, self.renderCache.version())
+
+    async def __renderRewardsEmbed(self, guild, version):
+        """
+        Private function that builds the rewards embed and caches it, unless the rewards
+        changed after version was taken
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want to get information from
+        version : int
+            renderCache.version() from before the rewards were read (or written)
+
+        Returns
+        ----------
+        discord.Embed
+            Embedded message with all of the rewards for the guild
+        """
+
+        rewards_dict = await self.fire.fetchAllRewards(guild)
 
         if rewards_dict == {}:
-            return self.__noRewardsEmbed(guild)
+            return self.renderCache.put(guild.id, 'rewards', None, self.__noRewardsEmbed(guild), ('rewards',), version=version)
 
         rewardsList = [(k, rewards_dict[k]) for k in sorted(rewards_dict, key=rewards_dict.get, reverse=True)]
 
         idString, rewardsString, costsString = self.__getRewardsEmbedStrings(rewardsList)
 
-        return self.__createRewardsEmbed(idString, rewardsString, costsString)
+        embed = self.__createRewardsEmbed(idString, rewardsString, costsString)
+        return self.renderCache.put(guild.id, 'rewards', None, embed, ('rewards',), version=version)
 
-    def redeemReward(self, guild, user, reward_id):
+    async def redeemReward(self, guild, user, reward_id):
         """
         Redeems the desired reward with DiscordPoints
         [@Todo: Ping Users associated with the reward]
@@ -135,8 +173,7 @@ class DiscordPoints:
             Embedded message with the redeemed reward
         """
 
-        points_dict = self.fire.fetchDiscordPoints(guild)
-        rewards_dict = self.fire.fetchAllRewards(guild)
+        rewards_dict = await self.fire.fetchAllRewards(guild)
         rewards_list = [(k, rewards_dict[k]) for k in sorted(rewards_dict, key=rewards_dict.get, reverse=True)]
 
         try:
@@ -145,22 +182,21 @@ class DiscordPoints:
                 return self.__createNotARewardEmbed()
 
             reward_title = rewards_list[int(reward_id) - 1][0]
-            reward_cost = rewards_list[int(reward_id) - 1][1]
 
-            # Check to see if the user has enough points to redeem the reward
-            if points_dict[str(user.id)] and points_dict[str(user.id)] < reward_cost:
-                return self.__createNotEnoughPointsEmbed(user, points_dict[str(user.id)])
-            else:
-                new_points = points_dict[str(user.id)] - reward_cost
-
-                self.fire.postNewDiscordPoints(guild, str(user.id), new_points)
+            # The balance is checked and charged in one transaction
+            reward_cost, new_points, error = await self.fire.postRedeemReward(guild, str(user.id), reward_title)
 
+            if error == None:
                 return self.__createRedeemRewardEmbed(reward_title, reward_cost, user, new_points)
+            elif reward_cost != None and new_points != None:
+                return self.__createNotEnoughPointsEmbed(user, new_points)
+            else:
+                return getOopsEmbed(error)
         except Exception as e:
             print(e)
             return getUsageEmbed("-redeemReward [Desired Reward Id]\n\nexample: -redeemReward 3")
 
-    def addPoints(self, guild, author, user, points):
+    async def addPoints(self, guild, author, user, points):
         """
         add Points to a specific User
         [@Todo: Ping Users associated with the points]
@@ -180,19 +216,14 @@ class DiscordPoints:
         discord.Embed
             Embedded message with the redeemed reward
                 """
-        points_dict = self.fire.fetchDiscordPoints(guild)
-        print(user.id)
         try:
-            if not str(user.id) in points_dict:
-                return getOopsEmbed("User ID not correct")
-            elif not author.guild_permissions.administrator:
+            if not author.guild_permissions.administrator:
                 return getOopsEmbed("Command can only be used by Server-Admins")
 
-            print(points_dict[str(user.id)])
+            new_points, error = await self.fire.postAddPoints(guild, str(user.id), int(points))
 
-            new_points = points_dict[str(user.id)] + int(points)
-            print(new_points)
-            self.fire.postNewDiscordPoints(guild, str(user.id), new_points)
+            if error != None:
+                return getOopsEmbed(error)
 
             return self.__createPointsEmbed("Points added", "Points were added to balance", f"{user}", f"{new_points}")
 
@@ -202,7 +233,7 @@ class DiscordPoints:
             return getOopsEmbed("Error adding points, check console")
 
     # ---------- MARK: - Private Functions ----------
-    async def __createdEmbedStrings(self, guild, sortedList, page):
+    async def __createdEmbedStrings(self, guild, rows, page, pages):
         """
         Private helper function to create strings for the embedded message
 
@@ -210,10 +241,12 @@ class DiscordPoints:
         ----------
         guild : (discord.Guild)
             The server that we are tracking
-        sortedList : arr[(key_0, val_0) ...  (key_n, val_n)]
-            The sorted (by val) list of key, val pairs where key: user_id, val: points
+        rows : arr[(rank_0, key_0, val_0) ...  (rank_n, key_n, val_n)]
+            The entries of the page where key: user_id, val: points
         page  : (int)
-            Page of the message we want to look at (20 entries per page)
+            Page of the message we are looking at (20 entries per page)
+        pages : (int)
+            Total number of pages
 
         Returns
         ----------
@@ -223,27 +256,15 @@ class DiscordPoints:
 
         member_dict = await self.fire.fetchAllMembers(guild)
 
-        # Max 20 entries / page
-        pages = len(sortedList) // 20 + 1
-
         userString = ""
         pointsString = ""
-        rankString = ""
-
-        if page > pages or page < 0:
-            page = 1
-
-        for i in range(0, 20):
-            shiftedIndex = (page - 1) * 20 + i
-            if shiftedIndex < len(sortedList):
-                user_id = sortedList[shiftedIndex][0]
-                points = sortedList[shiftedIndex][1]
 
-                if int(user_id) in member_dict.keys():
-                    userString += member_dict[int(user_id)] + '\n'
-                    pointsString += str(points) + '\n'
+        for rank, user_id, points in rows:
+            if int(user_id) in member_dict.keys():
+                userString += member_dict[int(user_id)] + '\n'
+                pointsString += str(points) + '\n'
 
-        description = "Page " + str(page) + " of " + str(page)
+        description = "Page " + str(page) + " of " + str(pages)
 
         return userString, pointsString, description
 
@@ -1,28 +1,45 @@
-from random import randint
+import random
 import discord
 from datetime import datetime
+from .RenderCache import RenderCache
+from ResourceLoader import ResourceLoader
 
 class MiscCommands:
     """
     All the commands that don't quite fit in anywhere else
 
+    Attributes
+    __________
+    fire (Fire obj): The fire instance where information is fetched/updated
+    resources (ResourceLoader obj): The data files, read once at startup
+    helpCategories (tuple(str)): The order of the sections in the help message
+
     Functions
     __________
     getPatchNotes() -> (str)
         Parses PATCH.txt and returns a string with its contents
-    getHelpMessage() -> (str)
-        Returns a string of commands the user can do
+    getHelpMessage(commands) -> (discord.Embed)
+        Returns an embed of the registered commands the user can do
     getRandomCompliment() -> (str)
         Fun little script that returns a random compliment
+    async getDatabaseStatsEmbed(guild) -> (discord.Embed)
+        Makes an embedded message with the database usage and document sizes of the guild
     """
 
     fire = None
+    resources = None
+    renderCache = None
+    helpCategories = ("Time Logger", "Discord Points", "Discord Bets", "Misc.")
 
-    def __init__(self, fire):
+    def __init__(self, fire, resources=None):
         self.fire = fire
+        self.renderCache = RenderCache(ttl=None)
+
+        self.resources = resources if resources != None else ResourceLoader()
+        self.resources.preload('Compliments.txt', 'PATCH.txt')
 
-    def sendFeedback(self, guild, user, feedbackString):
-        self.fire.postFeedback(guild, user, feedbackString)
+    async def sendFeedback(self, guild, user, feedbackString):
+        await self.fire.postFeedback(guild, user, feedbackString)
 
         return "Thank you for your feedback <3"
 
@@ -35,9 +52,7 @@ class MiscCommands:
         s (str): The patch notes string
         """
 
-        with open('../data/PATCH.txt') as f:
-            content = f.readlines()
-        content = [x.strip() for x in content]
+        content = [x.strip() for x in self.resources.text('PATCH.txt').splitlines()]
 
         s = '```'
         for c in content:
@@ -45,49 +60,83 @@ class MiscCommands:
         s += '```'
         return s
 
-    def getHelpMessage(self):
+    def getHelpMessage(self, commands):
         """
-        Returns a string of commands the user can do
+        Returns an embed of the commands the user can do, built from the command registry
+
+        Parameters
+        ----------
+        commands : list(Command)
+            The registered commands (CommandRegistry.commands()), listed by category
 
         Returns
         ----------
-        s (str): Help message string
+        embed (discord.Embed): Help message embed
         """
 
-        timeLoggerStr = ""
-        discordPointsStr = ""
-        discordBetsStr = ""
-        miscStr = ""
-
-        timeLoggerStr += '`-totallog`: gets the tracked minutes in voice\n'
-        timeLoggerStr += '`-todaylog`: gets the tracked minutes for the day\n'
-        timeLoggerStr += '`-weeklog`: amount of time logged for the last 7 days\n'
-        timeLoggerStr += '`-mylog`: some cool stats\n'
-
-        discordPointsStr += '`-points`: shows all of the points for each user in the Discord server\n'
-        discordPointsStr += '`-addreward`(admins): add a reward for discord points\n'
-        discordPointsStr += '`-rewards`: shows a list of all rewards for the Discord server\n'
-        discordPointsStr += '`-redeem`: redeem a reward\n'
-
-        discordBetsStr += '`-createbet`: create a bet / prediction\n'
-        discordBetsStr += '`-closebet`: closes a bet for submission\n'
-        discordBetsStr += '`-completebet`: completes the bet and pays points to the winner(s)\n'
-        discordBetsStr += '`-bet`: bet on an option in a particular prediction\n'
-        discordBetsStr += '`-allbets`: shows a list of all active bets\n'
-        discordBetsStr += '`-showbet`: shows a particular bet and its options\n'
-        discordBetsStr += '`-mybets`: shows a list of all active bets for the user\n'
-
-        miscStr += '`-help`: lists all commands\n'
-        miscStr += '`-rob`: :-)\n'
-        miscStr += '`-hello`: hey :)\n'
+        # The commands are registered once at startup, so the help message never changes while the bot runs
+        embed = self.renderCache.get(None, 'help')
+        if embed != None:
+            return embed
+
+        categories = {}
+        for command in commands:
+            line = '`{0}`{1}: {2}\n'.format(command.name, '(admins)' if command.adminOnly else '', command.description)
+            categories[command.category] = categories.get(command.category, '') + line
+
+        # Known sections keep their order, anything else comes before Misc.
+        order = [category for category in self.helpCategories if category in categories and category != "Misc."]
+        order += [category for category in categories if not category in self.helpCategories]
+        order += ["Misc."] if "Misc." in categories else []
 
         now = datetime.today()
         embed = discord.Embed(title="Kirbec Bot", description="All of Kirbec Bot's commands", timestamp=now, colour=discord.Colour.purple())
 
-        embed.add_field(name="Time Logger", value=timeLoggerStr, inline=False)
-        embed.add_field(name="Discord Points", value=discordPointsStr, inline=False)
-        embed.add_field(name="Discord Bets", value=discordBetsStr, inline=False)
-        embed.add_field(name="Misc.", value=miscStr, inline=False)
+        for category in order:
+            embed.add_field(name=category, value=categories[category], inline=False)
+
+        embed.set_footer(text="Kirbec Bot", icon_url="https://cdn.discordapp.com/embed/avatars/0.png")
+
+        return self.renderCache.put(None, 'help', None, embed)
+
+    async def getDatabaseStatsEmbed(self, guild):
+        """
+        Makes an embedded message with the database usage and document sizes of the guild
+
+        Usage is counted since the bot started
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want the stats for
+
+        Returns
+        ----------
+        discord.Embed
+        """
+
+        # Fetched first so the reads for the sizes are part of the usage shown
+        sizes = await self.fire.fetchDocumentSizes(guild)
+        accounting = self.fire.accounting
+        usage = accounting.guildUsage(guild.id)
+        rank, guilds = accounting.guildRank(guild.id)
+
+        description = "{0} reads, {1} writes, {2} since the bot started".format(
+            usage['reads'], usage['writes'], self.__createBytesString(usage['bytes']))
+        if rank != None:
+            description += "\n#{0} of {1} servers".format(rank, guilds)
+
+        now = datetime.today()
+        embed = discord.Embed(title="Database Stats", description=description, timestamp=now, colour=discord.Colour.purple())
+
+        embed.add_field(name="Top Documents", value=self.__createUsageString(accounting.topDocuments(guild.id)), inline=False)
+        embed.add_field(name="Top Commands", value=self.__createUsageString(accounting.topActivities(guild.id)), inline=False)
+
+        sizeStr = ""
+        for name, size in sizes.items():
+            if size != None:
+                sizeStr += '`{0}`: {1}\n'.format(name, self.__createBytesString(size))
+        embed.add_field(name="Document Sizes", value=sizeStr or "No documents", inline=False)
 
         embed.set_footer(text="Kirbec Bot", icon_url="https://cdn.discordapp.com/embed/avatars/0.png")
 
@@ -102,11 +151,12 @@ class MiscCommands:
         s (str): Random compliment string
         """
 
-        with open('../../data/Compliments.txt') as f:
-            content = f.readlines()
-        content = [x.strip() for x in content]
+        content = self.resources.lines('Compliments.txt')
 
-        return content[randint(0,99)]
+        if not content:
+            return ""
+
+        return random.choice(content)
 
     def checkAdmin(self, author, user):
         """
@@ -117,4 +167,27 @@ class MiscCommands:
         if user.guild_permissions.administrator:
             return f"{user} is an admin"
         else:
-            return f"{user} is a fucking peasant"
\ No newline at end of file
+            return f"{user} is a fucking peasant"
+
+    def __createUsageString(self, rows):
+        """
+        Private helper function to list (name, usage) rows from the accounting
+        """
+
+        s = ""
+        for name, usage in rows:
+            s += '`{0}`: {1} reads, {2} writes ({3})\n'.format(name, usage['reads'], usage['writes'], self.__createBytesString(usage['bytes']))
+
+        return s or "Nothing yet"
+
+    def __createBytesString(self, size):
+        """
+        Private helper function to show a number of bytes (Firestore documents are limited to 1 MiB)
+        """
+
+        if size < 1024:
+            return str(size) + " B"
+        elif size < 1024 * 1024:
+            return "{0:.1f} KiB".format(size / 1024)
+
+        return "{0:.2f} MiB".format(size / (1024 * 1024))
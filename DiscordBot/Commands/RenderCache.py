@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+class RenderCache:
+    """
+    Rendered embeds keyed by (guild, view, page), so unchanged views are not built again
+
+    An entry is dropped when Fire reports a change to one of the documents it was built
+    from, or when its time to live runs out (for views that change with the minute tick).
+    A hit returns a copy of the embed with only the timestamp set to now.
+
+    A view is built while other commands keep running, so one of its documents can
+    change (and drop the entry) before the embed is put. To not cache that outdated
+    embed, take version() when get() misses and give it to put(): the embed is then
+    only returned, not cached, if one of its documents changed in the meantime.
+
+    Attributes
+    __________
+    ttl (float): Seconds an entry lives when put() is not given one (None to live until invalidated)
+    maxEntries (int): Maximum number of embeds kept; the least recently used are dropped first
+
+    Functions
+    __________
+    get(guildId, view, page) -> discord.Embed
+        The cached embed (None on a miss)
+    version() -> int
+        Counts the document changes (taken on a miss, before the view is built)
+    put(guildId, view, page, embed, documents, ttl, version) -> discord.Embed
+        Caches the embed (unless a document changed since version) and returns it
+    documentChanged(guildId, document)
+        Drops every entry of the guild that was built from the document
+    invalidate(guildId, view)
+        Drops the guild's entries for a view (or all of them)
+    """
+
+    def __init__(self, fire=None, ttl=600, maxEntries=2000):
+        """
+        Parameters
+        ----------
+        fire : Fire obj (optional)
+            Invalidate entries when Fire writes one of the documents they were built from
+        ttl : float
+            Default seconds an entry lives
+        maxEntries : int
+            Maximum number of embeds kept
+        """
+
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        # { (guildId, view, page): (embed, documents, expires) }
+        self.__entries = OrderedDict()
+        self.__version = 0
+        # { (guildId, document): __version of its last change }
+        self.__changes = {}
+
+        if fire != None:
+            fire.changeListeners.append(self.documentChanged)
+
+    def get(self, guildId, view, page=None):
+        key = (guildId, view, page)
+        entry = self.__entries.get(key)
+
+        if entry == None:
+            return None
+
+        embed, documents, expires = entry
+        if expires != None and time.monotonic() >= expires:
+            del self.__entries[key]
+            return None
+
+        self.__entries.move_to_end(key)
+
+        embed = embed.copy()
+        embed.timestamp = datetime.today()
+        return embed
+
+    def version(self):
+        return self.__version
+
+    def put(self, guildId, view, page, embed, documents=(), ttl=-1, version=None):
+        """
+        Caches the embed and returns it
+
+        Parameters
+        ----------
+        guildId : int
+            The guild the view belongs to (None for views that are the same everywhere)
+        view : str
+            Name of the view, e.g. 'rewards'
+        page : hashable
+            Page (or other argument) of the view
+        embed : discord.Embed
+            The rendered view
+        documents : tuple(str)
+            The documents the view was built from, e.g. ('bets',)
+        ttl : float
+            Seconds the entry lives (default: self.ttl, None: until invalidated)
+        version : int (optional)
+            version() from before the view was built
+
+        Returns
+        ----------
+        discord.Embed
+        """
+
+        if version != None and any(self.__changes.get((guildId, document), 0) > version for document in documents):
+            return embed
+
+        if ttl == -1:
+            ttl = self.ttl
+
+        expires = time.monotonic() + ttl if ttl != None else None
+        key = (guildId, view, page)
+
+        self.__entries[key] = (embed, tuple(documents), expires)
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.maxEntries:
+            self.__entries.popitem(last=False)
+
+        return embed
+
+    def documentChanged(self, guildId, document):
+        self.__version += 1
+        self.__changes[(guildId, document)] = self.__version
+
+        for key in [key for key, entry in self.__entries.items() if key[0] == guildId and document in entry[1]]:
+            del self.__entries[key]
+
+    def invalidate(self, guildId, view=None):
+        for key in [key for key in self.__entries if key[0] == guildId and (view == None or key[1] == view)]:
+            del self.__entries[key]
@@ -1,7 +1,6 @@
 import discord
-import os
 from datetime import datetime
-import datetime as dt
+from .RenderCache import RenderCache
 
 class TimeLogger:
     """
@@ -10,6 +9,8 @@ class TimeLogger:
     Attributes
     __________
     fire (Fire obj): The fire instance where information is fetched/updated
+    weekDays (int): Number of days covered by the week log
+    renderCache (RenderCache obj): Rendered logs, kept for one tick (logTtl seconds)
 
     Functions
     __________
@@ -24,9 +25,13 @@ class TimeLogger:
     """
 
     fire = None
+    weekDays = 7
+    logTtl = 60
+    renderCache = None
 
     def __init__(self, fire):
         self.fire = fire
+        self.renderCache = RenderCache(fire, ttl=self.logTtl)
 
     async def getTotalLogEmbed(self, page, guild):
         """
@@ -45,18 +50,21 @@ class TimeLogger:
             Embedded message of total times for each user
         """
 
-        d = self.fire.fetchTotalTimes(guild)
-        member_dict = await self.fire.fetchAllMembers(guild)
+        embed = self.renderCache.get(guild.id, 'totallog', page)
+        if embed != None:
+            return embed
+
+        requestedPage = page
 
-        # This sorts the dictionary by highest-value and converts it to a list
-        # It takes form [(user_0.id, value_0) ...(user_n.id, value_n)]
-        d = [(k, d[k]) for k in sorted(d, key=d.get, reverse=True)]
+        # Rows take form [(rank_0, user_0.id, value_0) ...] for just this page
+        rows, page, pages = await self.fire.fetchLeaderboardPage(guild, 'total', page)
 
-        userString, timeString, rankString, description = await self.__createdEmbedStrings(guild, d, page)
+        userString, timeString, rankString, description = await self.__createdEmbedStrings(guild, rows, page, pages)
 
         title = "Total Log"
 
-        return self.__createAggregateLogEmbed(title, description, userString, timeString, rankString)
+        embed = self.__createAggregateLogEmbed(title, description, userString, timeString, rankString)
+        return self.renderCache.put(guild.id, 'totallog', requestedPage, embed)
 
     async def getTodayLogEmbed(self, guild):
         """
@@ -73,18 +81,18 @@ class TimeLogger:
             Embedded message of times today for each user
         """
 
-        l = self.fire.fetchAllDateTimes(guild)
-        l = list(l.items())
-        userIdAndVal = l[0][1]
+        embed = self.renderCache.get(guild.id, 'todaylog')
+        if embed != None:
+            return embed
 
-        userValDict = sorted(userIdAndVal.items(), key=lambda kv: kv[1])
-        userValDict.reverse()
+        rows, page, pages = await self.fire.fetchLeaderboardPage(guild, 'today', 1)
 
-        userString, timeString, rankString, description = await self.__createdEmbedStrings(guild, userValDict, 1)
+        userString, timeString, rankString, description = await self.__createdEmbedStrings(guild, rows, page, pages)
 
         title = "Today's Log"
 
-        return self.__createAggregateLogEmbed(title, description, userString, timeString, rankString)
+        embed = self.__createAggregateLogEmbed(title, description, userString, timeString, rankString)
+        return self.renderCache.put(guild.id, 'todaylog', None, embed)
 
     async def getWeekLogEmbed(self, page, guild):
         """
@@ -103,22 +111,22 @@ class TimeLogger:
             Embedded message of the log for the week for each user
         """
 
-        allDateTimes = self.fire.fetchAllDateTimes(guild)
-        allDateTimes = list(allDateTimes.items())
+        embed = self.renderCache.get(guild.id, 'weeklog', page)
+        if embed != None:
+            return embed
 
-        if len(allDateTimes) < 7:
-            return
+        requestedPage = page
 
-        firstDate, secondDate, userValDict, = self.__sumUserTimeValues(allDateTimes)
-        userValDict = [(k, userValDict[k]) for k in sorted(userValDict, key=userValDict.get, reverse=True)]
+        rows, page, pages, firstDate, lastDate = await self.fire.fetchWindowPage(guild, self.weekDays, page)
 
-        userString, timeString, rankString, description = await self.__createdEmbedStrings(guild, userValDict, 1)
+        userString, timeString, rankString, description = await self.__createdEmbedStrings(guild, rows, page, pages)
 
-        title = "Week Log (" + secondDate + " - " + firstDate + ")"
-        return self.__createAggregateLogEmbed(title, description, userString, timeString, rankString)
+        title = "Week Log (" + firstDate + " - " + lastDate + ")"
+        embed = self.__createAggregateLogEmbed(title, description, userString, timeString, rankString)
+        return self.renderCache.put(guild.id, 'weeklog', requestedPage, embed)
 
 
-    def getMyLogEmbed(self, guild, user):
+    async def getMyLogEmbed(self, guild, user):
         """
         Makes an embedded message with personalized stats for the user
 
@@ -135,37 +143,15 @@ class TimeLogger:
             Embedded message of personalized information
         """
 
-        date_times_dict = self.fire.fetchAllDateTimes(guild)
-        total_times_dict = self.fire.fetchTotalTimes(guild)
+        stats = await self.fire.fetchUserStats(guild, user.id)
 
-        maxDate = ""
-        maxVal = 0
-
-
-        # Gets total time
-        user_id_string = str(user.id)
-        if not user_id_string in total_times_dict.keys():
-            print("Couldn't find user_id in totalTimes")
+        if stats == None:
+            print("Couldn't find user_id in userStats")
             return
 
-        totalTime = total_times_dict[user_id_string]
-
-        # Finds maximum value
-        for key in date_times_dict:
-            val = date_times_dict[key]
-            if user_id_string in val and val[user_id_string] > maxVal:
-                maxVal = val[user_id_string]
-                maxDate = key
+        return self.__createMyLogEmbed(user, stats['total'], stats['maxDay'], stats['maxDate'], stats['today'], stats['streak'])
 
-        todayVal = 0
-        # This whole mumbo-jumbo gets the most recent data and
-        # reports how much time was spent for that particular username
-        if user_id_string in list(date_times_dict.items())[0][1]:
-            todayVal = list(date_times_dict.items())[0][1][user_id_string]
-
-        return self.__createMyLogEmbed(user, totalTime, maxVal, maxDate, todayVal)
-
-    def __createMyLogEmbed(self, user, totalTime, maxTime, maxDate, todayTime):
+    def __createMyLogEmbed(self, user, totalTime, maxTime, maxDate, todayTime, streak):
         """
         Private helper function to create embedded message for the user
 
@@ -181,6 +167,8 @@ class TimeLogger:
             The date when maxTime occurred
         todayTime: (int)
             The amount of time spent today so far for the user
+        streak: (int)
+            The number of consecutive days the user has been logged
 
         Returns
         ----------
@@ -200,6 +188,7 @@ class TimeLogger:
         embed.add_field(name="Total Time", value= self.__createTimeString(totalTime) + "\n", inline=False)
         embed.add_field(name="Time Today", value= self.__createTimeString(todayTime) + "\n", inline=False)
         embed.add_field(name="Longest Day", value= self.__createTimeString(maxTime) + " (" + str(maxDate) + ")\n", inline=False)
+        embed.add_field(name="Streak", value= str(streak) + " days\n", inline=False)
 
         return embed
 
@@ -235,7 +224,7 @@ class TimeLogger:
 
         return embed
 
-    async def __createdEmbedStrings(self, guild, sortedList, page):
+    async def __createdEmbedStrings(self, guild, rows, page, pages):
         """
         Private helper function to create strings for the embedded message
 
@@ -243,10 +232,12 @@ class TimeLogger:
         ----------
         guild : (discord.Guild)
             The server that we are tracking
-        sortedList : arr[(key_0, val_0) ...  (key_n, val_n)]
-            The sorted (by val) list of key, val pairs where key: user_id, val: time
+        rows : arr[(rank_0, key_0, val_0) ...  (rank_n, key_n, val_n)]
+            The entries of the page where key: user_id, val: time
         page  : (int)
-            Page of the message we want to look at (20 entries per page)
+            Page of the message we are looking at (20 entries per page)
+        pages : (int)
+            Total number of pages
 
         Returns
         ----------
@@ -256,74 +247,20 @@ class TimeLogger:
 
         member_dict = await self.fire.fetchAllMembers(guild)
 
-        # Max 20 entries / page
-        pages = len(sortedList) // 20 + 1
-
         userString = ""
         timeString = ""
         rankString = ""
 
-        if page > pages or page < 0:
-            page = 1
-
-        for i in range(0,20):
-            shiftedIndex = (page-1)*20 + i
-            if shiftedIndex < len(sortedList):
-                user_id = sortedList[shiftedIndex][0]
-                time = sortedList[shiftedIndex][1]
+        for rank, user_id, time in rows:
+            if int(user_id) in member_dict.keys():
+                userString += member_dict[int(user_id)] + '\n'
+                timeString += self.__createTimeString(time) + '\n'
+                rankString += str(rank) + '\n'
 
-                if int(user_id) in member_dict.keys():
-                    userString += member_dict[int(user_id)] + '\n'
-                    timeString += self.__createTimeString(time) + '\n'
-                    rankString += str(shiftedIndex+1) + '\n'
-
-        description = "Page " + str(page) + " of " + str(page)
+        description = "Page " + str(page) + " of " + str(pages)
 
         return userString, timeString, rankString, description
 
-    def __sumUserTimeValues(self, listOfTimeVals):
-        """
-        Private helper function to sum all times (for the week) for each user
-
-        Parameters
-        ----------
-        listOfTimeVals: [ (date_0, {user_0, val_0...}) .. (date_n, {user_0, val_0...}) ]
-            List of (key,val) pairs where key = date, val = dictionary of users and
-            corresponding time values
-
-        Returns
-        ----------
-        firstDate: (str)
-            The beginning of the week date-range
-        secondDate: (str)
-            The end of the week date-range
-        d: dict{user: time_val}
-            The summed dictionary of user and corresponding times
-        """
-        if len(listOfTimeVals) <= 7:
-            return {}
-        else:
-            d = {}
-            for i in range(7):
-                date = listOfTimeVals[i][0]
-                info = listOfTimeVals[i][1]
-
-                if i == 0:
-                    firstDate = str(date)
-                if i == 6:
-                    secondDate = str(date)
-
-                for key in info:
-                    val = info[key]
-                    hrs = val // 60
-                    mins = val % 60
-
-                    if key in d:
-                        d[key] += val
-                    else:
-                        d[key] = val
-        return firstDate, secondDate, d
-
     def __createTimeString(self, val):
         """
         Private helper function to parse minutes to days,hours,minutes
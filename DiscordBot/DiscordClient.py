@@ -1,12 +1,19 @@
 import discord
 import asyncio
+import os
+import time
 
 from Fire import Fire
+from TickScheduler import TickScheduler
+from VoiceSessions import VoiceSessions
+from Metrics import MetricsRegistry, MetricsServer, instrument, monitorLoopLag
 from Commands.TimeLogger import TimeLogger
 from Commands.MiscCommands import MiscCommands
 from Commands.DiscordPoints import DiscordPoints
 from Commands.DiscordBets import DiscordBets
+from Commands.CommandRegistry import CommandRegistry
 from Commands.utils import *
+from Storage.Accounting import currentActivity
 
 class DiscordClient(discord.Client):
     """
@@ -21,14 +28,35 @@ class DiscordClient(discord.Client):
         the database
     miscCommands: (MiscCommands obj)
         Instance of the MiscCommands class to display random Misc. messages
+    commandRegistry: (CommandRegistry obj)
+        Maps every command name and alias to its handler
+    voiceSessions: (VoiceSessions obj)
+        Time every member spends in voice, kept current by on_voice_state_update
+    tickScheduler: (TickScheduler obj)
+        Runs the minute tick for every guild (at most TICK_CONCURRENCY guilds at the same time)
+    metricsServer: (MetricsServer obj)
+        Local Prometheus endpoint, only started when METRICS_PORT is set
 
     Functions
     __________
     async on_ready()
         Implementing discord.Client on_ready() that is called when the bot is ready
+        (sets everything up the first time, only resyncs after a reconnect)
     async on_message()
         Implementing discord.Client on_message() that is called when a user messages
         in a server (discord.Guild)
+    async close()
+        Implementing discord.Client close() so cached times are flushed on shutdown
+    async on_member_join(member) / on_member_remove(member) / on_member_update(before, after)
+        Keep the member directory in sync with the guilds
+    async on_user_update(before, after)
+        Keep display names in sync when a user changes their username
+    async on_guild_remove(guild)
+        Drop the member directory and voice sessions for a guild the bot left
+    async on_guild_join(guild) / on_voice_state_update(member, before, after)
+        Open and close the voice sessions that are credited by the minute tick
+    async on_disconnect() / on_resumed()
+        Pause the voice sessions while the gateway is down and reopen them after a resume
 
     """
     sharedFire = None
@@ -36,220 +64,402 @@ class DiscordClient(discord.Client):
     miscCommands = None
     discordPoints = None
     discordBets = None
+    commandRegistry = None
+    tickScheduler = None
+    metricsServer = None
+    trackerMaxBackoff = 300
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.voiceSessions = VoiceSessions()
+        self.__initialized = False
+        self.__tracker = None
 
     async def on_ready(self):
         """
             Implementing discord.Client on_ready() that is called when the bot is ready
 
-            We do any additional post-initialization set-up here
+            discord.py calls this again after every reconnect, so the set-up only runs the
+            first time; later calls keep Fire with its warm caches and the running tracker
         """
         print('Logged on as {0}!'.format(self.user))
+
+        if self.__initialized:
+            # Events may have been missed while we were disconnected
+            for guild in self.guilds:
+                self.sharedFire.memberDirectory.removeGuild(guild)
+        else:
+            await self.__setup()
+
+        # Members already in voice do not send a voice state event
+        for guild in self.guilds:
+            self.voiceSessions.scanGuild(guild)
+
+    async def __setup(self):
+        """
+            Private helper function that creates the storage, the commands and the tracker
+
+            Only called once per process (see on_ready); if it fails before the tracker is
+            running, the next on_ready tries again
+        """
+
         self.sharedFire = Fire()
         self.timeLogger = TimeLogger(self.sharedFire)
         self.discordPoints = DiscordPoints(self.sharedFire)
         self.discordBets = DiscordBets(self.sharedFire)
         self.miscCommands = MiscCommands(self.sharedFire)
-        self.loop.create_task(self.__track_time())
+        self.commandRegistry = self.__register_commands()
+        self.tickScheduler = TickScheduler(interval=60, concurrency=int(os.environ.get('TICK_CONCURRENCY', 16)))
 
-    async def __track_time(self):
+        self.__tracker = self.loop.create_task(self.__supervise_tracker())
+        self.__initialized = True
+
+        # The metrics are optional, they must never keep the tracker from running
+        if os.environ.get('METRICS_PORT') != None:
+            try:
+                await self.__start_metrics(int(os.environ['METRICS_PORT']))
+            except Exception as e:
+                print("ERROR: could not start the metrics server: ", str(e))
+
+    async def __supervise_tracker(self):
         """
-            Private helper function to help track time
+            Private helper function that keeps the one tracker running
 
-            This function is called on a separate thread and loops every 60 seconds
+            If __track_time dies it is restarted after a backoff that doubles with every
+            crash in a row (up to trackerMaxBackoff seconds)
         """
 
-        await self.wait_until_ready()
+        failures = 0
 
         while not self.is_closed():
+            started = time.monotonic()
+
             try:
-                for guild in self.guilds:
-                    members = self.__filter_channel_members(guild)
-                    self.sharedFire.incrementTimes(guild, members)
-                await asyncio.sleep(60)
+                await self.__track_time()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print("ERROR: ", str(e))
-                await asyncio.sleep(60)
+                print("ERROR: tracker crashed: ", str(e))
+
+            if self.is_closed():
+                break
 
-    def __filter_channel_members(self, guild):
+            # A tracker that ran for a while before dying starts over with a short backoff
+            failures = failures + 1 if time.monotonic() - started < self.trackerMaxBackoff else 1
+            delay = min(self.trackerMaxBackoff, 2 ** failures)
+            print("Restarting the tracker in {0}s".format(delay))
+            await asyncio.sleep(delay)
+
+    async def __start_metrics(self, port):
         """
-            Private helper function to filter members to track
+            Private helper function that serves the tick, command and database metrics
+            at http://127.0.0.1:port/metrics
 
-            We do not increment times for individuals that are deafened, muted, or afk
+            Shard workers listen on port + their first shard id so they do not collide
         """
 
-        members = []
-        channels = guild.voice_channels
+        shardIds = getattr(self, 'shard_ids', None)
+        if shardIds:
+            port += min(shardIds)
+
+        registry = MetricsRegistry()
+        tickSeconds = registry.histogram('kirbec_tick_seconds', 'Seconds the minute tick took for a guild', ('guild',))
+        commandSeconds = registry.histogram('kirbec_command_seconds', 'Seconds a command took to handle', ('command',))
+        fireSeconds = registry.histogram('kirbec_fire_seconds', 'Seconds a Fire operation took', ('method',))
+        documents = registry.counter('kirbec_firestore_documents_total', 'Documents read or written', ('kind',))
+        documentBytes = registry.counter('kirbec_firestore_bytes_total', 'Approximate bytes of the documents read or written', ('kind',))
+        loopLag = registry.gauge('kirbec_event_loop_lag_seconds', 'How late the event loop woke up from a one second sleep')
 
-        for cur_channel in channels:
-            if cur_channel.members:
-                for member in cur_channel.members:
-                    if not member.voice.self_deaf and not member.voice.afk and not member.voice.deaf:
-                        members.append(member)
+        def countDocument(kind, path, size):
+            documents.inc(1, kind)
+            documentBytes.inc(size, kind)
+
+        self.tickScheduler.listeners.append(lambda guildId, seconds: tickSeconds.observe(seconds, guildId))
+        self.commandRegistry.listeners.append(lambda command, seconds: commandSeconds.observe(seconds, command.name))
+        self.sharedFire.ioListeners.append(countDocument)
+        instrument(self.sharedFire, fireSeconds)
+        self.loop.create_task(monitorLoopLag(loopLag))
+
+        self.metricsServer = MetricsServer(registry, port)
+        await self.metricsServer.start()
+
+    async def __track_time(self):
+        """
+            Private helper function to help track time
+
+            The tick scheduler calls __track_guild for every guild once a minute, each guild
+            at its own offset into the minute
+        """
+
+        await self.wait_until_ready()
+
+        await self.tickScheduler.run(
+            lambda: self.guilds,
+            self.__track_guild,
+            afterTick=self.sharedFire.flushIfDue,
+            isClosed=self.is_closed,
+        )
+
+    async def __track_guild(self, guild):
+        """
+            Private helper function that writes the voice minutes of a single guild
+
+            The minutes come from the voice sessions, so they are already right when the
+            scheduler skipped or delayed ticks
+        """
+
+        # Every guild runs in its own task, so this only labels this guild's database calls
+        currentActivity.set('tick')
+        minutes = self.voiceSessions.takeMinutes(guild.id)
+
+        try:
+            await self.sharedFire.incrementTimes(guild, minutes)
+        except Exception:
+            self.voiceSessions.restoreMinutes(guild.id, minutes)
+            raise
+
+        await self.sharedFire.flushIfDue(guild.id)
+
+    async def close(self):
+        """
+            Implementing discord.Client close() that is called when the bot shuts down
+
+            Flushes the write-behind cache in Fire so no tracked minutes are lost
+        """
+
+        if self.__tracker != None:
+            self.__tracker.cancel()
+
+        if self.sharedFire != None:
+            await self.sharedFire.close()
+
+        if self.metricsServer != None:
+            await self.metricsServer.stop()
+
+        await super().close()
+
+    async def on_member_join(self, member):
+        if self.sharedFire != None:
+            self.sharedFire.memberDirectory.addMember(member)
+
+    async def on_member_remove(self, member):
+        if self.sharedFire != None:
+            self.sharedFire.memberDirectory.removeMember(member)
+
+    async def on_member_update(self, before, after):
+        if self.sharedFire != None and before.display_name != after.display_name:
+            self.sharedFire.memberDirectory.addMember(after)
+
+    async def on_user_update(self, before, after):
+        if self.sharedFire == None or before.name == after.name:
+            return
+
+        # Members without a nickname show their username
+        for guild in self.guilds:
+            member = guild.get_member(after.id)
+            if member != None:
+                self.sharedFire.memberDirectory.addMember(member)
+
+    async def on_guild_remove(self, guild):
+        if self.sharedFire != None:
+            self.sharedFire.memberDirectory.removeGuild(guild)
+
+        self.voiceSessions.removeGuild(guild.id)
+
+    async def on_guild_join(self, guild):
+        self.voiceSessions.scanGuild(guild)
+
+    async def on_voice_state_update(self, member, before, after):
+        self.voiceSessions.update(member)
+
+    async def on_disconnect(self):
+        # Nobody is credited for the outage; on_ready / on_resumed reopen the sessions
+        for guild in self.guilds:
+            self.voiceSessions.pauseGuild(guild.id)
+
+    async def on_resumed(self):
+        for guild in self.guilds:
+            self.voiceSessions.scanGuild(guild)
 
-        return members
 
     async def on_message(self, message):
         """
             Implementing discord.Client on_message() that is called when a user messages
             in a server (discord.Guild)
 
-            This is where all of the commands are called for the DiscordClient
+            Commands are looked up in the command registry by their first word
         """
 
         if message.author == self.user:
             return
 
-        if len(message.content) < 1:
+        if len(message.content) < 1 or self.commandRegistry == None:
             return
 
-        if message.content[0] == '-':
-            # ---------- MARK: - Miscellaneous Commands ----------
-            if message.content.startswith('-hello'):
-                s = 'Hello ' + str(message.author) + '\n' + self.miscCommands.getRandomCompliment()
-                await message.channel.send(s)
-
-            elif message.content.startswith('-help'):
-                await message.channel.send(embed=self.miscCommands.getHelpMessage())
-
-            elif message.content.startswith('-rob'):
-                await message.channel.send("Rob is a qt3.14 :-)")
-
-            elif message.content.startswith('-patch'):
-                await message.channel.send(self.miscCommands.getPatchNotes())
-
-            elif message.content.startswith('-feedback'):
-                if len(message.content.split(" ", 1)) == 2:
-                    feedBack = message.content.split(" ", 1)
-                    await message.channel.send(self.miscCommands.sendFeedback(message.guild.id, message.author.id, feedBack[1]))
-                else: 
-                    await message.channel.send(embed=getUsageEmbed("-feedback [feedback message]"))
-
-            # ---------- MARK: - TimeLogger Commands ----------
-            elif message.content.startswith('-totallog'):
-                msg = message.content
-                msgAndPage = msg.split(" ")
-                if len(msgAndPage) == 2:
-                    await message.channel.send(embed=await self.timeLogger.getTotalLogEmbed(int(msgAndPage[1]), message.guild))
-                else:
-    	            await message.channel.send(embed=await self.timeLogger.getTotalLogEmbed(1, message.guild))
-
-            elif message.content.startswith('-todaylog'):
-                await message.channel.send(embed=await self.timeLogger.getTodayLogEmbed(message.guild))
-
-            elif message.content.startswith('-weeklog'):
-                msg = message.content
-                msgAndPage = msg.split(" ")
-                if len(msgAndPage) == 2:
-                    await message.channel.send(embed=await self.timeLogger.getWeekLogEmbed(int(msgAndPage[1]), message.guild))
-                else:
-                    await message.channel.send(embed=await self.timeLogger.getWeekLogEmbed(1, message.guild))
-
-            elif message.content.startswith('-mylog'):
-                await message.channel.send(embed=self.timeLogger.getMyLogEmbed(message.guild, message.author))
-
-            # ---------- MARK: - DiscordPoints Commands ----------
-            elif message.content.startswith('-points'):
-                msg = message.content
-                msgAndPage = msg.split(" ")
-                if len(msgAndPage) == 2:
-                    await message.channel.send(embed=await self.discordPoints.getDiscordPointsEmbed(int(msgAndPage[1]), message.guild))
-                else:
-    	            await message.channel.send(embed=await self.discordPoints.getDiscordPointsEmbed(1, message.guild))
-
-            elif message.content.startswith('-addreward'):
-                msg = message.content
-                commandAndReward = msg.split(" ", 1)
-
-                if (message.author.guild_permissions.administrator):
-                    if len(commandAndReward) == 2:
-                        await message.channel.send(embed=self.discordPoints.createNewReward(message.guild, commandAndReward[1]))
-                    else:
-                        await message.channel.send(embed=getUsageEmbed("-addreward [Desired Reward] [Price of the Reward]\n\nexample: -addreward CSGO with friends 500"))
-                else:
-                    await message.channel.send(embed=getMissingPermissionsEmbed("Oops.. you have to be an admin to use this command"))
-
-            elif message.content.startswith('-rewards'):
-                await message.channel.send(embed=self.discordPoints.getRewardsEmbed(message.guild))
-
-            elif message.content.startswith('-redeem'):
-                msg = message.content
-                commandAndRewardId = msg.split(" ")
-
-                if len(commandAndRewardId) == 2:
-                    await message.channel.send(embed=self.discordPoints.redeemReward(message.guild, message.author, commandAndRewardId[1]))
-                else:
-                    await message.channel.send(embed=getUsageEmbed("-redeemReward [Desired Reward Id]\n\nexample: -redeemReward 3"))
-
-            # ---------- MARK: - DiscordBet Commands ----------
-            elif message.content.startswith('-createbet'):
-                msg = message.content
-                commandAndBet = msg.split(" ", 1)
-                if len(commandAndBet) == 2:
-                    await message.channel.send(embed=await self.discordBets.createBet(message.guild, message.author, commandAndBet[1]))
-                else:
-                    await message.channel.send(embed=getUsageEmbed("-createbet [[Bet Description]] [[Option 1], [Option 2], ...]\n\nexample: -createbet [I will win this game] [yes, no]"))
-
-            elif message.content.startswith('-closebet'):
-                msg = message.content
-                commandAndBet = msg.split(" ")
-                if len(commandAndBet) == 2:
-                    await message.channel.send(embed=await self.discordBets.closeBet(message.guild, message.author, commandAndBet[1]))
-                else:
-                    await message.channel.send(embed=getUsageEmbed("-closebet [Bet Id]"))
-
-            elif message.content.startswith('-completebet'):
-                msg = message.content
-                commandAndBet = msg.split(" ")
-                if len(commandAndBet) == 3:
-                    await message.channel.send(embed=await self.discordBets.completeBet(message.guild, message.author, commandAndBet[1], commandAndBet[2]))
-                else:
-                    await message.channel.send(embed=getUsageEmbed("-completebet [Bet Id] [Winner Option Num]\n\nexample: -completebet 1 2"))
-
-            elif message.content.startswith('-allbets'):
-                await message.channel.send(embed=self.discordBets.getAllActiveBets(message.guild))
-
-            elif message.content.startswith('-bet'):
-                msg = message.content
-                commandAndBet = msg.split(" ", 1)
-                if len(commandAndBet) == 2:
-                    await message.channel.send(embed=await self.discordBets.bet(message.guild, message.author, commandAndBet[1]))
-                else: 
-                    await message.channel.send(embed=getUsageEmbed("-bet [bet id] [option number] [discord points amount]\n\n example: -bet 3 2 500"))
-
-            elif message.content.startswith('-mybets'):
-                await message.channel.send(embed=self.discordBets.showBetForUser(message.guild, message.author))
-
-            elif message.content.startswith('-showbet'):
-                msg = message.content
-                commandAndBet = msg.split(" ", 1)
-
-                if len(commandAndBet) == 2:
-                    await message.channel.send(embed=await self.discordBets.showBet(message.guild, commandAndBet[1]))
-                else: 
-                    await message.channel.send(embed=getUsageEmbed("-showbet [bet id]\n\n example: -showbet 7"))
-            elif message.content.startswith('-addpoints'):
-                msg = message.content
-                commandAndBet = msg.split(" ")
-                if len(commandAndBet) == 3:
-                    userid = commandAndBet[1]
-                    userid = userid[3:]
-                    userid = userid[:-1]
-                    print(userid)
-                    user = discord.Guild.get_member(message.guild, int(userid))
-                    await message.channel.send(embed=self.discordPoints.addPoints(message.guild, message.author, user, commandAndBet[2]))
-                else:
-                    await message.channel.send(embed=getUsageEmbed("-addpoints [UserID] [Amount]\n\nexample: -addpoints 1123123123123123123 200"))
-
-            elif message.content.startswith('-checkadmin'):
-                msg = message.content
-                commandAndBet = msg.split(" ")
-                if len(commandAndBet) == 2:
-                    userid = commandAndBet[1]
-                    userid = userid[3:]
-                    userid = userid[:-1]
-                    print(userid)
-                    user = discord.Guild.get_member(message.guild, int(userid))
-                    print(user)
-                    await message.channel.send(self.miscCommands.checkAdmin(message.author, user))
-                else:
-                    await message.channel.send(embed=getUsageEmbed("-checkadmin [@User]"))
\ No newline at end of file
+        await self.commandRegistry.dispatch(message)
+
+    def __register_commands(self):
+        """
+            Private helper function that builds the command registry
+
+            Every handler is called as handler(message, args) with the arguments already split
+        """
+
+        registry = CommandRegistry()
+
+        # ---------- MARK: - Miscellaneous Commands ----------
+        registry.register('-hello', self.__hello, description="hey :)")
+        registry.register('-help', self.__help, description="lists all commands")
+        registry.register('-rob', self.__rob, description=":-)")
+        registry.register('-patch', self.__patch, description="shows the patch notes")
+        registry.register('-feedback', self.__feedback, maxArgs=1, argCounts=(1,),
+                          usage="-feedback [feedback message]", description="sends feedback to the developers")
+        registry.register('-checkadmin', self.__check_admin, argCounts=(1,),
+                          usage="-checkadmin [@User]", description="checks if a user is an admin")
+        registry.register('-dbstats', self.__db_stats, adminOnly=True,
+                          description="database reads / writes for the server")
+
+        # ---------- MARK: - TimeLogger Commands ----------
+        registry.register('-totallog', self.__total_log, category="Time Logger",
+                          description="gets the tracked minutes in voice")
+        registry.register('-todaylog', self.__today_log, category="Time Logger",
+                          description="gets the tracked minutes for the day")
+        registry.register('-weeklog', self.__week_log, category="Time Logger",
+                          description="amount of time logged for the last 7 days")
+        registry.register('-mylog', self.__my_log, category="Time Logger",
+                          description="some cool stats")
+
+        # ---------- MARK: - DiscordPoints Commands ----------
+        registry.register('-points', self.__points, category="Discord Points",
+                          description="shows all of the points for each user in the Discord server")
+        registry.register('-addreward', self.__add_reward, category="Discord Points", maxArgs=1, argCounts=(1,), adminOnly=True,
+                          usage="-addreward [Desired Reward] [Price of the Reward]\n\nexample: -addreward CSGO with friends 500",
+                          description="add a reward for discord points")
+        registry.register('-rewards', self.__rewards, category="Discord Points",
+                          description="shows a list of all rewards for the Discord server")
+        registry.register('-redeem', self.__redeem, category="Discord Points", aliases=('-redeemReward',), argCounts=(1,),
+                          usage="-redeemReward [Desired Reward Id]\n\nexample: -redeemReward 3",
+                          description="redeem a reward")
+        registry.register('-addpoints', self.__add_points, category="Discord Points", argCounts=(2,),
+                          usage="-addpoints [UserID] [Amount]\n\nexample: -addpoints 1123123123123123123 200",
+                          description="add points to a user")
+
+        # ---------- MARK: - DiscordBet Commands ----------
+        registry.register('-createbet', self.__create_bet, category="Discord Bets", maxArgs=1, argCounts=(1,),
+                          usage="-createbet [[Bet Description]] [[Option 1], [Option 2], ...]\n\nexample: -createbet [I will win this game] [yes, no]",
+                          description="create a bet / prediction")
+        registry.register('-closebet', self.__close_bet, category="Discord Bets", argCounts=(1,),
+                          usage="-closebet [Bet Id]", description="closes a bet for submission")
+        registry.register('-completebet', self.__complete_bet, category="Discord Bets", argCounts=(2,),
+                          usage="-completebet [Bet Id] [Winner Option Num]\n\nexample: -completebet 1 2",
+                          description="completes the bet and pays points to the winner(s)")
+        registry.register('-allbets', self.__all_bets, category="Discord Bets",
+                          description="shows a list of all active bets")
+        registry.register('-bet', self.__bet, category="Discord Bets", maxArgs=1, argCounts=(1,),
+                          usage="-bet [bet id] [option number] [discord points amount]\n\n example: -bet 3 2 500",
+                          description="bet on an option in a particular prediction")
+        registry.register('-mybets', self.__my_bets, category="Discord Bets",
+                          description="shows a list of all active bets for the user")
+        registry.register('-showbet', self.__show_bet, category="Discord Bets", maxArgs=1, argCounts=(1,),
+                          usage="-showbet [bet id]\n\n example: -showbet 7",
+                          description="shows a particular bet and its options")
+
+        return registry
+
+    # ---------- MARK: - Command Handlers ----------
+    async def __hello(self, message, args):
+        s = 'Hello ' + str(message.author) + '\n' + self.miscCommands.getRandomCompliment()
+        await message.channel.send(s)
+
+    async def __help(self, message, args):
+        await message.channel.send(embed=self.miscCommands.getHelpMessage(self.commandRegistry.commands()))
+
+    async def __rob(self, message, args):
+        await message.channel.send("Rob is a qt3.14 :-)")
+
+    async def __patch(self, message, args):
+        await message.channel.send(self.miscCommands.getPatchNotes())
+
+    async def __feedback(self, message, args):
+        await message.channel.send(await self.miscCommands.sendFeedback(message.guild.id, message.author.id, args[0]))
+
+    async def __check_admin(self, message, args):
+        user = discord.Guild.get_member(message.guild, self.__mention_to_id(args[0]))
+        print(user)
+        await message.channel.send(self.miscCommands.checkAdmin(message.author, user))
+
+    async def __db_stats(self, message, args):
+        await message.channel.send(embed=await self.miscCommands.getDatabaseStatsEmbed(message.guild))
+
+    async def __total_log(self, message, args):
+        page = int(args[0]) if len(args) == 1 else 1
+        await message.channel.send(embed=await self.timeLogger.getTotalLogEmbed(page, message.guild))
+
+    async def __today_log(self, message, args):
+        await message.channel.send(embed=await self.timeLogger.getTodayLogEmbed(message.guild))
+
+    async def __week_log(self, message, args):
+        page = int(args[0]) if len(args) == 1 else 1
+        await message.channel.send(embed=await self.timeLogger.getWeekLogEmbed(page, message.guild))
+
+    async def __my_log(self, message, args):
+        await message.channel.send(embed=await self.timeLogger.getMyLogEmbed(message.guild, message.author))
+
+    async def __points(self, message, args):
+        page = int(args[0]) if len(args) == 1 else 1
+        await message.channel.send(embed=await self.discordPoints.getDiscordPointsEmbed(page, message.guild))
+
+    async def __add_reward(self, message, args):
+        await message.channel.send(embed=await self.discordPoints.createNewReward(message.guild, args[0]))
+
+    async def __rewards(self, message, args):
+        await message.channel.send(embed=await self.discordPoints.getRewardsEmbed(message.guild))
+
+    async def __redeem(self, message, args):
+        await message.channel.send(embed=await self.discordPoints.redeemReward(message.guild, message.author, args[0]))
+
+    async def __add_points(self, message, args):
+        user = discord.Guild.get_member(message.guild, self.__mention_to_id(args[0]))
+        await message.channel.send(embed=await self.discordPoints.addPoints(message.guild, message.author, user, args[1]))
+
+    async def __create_bet(self, message, args):
+        await message.channel.send(embed=await self.discordBets.createBet(message.guild, message.author, args[0]))
+
+    async def __close_bet(self, message, args):
+        await message.channel.send(embed=await self.discordBets.closeBet(message.guild, message.author, args[0]))
+
+    async def __complete_bet(self, message, args):
+        await message.channel.send(embed=await self.discordBets.completeBet(message.guild, message.author, args[0], args[1]))
+
+    async def __all_bets(self, message, args):
+        await message.channel.send(embed=await self.discordBets.getAllActiveBets(message.guild))
+
+    async def __bet(self, message, args):
+        await message.channel.send(embed=await self.discordBets.bet(message.guild, message.author, args[0]))
+
+    async def __my_bets(self, message, args):
+        await message.channel.send(embed=await self.discordBets.showBetForUser(message.guild, message.author))
+
+    async def __show_bet(self, message, args):
+        await message.channel.send(embed=await self.discordBets.showBet(message.guild, args[0]))
+
+    def __mention_to_id(self, mention):
+        """
+            Private helper function to turn a mention (<@!id>) into the user id
+        """
+
+        return int(mention[3:-1])
+
+
+def defaultIntents():
+    """
+    The gateway intents the bot needs (member events for the member directory)
+
+    Returns
+    ----------
+    discord.Intents
+    """
+
+    intents = discord.Intents.default()
+    intents.members = True
+    return intents
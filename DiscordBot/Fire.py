@@ -1,62 +1,142 @@
-import firebase_admin
 from datetime import datetime
-from firebase_admin import credentials, firestore
+from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
 from collections import OrderedDict
-import json
-from datetime import datetime
-from pytz import timezone
+import copy
 import datetime as dt
-from firebase_config import firebase_config_dict
+import os
+import time
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from Storage.GuildCache import GuildCache, GuildState
+from Storage.RollingWindow import RollingWindow, windowDays
+from Storage.UserStats import UserStats
+from Storage.DocumentSize import documentSize
+from Storage.Accounting import Accounting, currentActivity
+from Storage.SingleFlight import SingleFlight
+from Storage.BetIndex import BetIndex
+from Storage.Settlement import parimutuelPayouts
+from Storage.StorageBackend import createBackend
+from MemberDirectory import MemberDirectory
 
 class Fire:
     """
-    Creates an instance of the Google Firebase
+    Creates an instance of the Google Firebase (or another storage backend, see Storage.StorageBackend)
+
+    Every function is a coroutine; blocking calls to the database run on a bounded
+    executor so a slow round trip never stalls the gateway event loop
 
     Attributes
     __________
-    __db (private firebase.client obj): database for POST and GET requests
+    __db (private StorageBackend obj): database for POST and GET requests
+    __executor (private ThreadPoolExecutor obj): bounded pool that runs the blocking __db calls
+    __cache (private GuildCache obj): write-behind cache of the tick-driven documents
+    __flights (private SingleFlight obj): shares one read between concurrent identical fetches
+    __betIndexes (private OrderedDict obj): { guild.id: BetIndex } the bets by id, creator and status,
+        updated by every bet command (so listing or showing a bet rarely reads __db)
+    flushInterval (int): Seconds between flushes of the cache to __db
+    memberDirectory (MemberDirectory obj): display names kept current by the gateway member events
+    ioListeners (list): Functions called as listener('read' or 'write', document path, bytes) for
+        every document a __db call reads or writes
+    accounting (Accounting obj): reads, writes and bytes per guild, document and command
+    changeListeners (list): Functions called as listener(guild.id, document name) after a command
+        changed a document (used to invalidate rendered views)
 
     Functions
     __________
-    incrementTimes(guild, members)
-        Increment time accumulation for *total* and *day* in __db
-    fetchAllMembers(guild) -> dict: { discord.member.id: discord.member.display_name }
-        Fetch all members in the guild
-    fetchTotalTimes(guild) -> dict: { discord.member.id: int }
-        Fetch total time for members in the guild
-    fetchAllDateTimes(guild) -> dict: { date: { discord.member.id: int } }
-        Fetch all members' times organized by date
-    fetchDiscordPoints(guild) -> dict: { discord.member.id: int }
-        Fetch all members' discord points for the server
-    postNewDiscordPoints(guild, user, newPoints)
-        Updates the discord points for a user
-    postNewReward(guild, rewardTitle, rewardCost)
+    async incrementTimes(guild, memberMinutes)
+        Increment time accumulation for *total* and *day* in the cache
+    async flushIfDue(guildId)
+        Flush the cached guilds that were last flushed flushInterval seconds ago or more
+    async flush()
+        Flush every cached guild with unflushed changes to __db
+    async close()
+        Flush the cache, shut down the executor and close __db
+    async fetchDocumentSizes(guild) -> dict: { document(str): int }
+        Fetch the current size in bytes of the guild's main documents
+    async fetchAllMembers(guild) -> dict: { discord.member.id: discord.member.display_name }
+        Fetch all members in the guild from the member directory (no REST calls)
+    async fetchLeaderboardPage(guild, metric, page, pageSize) -> [(rank, id, value)], page(int), pages(int)
+        Fetch one page of the 'total', 'today' or 'points' leaderboard
+    async fetchRank(guild, metric, userId) -> rank(int), value(int)
+        Fetch a member's position on a leaderboard
+    async fetchTop(guild, metric, n) -> [(rank, id, value)]
+        Fetch the n highest members on a leaderboard
+    async fetchUserStats(guild, userId) -> dict
+        Fetch a member's stats record (total, today, longest day, streak, last seen)
+    async fetchWindowPage(guild, numDays, page, pageSize) -> [(rank, id, value)], page(int), pages(int), firstDate(str), lastDate(str)
+        Fetch one page of the members' summed times over the last numDays days
+    async postNewReward(guild, rewardTitle, rewardCost)
         Pushes a new reward to the database
-    fetchAllRewards(guild) -> dict: { rewardTitle(str) : cost(int) }
+    async postRedeemReward(guild, userId, rewardTitle) -> rewardCost(int), points(int), errorString(str)
+        Takes the cost of a reward from the user's discord points
+    async postAddPoints(guild, userId, points) -> points(int), errorString(str)
+        Adds points to a user's discord points
+    async fetchAllRewards(guild) -> dict: { rewardTitle(str) : cost(int) }
         Shows all Discord Points rewards for the guild
-    fetchAllBets(guild) -> dict: { betId(int): betDict(dict) }
-        Shows all proposed bets for the guild
-    postNewBet(guild, userId, betTitle, betOptions, betStartedAt) -> betId(int)
+    async fetchBet(guild, betId) -> betDict(dict)
+        Fetch a single bet (active or completed)
+    async fetchActiveBets(guild) -> [dict]
+        Fetch the guild's active bets, ordered by id
+    async fetchBetsByCreator(guild, userId) -> [dict]
+        Fetch the active bets a member started, ordered by id
+    async postNewBet(guild, userId, betTitle, betOptions, betStartedAt) -> betId(int)
         Creates a new bet in the database
-    postCloseBet(guild, user, betId) -> betDict(str), errorString(str)
+    async postCloseBet(guild, user, betId) -> betDict(str), errorString(str)
         Marks a bet as closed in the database
-    async def postCompleteBet(guild, user, betId, winningOptionId) ->  betDict(dict), userRewards(dict), errorString(str)
+    async postCompleteBet(guild, user, betId, winningOptionId) ->  betDict(dict), userRewards(dict: { discord.member.id(str): int }), errorString(str)
         Marks a bet as completed in the database and pays out the winners
-    postBet(guild, user, betId, betOption, betAmount) -> betDict(dict), errorString(str)
+    async postBet(guild, user, betId, betOption, betAmount) -> betDict(dict), errorString(str)
         Adds an amount for the user for a bet option to the database
-    postFeedback(guild, userId, feedbackString)
+    async postFeedback(guild, userId, feedbackString)
         Posts feedback to the database for the guild/userId
 
     """
 
     __db = None
+    __cache = None
+    __executor = None
+    flushInterval = 300
+    memberDirectory = None
+    ioListeners = None
+    accounting = None
+    changeListeners = None
+
+    def __init__(self, db=None):
+        """
+        Parameters
+        ----------
+        db : StorageBackend obj (optional)
+            Backend to use instead of the one selected by FIRE_BACKEND ('firestore', 'sqlite' or
+            'memory'), e.g. Storage.MemoryFirestore for offline runs
+        """
 
-    def __init__(self):
-        # Checks to see if Firebase was already initialized in the applicaiton
-        if not firebase_admin._apps:
-            cred = credentials.Certificate(firebase_config_dict)
-            firebase_admin.initialize_app(cred)
-        self.__db = firestore.client()
+        if db == None:
+            db = createBackend()
+        self.__db = db
+
+        # Every blocking call to __db runs here instead of on the event loop
+        self.__executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('FIRE_MAX_WORKERS', 8)),
+            thread_name_prefix='fire',
+        )
+
+        self.memberDirectory = MemberDirectory()
+        self.__flights = SingleFlight()
+        self.__betIndexes = OrderedDict()
+        self.accounting = Accounting()
+        self.ioListeners = [self.accounting.record]
+        self.changeListeners = []
+
+        self.flushInterval = int(os.getenv('FIRE_FLUSH_INTERVAL', 300))
+        # { guild.id: GuildState } dropped from __cache whose last flush is still running
+        self.__evicting = {}
+        self.__cache = GuildCache(
+            maxGuilds=int(os.getenv('FIRE_CACHE_MAX_GUILDS', 1000)),
+            maxEntries=int(os.getenv('FIRE_CACHE_MAX_ENTRIES', 500000)),
+        )
 
     async def fetchAllMembers(self, guild):
         """
@@ -72,146 +152,257 @@ class Fire:
         dict: { discord.member.id: discord.member.display_name }
         """
 
-        member_dict = {}
-        async for member in guild.fetch_members():
-            member_dict[member.id] = member.display_name
-
-        return member_dict
+        return self.memberDirectory.displayNames(guild)
 
-    def fetchTotalTimes(self, guild):
+    async def incrementTimes(self, guild, memberMinutes):
         """
-        Fetch total times for members in the guild
+        Increment time accumulation for *total* and *day* in the cache
+
+        The changes are written to __db by flushIfDue() / flush()
 
         Parameters
         ----------
         guild : discord.Guild
-            The server that we want to get information from
+            The server that the members belong to
+        memberMinutes : dict: { discord.member.id(str): int }
+            Minutes to add for each member
+        """
 
-        Returns
+        if memberMinutes == None or memberMinutes == {}:
+            return
+
+        state = await self.__loadState(guild)
+
+        self.__updateTotalTimes(state, memberMinutes)
+        self.__updateDayTimes(state, memberMinutes)
+        if len(memberMinutes) >= 1:
+            self.__increaseDiscordPoints(state, memberMinutes)
+
+
+    async def flushIfDue(self, guildId=None):
+        """
+        Flush the cached guilds that were last flushed flushInterval seconds ago or more
+
+        Every guild keeps its own flush time, so guilds that are ticked at different
+        moments also reach the database at different moments instead of all at once
+
+        Parameters
         ----------
-        dict: { discord.member.id: int }
+        guildId : int (optional)
+            Only consider this guild
         """
 
-        try:
-            doc_ref = self.__db.collection(str(guild.id)).document('total')
-            d = doc_ref.get().to_dict()
+        now = time.monotonic()
 
-            if d == None:
-                return {}
+        if guildId != None:
+            state = self.__cache.get(guildId)
+            states = [(guildId, state)] if state != None and state.dirty else []
+        else:
+            states = self.__cache.dirtyStates()
 
-            d = d['users']
+        for guildId, state in states:
+            if now - state.lastFlush >= self.flushInterval:
+                await self.__flushState(guildId, state)
 
-            return d
-        except:
-            print('Error in fetchTotalTimes')
-            return {}
+    async def flush(self):
+        """
+        Flush every cached guild with unflushed changes to __db
+
+        Called on the flush interval, on shutdown and before a guild is evicted from the cache
+        """
 
+        for guildId, state in self.__cache.dirtyStates():
+            await self.__flushState(guildId, state)
 
-    def incrementTimes(self, guild, members):
+        # Evicted states whose flush failed are retried too
+        for guildId, state in list(self.__evicting.items()):
+            if state.dirty and not guildId in self.__cache:
+                await self.__flushState(guildId, state)
+                if not state.dirty and self.__evicting.get(guildId) is state:
+                    del self.__evicting[guildId]
+
+    async def close(self):
+        """
+        Flush the cache, shut down the executor and close __db
+        """
+
+        await self.flush()
+        self.__executor.shutdown(wait=True)
+
+        close = getattr(self.__db, 'close', None)
+        if close != None:
+            close()
+
+# ---------------------- Leaderboards ---------------------------
+    async def fetchLeaderboardPage(self, guild, metric, page, pageSize=20):
         """
-        Increment time accumulation for *total* and *day* in __db
+        Fetch one page of a leaderboard
+
+        The leaderboards are kept sorted by the tick and the point mutations, so
+        no sorting happens here
 
         Parameters
         ----------
         guild : discord.Guild
-            The server that the members belong to
-        members : list(discord.Member)
-            Update times for these users
-        """
-
-        if members == None or members == []:
-            return
+            The server that we want to get information from
+        metric : str
+            'total', 'today' or 'points'
+        page : int
+            1-based page number (out of range pages show the first page)
+        pageSize : int
+            Number of entries per page
 
-        self.__updateTotalTimes(guild, members)
-        self.__updateDayTimes(guild, members)
-        if len(members) >= 1:
-            self.__increaseDiscordPoints(guild, members)
+        Returns
+        ----------
+        rows: [(rank, discord.member.id(str), int)]
+        page: int
+        pages: int
+        """
 
+        state = await self.__loadState(guild)
+        return state.leaderboard(metric).page(page, pageSize)
 
-    def fetchAllDateTimes(self, guild):
+    async def fetchRank(self, guild, metric, userId):
         """
-        Fetch all members' times organized by date
+        Fetch a member's position on a leaderboard
 
         Parameters
         ----------
         guild : discord.Guild
             The server that we want to get information from
+        metric : str
+            'total', 'today' or 'points'
+        userId : int
+            The id of the member
 
         Returns
         ----------
-        dict: { date: { discord.member.id: int } }
+        rank: int (None if the member is not on the leaderboard)
+        value: int
         """
 
-        try:
-            doc_ref = self.__db.collection(str(guild.id)).document('date')
-            d = doc_ref.get().to_dict()
+        board = (await self.__loadState(guild)).leaderboard(metric)
+        return board.rank(userId), board.score(userId)
 
-            if d == None:
-                return {}
+    async def fetchTop(self, guild, metric, n):
+        """
+        Fetch the n highest members on a leaderboard
 
-            # Sort the data by most recent date
-            ordered_data = OrderedDict(sorted(d.items(), key = lambda x:datetime.strptime(x[0], '%m/%d/%Y'), reverse=True))
-            return ordered_data
-        except:
-            print("FetchAllDateTimes Error")
-            return {}
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want to get information from
+        metric : str
+            'total', 'today' or 'points'
+        n : int
 
-# --------------------- Discord Points --------------------------
-    def fetchDiscordPoints(self, guild):
+        Returns
+        ----------
+        [(rank, discord.member.id(str), int)]
+        """
+
+        state = await self.__loadState(guild)
+        return state.leaderboard(metric).top(n)
+
+    async def fetchUserStats(self, guild, userId):
         """
-        Fetch all members' discord points in the server
+        Fetch a member's stats record
+
+        The record is kept current by the tick, so this is a single lookup no matter
+        how much history the guild has
 
         Parameters
         ----------
         guild : discord.Guild
             The server that we want to get information from
+        userId : int
+            The id of the member
 
         Returns
         ----------
-        dict: { discord.member.id: int }
+        dict: { total: int, today: int, maxDay: int, maxDate: str, streak: int, lastSeen: str }
+            today and streak are 0 when the member was not logged today / yesterday
+            (None if the member has never been logged)
         """
 
-        try:
-            doc_ref = self.__db.collection(str(guild.id)).document('discordPoints')
-            d = doc_ref.get().to_dict()
+        state = await self.__loadState(guild)
+        record = state.userStats.get(str(userId))
 
-            if d == None:
-                return {}
+        if record == None:
+            return None
 
-            return d
-        except:
-            print('Error in fetchDiscordPoints')
-            return {}
+        return {
+            'total': record['total'],
+            'today': record['today'] if record['todayDate'] == state.dayKey else 0,
+            'maxDay': record['maxDay'],
+            'maxDate': self.__displayDate(record['maxDate']) if record['maxDate'] else '',
+            'streak': UserStats.currentStreak(record, state.dayKey),
+            'lastSeen': record['lastSeen'],
+        }
 
-    def postNewDiscordPoints(self, guild, userid, newPoints):
+    async def fetchWindowPage(self, guild, numDays, page, pageSize=20):
         """
-        Updates the discord points for a user
+        Fetch one page of the members' summed times over the last numDays days
+
+        The window is read from the day documents once and then kept current by the
+        tick and the daily rollover
 
         Parameters
         ----------
-        guild     : discord.Guild
-            The server that we want to push information to
-        user      : discord.Member if in guild, discord.User otherwise
-            The user whose points should be updated
-        newPoints : int
-            The updated amount of points the user should have
+        guild : discord.Guild
+            The server that we want to get information from
+        numDays : int
+            Length of the window in days (7 for the week)
+        page : int
+            1-based page number (out of range pages show the first page)
+        pageSize : int
+            Number of entries per page
+
+        Returns
+        ----------
+        rows: [(rank, discord.member.id(str), int)]
+        page: int
+        pages: int
+        firstDate: str
+            '%m/%d/%Y' day at the start of the window
+        lastDate: str
+            '%m/%d/%Y' day at the end of the window
         """
-        try:
-            doc_ref = self.__db.collection(str(guild.id)).document('discordPoints')
-            d = doc_ref.get().to_dict()
 
-            if d == None:
-                return {}
+        state = await self.__loadState(guild)
+        window = state.windows.get(numDays)
 
-            d[userid] = newPoints
+        if window == None:
+            dayKeys = windowDays(state.dayKey, numDays)
+            days = {}
 
-            doc_ref.set(d)
-        except Exception as e:
-            print(e)
-            print('Error in postNewDiscordPoints')
-            return {}
+            refs = [self.__dayDocument(guild.id, dayKey) for dayKey in dayKeys[1:]]
+
+            # No flush may take the older days' pending minutes between reading them and their documents
+            async with state.flushLock:
+                for snapshot in await self.__io(self.__db.get_all, refs):
+                    days[snapshot.id] = snapshot.to_dict() or {}
+
+                # Minutes from before the rollover can still be waiting for the next flush
+                for dayKey in dayKeys[1:]:
+                    for userId, minutes in state.pendingDays.get(dayKey, {}).items():
+                        day = days.setdefault(dayKey, {})
+                        day[userId] = int(day.get(userId, 0)) + minutes
+
+            # Today comes from the cache (read after the await so no tick is missed)
+            days[state.dayKey] = state.today
 
-    def postNewReward(self, guild, rewardTitle, rewardCost):
+            window = state.windows.get(numDays)
+            if window == None:
+                window = RollingWindow(numDays, state.dayKey, days)
+                state.windows[numDays] = window
+
+        rows, page, pages = window.leaderboard.page(page, pageSize)
+
+        return rows, page, pages, self.__displayDate(window.firstDay()), self.__displayDate(window.lastDay)
+
+# --------------------- Discord Points --------------------------
+    async def postNewReward(self, guild, rewardTitle, rewardCost):
         """
         Pushes a new reward to the database
 
@@ -226,13 +417,10 @@ class Fire:
         """
         doc_ref = self.__db.collection(str(guild.id)).document('rewards')
 
-        rewards_dict = self.fetchAllRewards(guild)
-        rewards_dict[rewardTitle] = rewardCost
+        await self.__io(doc_ref.set, {rewardTitle: rewardCost}, merge=True)
+        self.__documentChanged(guild.id, 'rewards')
 
-        doc_ref.set(rewards_dict)
-
-
-    def fetchAllRewards(self, guild):
+    async def fetchAllRewards(self, guild):
         """
         Shows all Discord Points rewards for the guild
 
@@ -243,7 +431,7 @@ class Fire:
         """
         try:
             doc_ref = self.__db.collection(str(guild.id)).document('rewards')
-            d = doc_ref.get().to_dict()
+            d = await self.__readDocument(doc_ref)
 
             if d == None:
                 return {}
@@ -252,36 +440,208 @@ class Fire:
         except:
             return {}
 
+    async def postRedeemReward(self, guild, userId, rewardTitle):
+        """
+        Takes the cost of a reward from the user's discord points
+
+        The reward, the balance check and the new balance are one transaction, so
+        concurrent redemptions can never spend the same points twice
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want to push information to
+        userId : str
+            The id of the user redeeming the reward
+        rewardTitle : str
+            The reward to redeem
+
+        Returns
+        ----------
+        rewardCost: int
+            The cost of the reward (None if it does not exist)
+        points: int
+            The user's points after redeeming (before if they do not have enough)
+        errorString: str
+            The string representing the error if one occurred
+        """
+        collection = self.__db.collection(str(guild.id))
+        rewards_doc_ref = collection.document('rewards')
+        points_doc_ref = collection.document('discordPoints')
+        userField = [self.__fieldPath(userId)]
+
+        def redeem(transaction, pending):
+            rewards = transaction.get(rewards_doc_ref).to_dict() or {}
+            points = self.__pointBalance(pending, transaction.get(points_doc_ref, field_paths=userField).to_dict() or {}, userId)
+
+            if not rewardTitle in rewards:
+                return None, points, "Not a valid reward"
+
+            rewardCost = int(rewards[rewardTitle])
+            if points == None or points < rewardCost:
+                return rewardCost, points or 0, "Not enough points"
+
+            transaction.set(points_doc_ref, self.__increments({userId: pending - rewardCost}), merge=True)
+
+            return rewardCost, points - rewardCost, None
+
+        try:
+            rewardCost, points, error = await self.__pointsTransaction(guild.id, userId, redeem)
+
+            if error == None:
+                self.__pointsChanged(guild.id, {userId: -rewardCost})
+
+            return rewardCost, points, error
+        except Exception as e:
+            print(e)
+            print('Error in postRedeemReward')
+
+            return None, None, "Error redeeming the reward in the database"
+
+    async def postAddPoints(self, guild, userId, points):
+        """
+        Adds points to (or, when negative, takes them from) a user's discord points
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want to push information to
+        userId : str
+            The id of the user
+        points : int
+            The amount of points to add
+
+        Returns
+        ----------
+        points: int
+            The user's points afterwards
+        errorString: str
+            The string representing the error if one occurred
+        """
+        points_doc_ref = self.__db.collection(str(guild.id)).document('discordPoints')
+        userField = [self.__fieldPath(userId)]
+
+        def addPoints(transaction, pending):
+            balance = self.__pointBalance(pending, transaction.get(points_doc_ref, field_paths=userField).to_dict() or {}, userId)
+
+            if balance == None:
+                return None, "User ID not correct"
+
+            transaction.set(points_doc_ref, self.__increments({userId: pending + points}), merge=True)
+
+            return balance + points, None
+
+        try:
+            newPoints, error = await self.__pointsTransaction(guild.id, userId, addPoints)
+
+            if error == None:
+                self.__pointsChanged(guild.id, {userId: points})
+
+            return newPoints, error
+        except Exception as e:
+            print(e)
+            print('Error in postAddPoints')
+
+            return None, "Error adding points in the database"
+
 # ---------------------- Discord Bets ---------------------------
-    def fetchAllBets(self, guild):
+    async def fetchBet(self, guild, betId):
         """
-        Fetch all bets within the discord
+        Fetch a single bet (active or completed)
+
+        The bet is read from __db only the first time, afterwards it comes from the bet index
 
         Parameters
         ----------
         guild : discord.Guild
             The server that we want to get information from
+        betId : str
+            The id of the bet
 
         Returns
         ----------
-        d: { betId(int): betDict(dict) }
+        betDict: dict (None if there is no bet with that id), which must not be modified
         """
 
         try:
-            doc_ref = self.__db.collection(str(guild.id)).document('bets')
-            d = doc_ref.get().to_dict()
+            if not self.__isBetId(betId):
+                return None
 
-            if d == None:
-                return {}
+            betIndex = await self.__betIndex(guild.id)
+            bet = betIndex.bet(betId)
+            if bet != None:
+                return bet
 
-            return d
-        except:
-            return {}
+            # A bet changed while it was read is not indexed, the next fetch reads it again
+            revision = betIndex.revision(betId)
+            active_ref, archive_ref = self.__betDocuments(guild.id, betId)
+
+            bet = await self.__readDocument(active_ref)
+            if bet == None:
+                bet = await self.__readDocument(archive_ref)
+
+            if bet != None:
+                betIndex.put(bet, revision)
+
+            return bet
+        except Exception as e:
+            print(e)
+            print('Error in fetchBet')
+            return None
+
+    async def fetchActiveBets(self, guild):
+        """
+        Fetch the guild's active (open or closed, not completed) bets from the bet index
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want to get information from
+
+        Returns
+        ----------
+        bets: [{ 'betId': int, 'betTitle': str, 'startedBy': int, 'closed': bool, ... }] ordered by id,
+            which must not be modified
+        """
+
+        try:
+            return (await self.__betIndex(guild.id)).byStatus('open', 'closed')
+        except Exception as e:
+            print(e)
+            print('Error in fetchActiveBets')
+            return []
+
+    async def fetchBetsByCreator(self, guild, userId):
+        """
+        Fetch the active bets a member started from the bet index
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want to get information from
+        userId : int
+            The id of the member that started the bets
+
+        Returns
+        ----------
+        bets: [{ 'betId': int, 'betTitle': str, 'startedBy': int, 'closed': bool, ... }] ordered by id,
+            which must not be modified
+        """
+
+        try:
+            return (await self.__betIndex(guild.id)).byCreator(userId)
+        except Exception as e:
+            print(e)
+            print('Error in fetchBetsByCreator')
+            return []
 
-    def postNewBet(self, guild, userId, betTitle, betOptions, betStartedAt):
+    async def postNewBet(self, guild, userId, betTitle, betOptions, betStartedAt):
         """
         Create a new bet in the database
 
+        The bet counter is read and bumped in one transaction, so two bets started at the
+        same moment never get the same id
+
         Parameters
         ----------
         guild : discord.Guild
@@ -300,17 +660,13 @@ class Fire:
         betId: int
             An int representing the id of the bet we just created
         """
-        try:
-            doc_ref = self.__db.collection(str(guild.id)).document('bets')
+        index_ref = self.__db.collection(str(guild.id)).document('bets')
 
-            d = self.fetchAllBets(guild)
-
-            if 'numBets' in d:
-                d['numBets'] = int(d['numBets']) + 1
-            else: 
-                d['numBets'] = 1
-
-            d[str(d['numBets'])] = {
+        def createBet(transaction):
+            # Only the index is read, the bets themselves are separate documents
+            index = transaction.get(index_ref, field_paths=['numBets']).to_dict() or {}
+            numBets = int(index.get('numBets', 0)) + 1
+            bet = {
                 "acceptedBy": {},
                 "options": betOptions,
                 "betTitle": betTitle,
@@ -319,20 +675,32 @@ class Fire:
                 "completed": False,
                 "winningOption": "",
                 "closed": False,
-                "betId" : d['numBets'],
+                "betId" : numBets,
             }
 
-            doc_ref.set(d)
+            transaction.set(self.__betDocuments(guild.id, str(numBets))[0], bet)
+            transaction.set(index_ref, {
+                'numBets': numBets,
+                'active': {str(numBets): self.__betSummary(bet)},
+            }, merge=True)
+
+            return numBets, bet
+
+        try:
+            await self.__betIndex(guild.id)
+            numBets, bet = await self.__transaction(createBet)
+            (await self.__betIndex(guild.id)).put(copy.deepcopy(bet))
+            self.__documentChanged(guild.id, 'bets')
 
             # We return the value of the betId that we just created (based off of numBets)
-            return d['numBets']
+            return numBets
         except Exception as e:
             print(e)
             print("Error posting new bet to Firebase")
             
             return -1
 
-    def postCloseBet(self, guild, userId, betId):
+    async def postCloseBet(self, guild, userId, betId):
         """
         Marks a bet as 'closed' within the database
 
@@ -352,20 +720,35 @@ class Fire:
         errorString: str
             The string representing the error if one occurred
         """
+        if not self.__isBetId(betId):
+            return None, "Not a valid Bet Id"
 
-        try:
-            bet_doc_ref = self.__db.collection(str(guild.id)).document('bets')
-            betDict = bet_doc_ref.get().to_dict()
+        index_ref = self.__db.collection(str(guild.id)).document('bets')
+        active_ref, archive_ref = self.__betDocuments(guild.id, betId)
 
-            if not betId in betDict:
-                return None, "Not a valid Bet Id"
-            if betDict[betId]['startedBy'] != userId and not userId.guild_permissions.administrator:
+        def closeBet(transaction):
+            bet = transaction.get(active_ref).to_dict()
+
+            if bet == None:
+                return None, self.__missingBetError(transaction, archive_ref)
+            if bet['startedBy'] != userId and not userId.guild_permissions.administrator:
                 return None, "Only the person that started the bet or an admin can close submissions for the bet"
 
-            betDict[betId]["closed"] = True
-            bet_doc_ref.set(betDict)
+            bet["closed"] = True
+            transaction.update(active_ref, {"closed": True})
+            transaction.update(index_ref, {self.__fieldPath("active", betId, "closed"): True})
+
+            return bet, None
 
-            return betDict[betId], None
+        try:
+            await self.__betIndex(guild.id)
+            bet, error = await self.__transaction(closeBet)
+
+            if error == None:
+                (await self.__betIndex(guild.id)).close(betId)
+                self.__documentChanged(guild.id, 'bets')
+
+            return bet, error
         except Exception as e:
             print(e)
             print("Error closing bet")
@@ -374,7 +757,12 @@ class Fire:
 
     async def postCompleteBet(self, guild, user, betId, winningOptionId):
         """
-        Marks a bet as 'completed' within the database
+        Marks a bet as 'completed' within the database and moves it to the archive
+
+        The check that the bet is still open, the payout and the winners' points are one
+        transaction, so a bet that is completed twice at the same time only pays out once.
+        The pool is split exactly (see Storage.Settlement) and all winners' points are one
+        write of increments, so the points document is never read.
 
         Parameters
         ----------
@@ -391,70 +779,69 @@ class Fire:
         ----------
         betDict: dict
             The bet we attempted to complete
-        userRewards: dict {userId : amountWon}
+        userRewards: dict {userId(str) : amountWon}
             The dictionary with ids representing how many points each user won 
         errorString: str
             The string representing the error if one occurred
         """
-        
-        try:
-            bet_doc_ref = self.__db.collection(str(guild.id)).document('bets')
-            points_doc_ref = self.__db.collection(str(guild.id)).document('discordPoints')
+        if not self.__isBetId(betId):
+            return None, None, "Not a valid Bet Id"
 
-            betDict = bet_doc_ref.get().to_dict()
-            pointsDict = points_doc_ref.get().to_dict()
-            memberDict = await self.fetchAllMembers(guild)
+        collection = self.__db.collection(str(guild.id))
+        index_ref = collection.document('bets')
+        points_doc_ref = collection.document('discordPoints')
+        active_ref, archive_ref = self.__betDocuments(guild.id, betId)
 
-            userId = str(user.id)
+        def completeBet(transaction):
+            bet = transaction.get(active_ref).to_dict()
 
-            if not betId in betDict:
-                return None, None, "Not a valid Bet Id"
-            elif betDict[betId]['startedBy'] != user.id and not user.guild_permissions.administrator:
+            if bet == None:
+                return None, None, self.__missingBetError(transaction, archive_ref)
+            elif bet['startedBy'] != user.id and not user.guild_permissions.administrator:
                 return None, None, "Only the person that started the bet or an admin can complete/payout the bet"
-            elif betDict[betId]["completed"]:
-                return None, None, "Bet has already been completed"
-            elif int(winningOptionId) > len(betDict[betId]["options"]) or int(winningOptionId) <= 0:
+            elif int(winningOptionId) > len(bet["options"]) or int(winningOptionId) <= 0:
                 return None, None, "Not a valid Bet Option"
 
-            optionList = sorted(list(betDict[betId]["options"].keys()))
-            betDict[betId]["completed"] = True
-            betDict[betId]["winningOption"] = optionList[int(winningOptionId)-1]
+            optionList = sorted(list(bet["options"].keys()))
+            bet["completed"] = True
+            bet["winningOption"] = optionList[int(winningOptionId)-1]
 
-            # Calculate the total amount of points in the pool
-            totalPointAmount = 0
-            for key in betDict[betId]["options"]:
-                totalPointAmount += int(betDict[betId]["options"][key])
+            pointIncrements = parimutuelPayouts(bet["acceptedBy"], bet["options"], bet["winningOption"])
 
-            # Calculate the multipliers for each option
-            totalPointMultipliers = {}
-            for key in betDict[betId]["options"]:
-                if int(betDict[betId]["options"][key]) != 0:
-                    totalPointMultipliers[key] = totalPointAmount / int(betDict[betId]["options"][key])
-            
-            # Calculate the rewards for each user
-            userRewards = {}
-            for key in betDict[betId]["acceptedBy"]:
-                userBet = betDict[betId]["acceptedBy"][key]
-                if userBet["betOption"] == betDict[betId]["winningOption"]:
-                    pointAmount = int(int(userBet["amount"]) * totalPointMultipliers[userBet["betOption"]])
-                    userRewards[memberDict[int(key)]] = pointAmount
-                    print(pointsDict)
-                    pointsDict[str(key)] = int(pointsDict[str(key)]) + pointAmount
-
-            bet_doc_ref.set(betDict)
-            points_doc_ref.set(pointsDict)
-
-            return betDict[betId], userRewards, None
+            # Completed bets leave the active bets for the archive
+            transaction.set(archive_ref, bet)
+            transaction.delete(active_ref)
+            transaction.update(index_ref, {self.__fieldPath("active", betId): firestore.DELETE_FIELD})
+            if pointIncrements:
+                transaction.set(points_doc_ref, self.__increments(pointIncrements), merge=True)
+
+            return bet, pointIncrements, None
+
+        try:
+            await self.__betIndex(guild.id)
+            bet, pointIncrements, error = await self.__transaction(completeBet)
+
+            if error != None:
+                return None, None, error
+
+            (await self.__betIndex(guild.id)).put(copy.deepcopy(bet))
+            self.__documentChanged(guild.id, 'bets')
+            self.__pointsChanged(guild.id, pointIncrements)
+
+            return bet, pointIncrements, None
         except Exception as e:
             print(e)
             print("Error completing bet")
 
             return None, None, "Error completing bet in the database"
 
-    def postBet(self, guild, user, betId, betOption, betAmount):
+    async def postBet(self, guild, user, betId, betOption, betAmount):
         """
         Adds a bet for a user to an open bet
 
+        The balance check, the option totals and the user's points are one transaction,
+        so bets placed at the same moment never overwrite each other
+
         Parameters
         ----------
         guild : discord.Guild
@@ -475,39 +862,61 @@ class Fire:
         errorString: str
             The string representing the error if one occurred
         """
-        try:
-            bet_doc_ref = self.__db.collection(str(guild.id)).document('bets')
-            points_doc_ref = self.__db.collection(str(guild.id)).document('discordPoints')
+        if not self.__isBetId(betId):
+            return None, "Not a valid Bet Id"
 
-            betDict = self.fetchAllBets(guild)
-            pointsDict = self.fetchDiscordPoints(guild)
-            userId = str(user.id)
+        points_doc_ref = self.__db.collection(str(guild.id)).document('discordPoints')
+        active_ref, archive_ref = self.__betDocuments(guild.id, betId)
+        userId = str(user.id)
+        userField = [self.__fieldPath(userId)]
 
-            if not userId in pointsDict or int(pointsDict[userId]) < betAmount:
+        def placeBet(transaction, pending):
+            bet = transaction.get(active_ref).to_dict()
+            points = self.__pointBalance(pending, transaction.get(points_doc_ref, field_paths=userField).to_dict() or {}, userId)
+
+            if points == None or points < betAmount:
                 return None, "Not discord points"
-            elif not betId in betDict:
-                return None, "Not a valid Bet Id"
-            elif betDict[betId]["closed"] or betDict[betId]["completed"]:
+            elif bet == None:
+                return None, "Not a valid Bet Id" if not transaction.get(archive_ref).exists else "Bet no longer has open submissions"
+            elif bet["closed"] or bet["completed"]:
                 return None, "Bet no longer has open submissions"
-            elif int(betOption) > len(betDict[betId]["options"]) or int(betOption) <= 0:
+            elif int(betOption) > len(bet["options"]) or int(betOption) <= 0:
                 return None, "Not a valid Bet Option"
-            elif userId in betDict[betId]["acceptedBy"]:
-                optionList = sorted(list(betDict[betId]["options"].keys()))
+            elif userId in bet["acceptedBy"]:
+                optionList = sorted(list(bet["options"].keys()))
     
-                if betDict[betId]["acceptedBy"][userId]["betOption"] != optionList[int(betOption)-1]:
+                if bet["acceptedBy"][userId]["betOption"] != optionList[int(betOption)-1]:
                     return None, "Cannot bet for more than one option"
 
             # Bet options are sorted for Ids
-            optionList = sorted(list(betDict[betId]["options"].keys()))
-            betDict[betId]["options"][optionList[int(betOption)-1]] += betAmount
-            betDict[betId]["acceptedBy"][userId] = {"betOption": optionList[int(betOption)-1], "amount": betAmount}
-            pointsDict[userId] = int(pointsDict[userId]) - betAmount
+            optionList = sorted(list(bet["options"].keys()))
+            optionName = optionList[int(betOption)-1]
+            bet["options"][optionName] += betAmount
+
+            if userId in bet["acceptedBy"]:
+                bet["acceptedBy"][userId]["amount"] += betAmount
+            else:
+                bet["acceptedBy"][userId] = {"betOption": optionName, "amount": betAmount}
 
-            bet_doc_ref.set(betDict)
-            points_doc_ref.set(pointsDict)
+            transaction.update(active_ref, {
+                self.__fieldPath("options", optionName): firestore.Increment(betAmount),
+                self.__fieldPath("acceptedBy", userId, "betOption"): optionName,
+                self.__fieldPath("acceptedBy", userId, "amount"): firestore.Increment(betAmount),
+            })
+            transaction.set(points_doc_ref, self.__increments({userId: pending - betAmount}), merge=True)
 
-            return betDict[betId], None
-            
+            return bet, None
+
+        try:
+            await self.__betIndex(guild.id)
+            bet, error = await self.__pointsTransaction(guild.id, userId, placeBet)
+
+            if error == None:
+                (await self.__betIndex(guild.id)).addWager(betId, userId, bet["acceptedBy"][userId]["betOption"], betAmount)
+                self.__documentChanged(guild.id, 'bets')
+                self.__pointsChanged(guild.id, {userId: -betAmount})
+
+            return bet, error
         except Exception as e:
             print(e)
             print("Error posting bet to Firebase")
@@ -515,7 +924,45 @@ class Fire:
             return None, "Error sending information to the database"
 
     # -------------  Misc. Functions -----------------------
-    def postFeedback(self, guild, userId, feedbackString):
+    async def fetchDocumentSizes(self, guild):
+        """
+        Fetch the current size of the guild's main documents
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want the sizes for
+
+        Returns
+        ----------
+        dict: { document(str): int }
+            Approximate size in bytes (None if the document does not exist)
+        """
+
+        collection = self.__db.collection(str(guild.id))
+        names = ['total', 'date', 'dayIndex', 'discordPoints', 'userStats', 'bets', 'rewards']
+        refs = [collection.document(name) for name in names]
+        refs.append(self.__dayDocument(guild.id, self.__currentDayKey()))
+        names.append('dayIndex/days/' + self.__currentDayKey())
+
+        try:
+            # The records are in the shards, the *userStats* document only counts them
+            shardNames = UserStats.shardNames((await self.__loadState(guild)).statsShards)
+            refs.extend(self.__statsShardDocuments(guild.id, shardNames))
+            names.extend('userStats/shards/' + name for name in shardNames)
+
+            snapshots = await self.__io(self.__db.get_all, refs)
+            sizes = {snapshot.reference.path.split('/', 1)[1]: documentSize(snapshot.to_dict()) if snapshot.exists else None
+                     for snapshot in snapshots}
+
+            return {name: sizes.get(name) for name in names}
+        except Exception as e:
+            print(e)
+            print("Error fetching document sizes")
+
+            return {}
+
+    async def postFeedback(self, guild, userId, feedbackString):
         """
         Post feedback to the database
 
@@ -528,7 +975,7 @@ class Fire:
         feedbackString: string
             A string representing the feedback 
         """
-        self.__db.collection('feedback').add({
+        await self.__io(self.__db.collection('feedback').add, {
             'feedback': feedbackString, 
             'user': userId,
             'guild': guild,
@@ -536,92 +983,924 @@ class Fire:
 
 
 # ---------- MARK: - Private Methods ----------
-    def __updateTotalTimes(self, guild, members):
+    async def __readDocument(self, doc_ref):
         """
-        Increment time accumulation for *total* in __db
+        Read a document; concurrent reads of the same document share one call to __db
+
+        Every write through __io or __transaction ends the sharing (see __documentWritten),
+        so a read that comes after a write never gets data from before it
 
         Parameters
         ----------
-        guild : discord.Guild
-            The server that the members belong to
-        members : list(discord.Member)
-            Update times for these users
-        """
-        doc_ref = self.__db.collection(str(guild.id)).document('total')
-
-        d = self.fetchTotalTimes(guild)
+        doc_ref : document reference
 
-        if d == None:
-            return {}
+        Returns
+        ----------
+        dict (None if the document does not exist)
+        """
 
-        for member in members:
-            if str(member.id) in d:
-                d[str(member.id)] += 1
-            else:
-                d[str(member.id)] = 1
+        async def read():
+            return (await self.__io(doc_ref.get)).to_dict()
 
-        doc_ref.set({
-            'users': d
-        })
+        return await self.__flights.do(('read', doc_ref.path), read)
 
-    def __updateDayTimes(self, guild, members):
+    async def __transaction(self, func):
         """
-        Increment time accumulation for *today* in __db
+        Run func(transaction) as a transaction on __db (see StorageBackend.transaction)
 
-        Parameters
+        func runs on the executor, possibly several times, so it may only read and write
+        through the transaction and must not touch the cache
+
+        Returns
         ----------
-        guild : discord.Guild
-            The server that the members belong to
-        members : list(discord.Member)
-            Update times for these users
+        The return value of func
         """
 
-        td = dt.timedelta(hours=6)
-        shiftedNow = datetime.today() - td
-        curDateStr = shiftedNow.strftime('%m/%d/%Y')
-
-        doc_ref = self.__db.collection(str(guild.id)).document('date')
+        attempts = []
 
-        allDateTimes = self.fetchAllDateTimes(guild)
-        d = {}
+        def attempt(transaction):
+            attempts.append(transaction)
+            return func(transaction)
 
-        if allDateTimes == {} or allDateTimes == None or not curDateStr in allDateTimes.keys():
-            d = {}
+        committed = False
+        try:
+            result = await self.__io(self.__db.transaction, attempt)
+            committed = True
+            return result
+        finally:
+            if attempts:
+                for kind, doc_ref, data, merge in attempts[-1].writes:
+                    self.__documentWritten(doc_ref.path)
+
+            # Every attempt read its documents; only the last one wrote anything
+            events = [('read', snapshot.reference.path, documentSize(snapshot.to_dict() or {}))
+                      for transaction in attempts for snapshot in transaction.snapshots]
+            if committed and attempts:
+                events += [('write', doc_ref.path, documentSize(data) if data != None else 0)
+                           for kind, doc_ref, data, merge in attempts[-1].writes]
+            self.__notifyIo(events)
+
+    async def __io(self, func, *args, **kwargs):
+        """
+        Run a blocking __db call on the bounded executor so the event loop keeps running
+
+        Parameters
+        ----------
+        func : callable
+            The blocking call (e.g. doc_ref.get, doc_ref.set)
+
+        Returns
+        ----------
+        The return value of func
+        """
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.__executor, functools.partial(self.__call, func, args, kwargs))
+        finally:
+            # Even a write that failed may have reached __db
+            if getattr(func, '__name__', '') in ('set', 'update', 'delete'):
+                self.__documentWritten(func.__self__.path)
+
+        if self.ioListeners:
+            self.__reportIo(func, args, result)
+
+        return result
+
+    def __documentWritten(self, path):
+        """
+        Stop sharing a read of the document that is still in flight, it may be from before the write
+
+        (Documents created by add() get a new id, so no read of them can be in flight)
+        """
+
+        self.__flights.forget(('read', path))
+
+    def __call(self, func, args, kwargs):
+        """
+        Runs on the executor: call func and read lazy results (get_all() and stream() only
+        send their requests while they are iterated, which must not happen on the event loop)
+        """
+
+        result = func(*args, **kwargs)
+
+        if inspect.isgenerator(result):
+            result = list(result)
+
+        return result
+
+    def __reportIo(self, func, args, result):
+        """
+        Tell the ioListeners about every document a __db call read or wrote
+        """
+
+        name = getattr(func, '__name__', '')
+        target = getattr(func, '__self__', None)
+        events = []
+
+        if name in ('get_all', 'stream'):
+            events = [('read', snapshot.reference.path, documentSize(snapshot.to_dict() or {})) for snapshot in result]
+        elif name == 'get':
+            events = [('read', target.path, documentSize(result.to_dict() or {}))]
+        elif name in ('set', 'update'):
+            events = [('write', target.path, documentSize(args[0]))]
+        elif name == 'add':
+            events = [('write', result[1].path, documentSize(args[0]))]
+        elif name == 'delete':
+            events = [('write', target.path, 0)]
+
+        self.__notifyIo(events)
+
+    def __notifyIo(self, events):
+        """
+        Call the ioListeners for every ('read' or 'write', document path, bytes) event
+        """
+
+        # A failing listener must not make a call that succeeded look like it failed
+        for kind, path, size in events:
+            for listener in self.ioListeners:
+                try:
+                    listener(kind, path, size)
+                except Exception as e:
+                    print("ERROR: io listener: ", str(e))
+
+    def __currentDayKey(self):
+        """
+        The day that minutes logged right now belong to (days roll over at 6AM)
+
+        Returns
+        ----------
+        str: '%Y-%m-%d'
+        """
+
+        td = dt.timedelta(hours=6)
+        shiftedNow = datetime.today() - td
+        return shiftedNow.strftime('%Y-%m-%d')
+
+    def __displayDate(self, dayKey):
+        """
+        Convert a '%Y-%m-%d' day key to the '%m/%d/%Y' string shown to users
+
+        Returns
+        ----------
+        str
+        """
+
+        return dayKey[5:7] + '/' + dayKey[8:10] + '/' + dayKey[0:4]
+
+    def __dayDocument(self, guildId, dayKey):
+        """
+        Reference to the document holding a single day of times
+
+        Returns
+        ----------
+        firebase.DocumentReference: {guildId}/dayIndex/days/{dayKey}
+        """
+
+        return self.__db.collection(str(guildId)).document('dayIndex').collection('days').document(dayKey)
+
+    async def __fetchDayIndex(self, guildId):
+        """
+        Fetch the list of days that have a day document
+
+        Guilds that still have the old single *date* document are migrated here first
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+
+        Returns
+        ----------
+        list(str): '%Y-%m-%d' day keys
+        """
+
+        index_ref = self.__db.collection(str(guildId)).document('dayIndex')
+        index = await self.__readDocument(index_ref)
+
+        if index == None:
+            return await self.__flights.do(('migrate', guildId), functools.partial(self.__migrateDateDocument, guildId))
+
+        return index.get('days', [])
+
+    async def __migrateDateDocument(self, guildId):
+        """
+        Split the old *date* document ({ '%m/%d/%Y': { id: int } }) into day documents
+
+        The old document is left in place; the index marks the guild as migrated
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+
+        Returns
+        ----------
+        list(str): '%Y-%m-%d' day keys that were migrated
+        """
+
+        legacy = (await self.__io(self.__db.collection(str(guildId)).document('date').get)).to_dict() or {}
+        dayKeys = []
+
+        for date, users in legacy.items():
+            dayKey = datetime.strptime(date, '%m/%d/%Y').strftime('%Y-%m-%d')
+            await self.__io(self.__dayDocument(guildId, dayKey).set, users, merge=True)
+            dayKeys.append(dayKey)
+
+        # ArrayUnion needs at least one value; a guild without old data starts with an empty index
+        await self.__io(self.__db.collection(str(guildId)).document('dayIndex').set, {
+            'days': firestore.ArrayUnion(sorted(dayKeys)) if dayKeys else [],
+        }, merge=True)
+
+        return sorted(dayKeys)
+
+    async def __loadState(self, guild):
+        """
+        Get the cached state for the guild, reading it from __db on a cache miss
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want the state for
+
+        Returns
+        ----------
+        GuildState
+        """
+
+        state = self.__cachedState(guild.id)
+        if state != None:
+            # Quiet guilds are not ticked, so reads have to start the new day too
+            self.__startDayIfDue(state)
+            return state
+
+        # Every caller that misses at the same time waits for one load and gets the same state
+        return await self.__flights.do(('state', guild.id), functools.partial(self.__readState, guild), copyResult=False)
+
+    async def __readState(self, guild):
+        """
+        Read the tick-driven documents of a guild and put them in the cache
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want the state for
+
+        Returns
+        ----------
+        GuildState
+        """
+
+        dayKey = self.__currentDayKey()
+        collection = self.__db.collection(str(guild.id))
+
+        total = await self.__readDocument(collection.document('total')) or {}
+        dayIndex = await self.__fetchDayIndex(guild.id)
+        today = await self.__readDocument(self.__dayDocument(guild.id, dayKey)) or {}
+        points = await self.__readDocument(collection.document('discordPoints')) or {}
+        userStats, statsShards = await self.__readUserStats(guild.id, total.get('users', {}), dayIndex)
+
+        # Another coroutine may have loaded the guild while we were waiting on __db
+        state = self.__cachedState(guild.id)
+        if state != None:
+            return state
+
+        state = GuildState(
+            totals=total.get('users', {}),
+            dayKey=dayKey,
+            today=today,
+            points=points,
+            userStats=userStats,
+        )
+        state.indexedDays = set(dayIndex)
+        state.statsShards = statsShards
+        self.__cache.put(guild.id, state)
+        await self.__evictIfOverCapacity()
+
+        return state
+
+    async def __readUserStats(self, guildId, totals, dayIndex):
+        """
+        Read the members' stats records from the *userStats* shard documents
+
+        Guilds without records yet get them built from their history, guilds that still
+        keep every record in the *userStats* document itself get them moved to shards
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+        totals : dict: { discord.member.id(str): int }
+            The *total* document
+        dayIndex : list(str)
+            Every day with a day document
+
+        Returns
+        ----------
+        (dict: { discord.member.id(str): dict }, shards(int))
+        """
+
+        index = await self.__readDocument(self.__db.collection(str(guildId)).document('userStats'))
+
+        if index != None and 'shards' in index:
+            shards = int(index['shards'])
+            userStats = {}
+            for snapshot in await self.__io(self.__db.get_all, self.__statsShardDocuments(guildId, UserStats.shardNames(shards))):
+                userStats.update(snapshot.to_dict() or {})
+
+            return userStats, shards
+
+        if index == None:
+            userStats = await self.__buildUserStats(guildId, totals, dayIndex)
         else:
-            d = allDateTimes[curDateStr]
+            userStats = index
+
+        shards = UserStats.shardCount(len(userStats))
+        await self.__writeUserStatsShards(guildId, userStats, shards)
+
+        return userStats, shards
+
+    async def __writeUserStatsShards(self, guildId, userStats, shards):
+        """
+        Write every record to that number of shards, then point the *userStats* document at them
+
+        Until the *userStats* document is written the shards (or records) it points at stay
+        in use, so an interrupted write is simply done again
 
-        for member in members:
-            if str(member.id) in d:
-                d[str(member.id)] += 1
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+        userStats : dict: { discord.member.id(str): dict }
+            All records
+        shards : int
+            The number of shards to spread them over
+        """
+
+        shardRecords = {name: {} for name in UserStats.shardNames(shards)}
+        for userId, record in userStats.items():
+            shardRecords[UserStats.shardName(userId, shards)][userId] = dict(record)
+
+        names = list(shardRecords)
+        for doc_ref, name in zip(self.__statsShardDocuments(guildId, names), names):
+            await self.__io(doc_ref.set, shardRecords[name])
+
+        await self.__io(self.__db.collection(str(guildId)).document('userStats').set, {'shards': shards})
+
+    async def __reshardUserStats(self, guildId, state):
+        """
+        Spread a guild's records over more shards once it outgrew them, then delete the old shards
+        """
+
+        oldShards = state.statsShards
+        # Records flushed while the new shards are written already go to them
+        state.statsShards = UserStats.shardCount(len(state.userStats))
+
+        try:
+            await self.__writeUserStatsShards(guildId, state.userStats, state.statsShards)
+        except Exception:
+            state.statsShards = oldShards
+            raise
+
+        for doc_ref in self.__statsShardDocuments(guildId, UserStats.shardNames(oldShards)):
+            await self.__io(doc_ref.delete)
+
+    def __statsShardDocuments(self, guildId, names):
+        """
+        References to *userStats* shard documents
+
+        Returns
+        ----------
+        list(firebase.DocumentReference): {guildId}/userStats/shards/{name} for every name
+        """
+
+        shards_ref = self.__db.collection(str(guildId)).document('userStats').collection('shards')
+        return [shards_ref.document(name) for name in names]
+
+    async def __buildUserStats(self, guildId, totals, dayIndex):
+        """
+        Build the members' stats records from the day documents (once per guild)
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+        totals : dict: { discord.member.id(str): int }
+            The *total* document
+        dayIndex : list(str)
+            Every day with a day document
+
+        Returns
+        ----------
+        dict: { discord.member.id(str): dict }
+        """
+
+        userDays = {}
+
+        refs = [self.__dayDocument(guildId, dayKey) for dayKey in dayIndex]
+        if refs:
+            for snapshot in await self.__io(self.__db.get_all, refs):
+                for userId, minutes in (snapshot.to_dict() or {}).items():
+                    userDays.setdefault(userId, {})[snapshot.id] = minutes
+
+        userStats = {}
+        for userId in set(totals) | set(userDays):
+            userStats[userId] = UserStats.fromHistory(totals.get(userId, 0), userDays.get(userId, {}))
+
+        return userStats
+
+    async def __evictIfOverCapacity(self):
+        """
+        Flush and drop the least recently used guilds while the cache is over capacity
+        """
+
+        while len(self.__cache) > 1 and self.__cache.overCapacity():
+            guildId = self.__cache.leastRecentlyUsed()
+            state = self.__cache.pop(guildId)
+
+            if state.dirty:
+                # Until the flush is done the documents in __db miss its increments, so a load
+                # of the guild in the meantime has to take this state back instead of reading them
+                self.__evicting[guildId] = state
+                try:
+                    await self.__flushState(guildId, state)
+                finally:
+                    # A failed flush (or a newer eviction of the same state) keeps it reachable
+                    if not state.dirty:
+                        self.__evicting.pop(guildId, None)
+
+    def __cachedState(self, guildId):
+        """
+        Get the cached state for the guild, putting a state that is being evicted back in the cache
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+
+        Returns
+        ----------
+        GuildState (None if the guild is not cached)
+        """
+
+        state = self.__cache.get(guildId)
+
+        if state == None:
+            state = self.__evicting.get(guildId)
+            if state != None:
+                self.__cache.put(guildId, state)
+
+        return state
+
+    async def __flushState(self, guildId, state):
+        """
+        Send the pending increments of a cached guild to __db
+
+        Only the changed fields are written, as server-side increments, so nothing
+        has to be read first and concurrent writers do not lose each other's updates
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild the state belongs to
+        state : GuildState
+            The cached state to write
+        """
+
+        async with state.flushLock:
+            collection = self.__db.collection(str(guildId))
+            state.lastFlush = time.monotonic()
+            activity = currentActivity.set('flush')
+
+            # Increments made by ticks while the writes are in flight go to fresh dicts
+            pendingTotals, pendingDays, pendingStats = state.takePending()
+
+            try:
+                if pendingTotals:
+                    await self.__io(collection.document('total').set, {
+                        'users': self.__increments(pendingTotals)
+                    }, merge=True)
+                    pendingTotals = {}
+                for dayKey in list(pendingDays):
+                    await self.__io(self.__dayDocument(guildId, dayKey).set, self.__increments(pendingDays[dayKey]), merge=True)
+                    del pendingDays[dayKey]
+
+                    # The index only changes the first time a day is written
+                    if not dayKey in state.indexedDays:
+                        await self.__io(collection.document('dayIndex').set, {
+                            'days': firestore.ArrayUnion([dayKey]),
+                        }, merge=True)
+                        state.indexedDays.add(dayKey)
+                if state.pendingPoints:
+                    await self.__flushPoints(collection.document('discordPoints'), state)
+                if pendingStats:
+                    # Only the changed members' records are merged into their shards
+                    shardRecords = {}
+                    for userId in pendingStats:
+                        shardRecords.setdefault(UserStats.shardName(userId, state.statsShards), {})[userId] = dict(state.userStats[userId])
+
+                    names = list(shardRecords)
+                    for doc_ref, name in zip(self.__statsShardDocuments(guildId, names), names):
+                        await self.__io(doc_ref.set, shardRecords[name], merge=True)
+                    pendingStats = set()
+                if len(state.userStats) > state.statsShards * UserStats.membersPerShard:
+                    await self.__reshardUserStats(guildId, state)
+            except Exception as e:
+                print(e)
+                print('Error flushing guild ' + str(guildId))
+                state.restorePending(pendingTotals, pendingDays, pendingStats)
+            finally:
+                currentActivity.reset(activity)
+
+    async def __flushPoints(self, points_doc_ref, state):
+        """
+        Write the pending points of a cached guild to *discordPoints*
+
+        While the write is in flight the points are kept in state.flushingPoints, so the
+        point commands can tell whether a user's balance is still on its way to __db
+
+        Parameters
+        ----------
+        points_doc_ref : firebase.DocumentReference
+            The guild's *discordPoints* document
+        state : GuildState
+            The cached state to write
+        """
+
+        written = False
+        try:
+            await self.__io(points_doc_ref.set, self.__increments(state.takePendingPoints()), merge=True)
+            written = True
+        finally:
+            state.pointsFlushed(written)
+
+    def __betDocuments(self, guildId, betId):
+        """
+        References to where a bet lives while it is active and after it was completed
+
+        Returns
+        ----------
+        (firebase.DocumentReference, firebase.DocumentReference): {guildId}/bets/active/{betId}, {guildId}/bets/archive/{betId}
+        """
+
+        index_ref = self.__db.collection(str(guildId)).document('bets')
+        return index_ref.collection('active').document(str(betId)), index_ref.collection('archive').document(str(betId))
+
+    def __betSummary(self, bet):
+        """
+        The part of a bet kept in the active-bets index (enough to list the bet)
+
+        Returns
+        ----------
+        dict
+        """
+
+        return {
+            'betId': bet['betId'],
+            'betTitle': bet['betTitle'],
+            'startedBy': bet['startedBy'],
+            'closed': bet['closed'],
+        }
+
+    def __isBetId(self, betId):
+        return str(betId).isdigit()
+
+    def __missingBetError(self, transaction, archive_ref):
+        """
+        Runs in a transaction: the error for a bet that is not active
+        """
+
+        if transaction.get(archive_ref).exists:
+            return "Bet has already been completed"
+
+        return "Not a valid Bet Id"
+
+    async def __betIndex(self, guildId):
+        """
+        The guild's BetIndex, built from the active-bets index the first time it is needed
+
+        Building it first makes sure the guild's bets are stored one document per bet, so
+        every bet command awaits this before its transaction
+
+        Returns
+        ----------
+        BetIndex obj
+        """
+
+        betIndex = self.__betIndexes.get(guildId)
+
+        if betIndex == None:
+            return await self.__flights.do(('bets', guildId), functools.partial(self.__loadBetIndex, guildId), copyResult=False)
+
+        self.__betIndexes.move_to_end(guildId)
+        return betIndex
+
+    async def __loadBetIndex(self, guildId):
+        active = await self.__migrateBetsDocument(guildId)
+        betIndex = BetIndex(active.values())
+
+        # Bounded like the guild cache, an evicted guild's index is simply built again
+        self.__betIndexes[guildId] = betIndex
+        while len(self.__betIndexes) > self.__cache.maxGuilds:
+            self.__betIndexes.popitem(last=False)
+
+        return betIndex
+
+    async def __migrateBetsDocument(self, guildId):
+        """
+        Move the bets out of the old *bets* document ({ 'numBets': int, betId: betDict, ... })
+
+        Every bet gets its own document (completed ones in the archive) before the old
+        fields are removed, so an interrupted migration is simply done again
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+
+        Returns
+        ----------
+        active: { betId(str): dict } the summaries of the active bets in the index
+        """
+
+        index_ref = self.__db.collection(str(guildId)).document('bets')
+        legacy = (await self.__io(index_ref.get)).to_dict() or {}
+        betIds = [key for key in legacy if not key in ('numBets', 'active')]
+        active = legacy.get('active', {})
+
+        if not betIds:
+            return active
+
+        for betId in betIds:
+            bet = legacy[betId]
+            active_ref, archive_ref = self.__betDocuments(guildId, betId)
+
+            if bet.get('completed'):
+                await self.__io(archive_ref.set, bet)
             else:
-                d[str(member.id)] = 1
+                await self.__io(active_ref.set, bet)
+                active[betId] = self.__betSummary(bet)
 
-        allDateTimes[curDateStr] = d
+        update = {betId: firestore.DELETE_FIELD for betId in betIds}
+        update['active'] = active
+        await self.__io(index_ref.set, update, merge=True)
 
-        doc_ref.set(allDateTimes)
+        return active
 
-    def __increaseDiscordPoints(self, guild, members):
+    def __pointsChanged(self, guildId, pointIncrements):
         """
-        Increase discord points for each user in the discord
+        Keep the cached copy of the discord points in sync after they were changed in __db
 
         Parameters
         ----------
-        guild : discord.Guild
-            The server that the members belong to
-        members : list(discord.Member)
-            Update times for these users
+        guildId : int
+            The id of the guild the points belong to
+        pointIncrements : dict: { discord.member.id(str): int }
+            The amount added to each user's points (negative if subtracted)
+        """
+
+        if not pointIncrements:
+            return
+
+        state = self.__cachedState(guildId)
+        if state != None:
+            for userId, amount in pointIncrements.items():
+                state.points[userId] = int(state.points.get(userId, 0)) + amount
+                state.scoreChanged('points', userId, state.points[userId])
+
+        self.__documentChanged(guildId, 'discordPoints')
+
+    async def __pointsTransaction(self, guildId, userId, func):
         """
-        doc_ref = self.__db.collection(str(guild.id)).document('discordPoints')
+        Run func(transaction, pending) as a transaction, pending being the user's points still waiting in the cache
+
+        The transaction takes the user's pending points over from the cache, so no flush
+        writes them in the meantime: func adds pending to the increment it writes to the
+        user's field of *discordPoints*. If it writes nothing (or fails) they go back to
+        the cache. Only a flush that is writing this user's points right now is waited for;
+        the other point commands and flushes of the guild run concurrently
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+        userId : str
+            The id of the user whose balance func reads
+        func : callable
+            The transaction function
+
+        Returns
+        ----------
+        The return value of func
+        """
+
+        state = self.__cachedState(guildId)
+
+        if state == None:
+            return await self.__transaction(functools.partial(func, pending=0))
 
-        d = self.fetchDiscordPoints(guild)
+        while userId in state.flushingPoints:
+            await state.pointsWritten.wait()
 
-        if d == None:
-            d = {}
+        pending = state.pendingPoints.pop(userId, 0)
+        points_path = self.__db.collection(str(guildId)).document('discordPoints').path
+        attempts = []
 
-        for member in members:
-            if str(member.id) in d:
-                d[str(member.id)] += 0
+        def attempt(transaction):
+            attempts.append(transaction)
+            return func(transaction, pending)
+
+        written = False
+        try:
+            result = await self.__transaction(attempt)
+            written = any(doc_ref.path == points_path for kind, doc_ref, data, merge in attempts[-1].writes)
+            return result
+        finally:
+            if pending and not written:
+                await self.__restorePendingPoints(guildId, state, userId, pending)
+
+    async def __restorePendingPoints(self, guildId, state, userId, pending):
+        """
+        Give points taken over by a point transaction that did not write them back to the cache
+
+        Parameters
+        ----------
+        guildId : int
+            The id of the guild
+        state : GuildState
+            The cached state the points were taken from
+        userId : str
+            The id of the user
+        pending : int
+            The points to give back
+        """
+
+        state.pendingPoints[userId] = state.pendingPoints.get(userId, 0) + pending
+
+        # The state was evicted and flushed in the meantime, so nothing else would write them
+        if self.__cachedState(guildId) is not state:
+            await self.__flushState(guildId, state)
+
+            current = self.__cachedState(guildId)
+            if current != None:
+                current.points[userId] = int(current.points.get(userId, 0)) + pending
+                current.scoreChanged('points', userId, current.points[userId])
+
+    def __pointBalance(self, pending, points, userId):
+        """
+        A user's current points: the *discordPoints* document plus what is still waiting in the cache
+
+        Parameters
+        ----------
+        pending : int
+            The user's points still waiting in the cache
+        points : dict: { discord.member.id(str): int }
+            The *discordPoints* document
+        userId : str
+            The id of the user
+
+        Returns
+        ----------
+        int (None if the user has no points at all)
+        """
+
+        if not userId in points and pending == 0:
+            return None
+
+        return int(points.get(userId, 0)) + pending
+
+    def __documentChanged(self, guildId, document):
+        """
+        Tell the changeListeners that a command changed a document of the guild
+        """
+
+        for listener in self.changeListeners:
+            try:
+                listener(guildId, document)
+            except Exception as e:
+                print("ERROR: change listener: ", str(e))
+
+    def __increments(self, deltas):
+        """
+        Convert a dict of deltas into server-side increment transforms
+
+        Parameters
+        ----------
+        deltas : dict: { key: int }
+
+        Returns
+        ----------
+        dict: { key: firestore.Increment }
+        """
+
+        return {key: firestore.Increment(amount) for key, amount in deltas.items()}
+
+    def __fieldPath(self, *fields):
+        """
+        Build a dotted field path for update() that is safe for numeric ids and option names
+
+        Returns
+        ----------
+        str
+        """
+
+        return FieldPath(*fields).to_api_repr()
+
+    def __updateTotalTimes(self, state, memberMinutes):
+        """
+        Increment time accumulation for *total* in the cache
+
+        Parameters
+        ----------
+        state : GuildState
+            The cached state of the server that the members belong to
+        memberMinutes : dict: { discord.member.id(str): int }
+            Minutes to add for each member
+        """
+
+        d = state.totals
+
+        for memberId, minutes in memberMinutes.items():
+            if memberId in d:
+                d[memberId] += minutes
             else:
-                d[str(member.id)] = 100
+                d[memberId] = minutes
+
+            state.pendingTotals[memberId] = state.pendingTotals.get(memberId, 0) + minutes
+            state.scoreChanged('total', memberId, d[memberId])
+
+    def __updateDayTimes(self, state, memberMinutes):
+        """
+        Increment time accumulation for *today* in the cache
+
+        Parameters
+        ----------
+        state : GuildState
+            The cached state of the server that the members belong to
+        memberMinutes : dict: { discord.member.id(str): int }
+            Minutes to add for each member
+        """
+
+        # Increments for the previous day stay pending under its own key
+        dayKey = self.__startDayIfDue(state)
+
+        d = state.today
+        pending = state.pendingDays.setdefault(dayKey, {})
+        lastSeen = datetime.now().isoformat(timespec='minutes')
+
+        for memberId, minutes in memberMinutes.items():
+            if memberId in d:
+                d[memberId] += minutes
+            else:
+                d[memberId] = minutes
+
+            pending[memberId] = pending.get(memberId, 0) + minutes
+            state.scoreChanged('today', memberId, d[memberId])
+            state.timeAdded(memberId, minutes)
+
+            record = state.userStats.setdefault(memberId, UserStats.new())
+            UserStats.addMinutes(record, dayKey, minutes, lastSeen)
+            state.pendingStats.add(memberId)
 
-        doc_ref.set(d)
+    def __startDayIfDue(self, state):
+        """
+        Roll *today* and the rolling windows of the state over once a new day started
+
+        Parameters
+        ----------
+        state : GuildState
+            The cached state of the server
+
+        Returns
+        ----------
+        str: The current '%Y-%m-%d' day
+        """
+
+        dayKey = self.__currentDayKey()
+
+        if state.dayKey != dayKey:
+            state.startDay(dayKey)
+
+        return dayKey
+
+    def __increaseDiscordPoints(self, state, memberMinutes):
+        """
+        Increase discord points for each user in the discord
+
+        Parameters
+        ----------
+        state : GuildState
+            The cached state of the server that the members belong to
+        memberMinutes : dict: { discord.member.id(str): int }
+            Update points for these users
+        """
+
+        d = state.points
+
+        for memberId in memberMinutes:
+            if memberId in d:
+                d[memberId] += 0
+            else:
+                d[memberId] = 100
+                state.pendingPoints[memberId] = state.pendingPoints.get(memberId, 0) + 100
+                state.scoreChanged('points', memberId, 100)
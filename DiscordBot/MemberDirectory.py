@@ -0,0 +1,85 @@
+class MemberDirectory:
+    """
+    In-memory directory of member display names for every guild the bot is in
+
+    Built once per guild from the gateway member cache (guild.members) and kept
+    current by the member events in DiscordClient, so no REST calls are needed
+
+    Functions
+    __________
+    displayNames(guild) -> dict: { discord.member.id: discord.member.display_name }
+        All display names for the guild
+    displayName(guild, memberId) -> str
+        The display name for a single member (None if unknown)
+    addMember(member)
+        Adds or updates a member of a guild
+    removeMember(member)
+        Removes a member from its guild
+    removeGuild(guild)
+        Forgets everything about a guild
+    """
+
+    def __init__(self):
+        self.__guilds = {}
+
+    def displayNames(self, guild):
+        """
+        All display names for the guild
+
+        The returned dict is the directory itself and must not be modified
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server that we want the names for
+
+        Returns
+        ----------
+        dict: { discord.member.id: discord.member.display_name }
+        """
+
+        return self.__namesFor(guild)
+
+    def displayName(self, guild, memberId):
+        """
+        The display name for a single member
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The server the member belongs to
+        memberId : int
+            The id of the member
+
+        Returns
+        ----------
+        str (None if the member is not in the guild)
+        """
+
+        return self.__namesFor(guild).get(int(memberId))
+
+    def addMember(self, member):
+        # Guilds that were never requested are built from guild.members on first use
+        if member.guild.id in self.__guilds:
+            self.__guilds[member.guild.id][member.id] = member.display_name
+
+    def removeMember(self, member):
+        if member.guild.id in self.__guilds:
+            self.__guilds[member.guild.id].pop(member.id, None)
+
+    def removeGuild(self, guild):
+        self.__guilds.pop(guild.id, None)
+
+    # ---------- MARK: - Private Functions ----------
+    def __namesFor(self, guild):
+        """
+        Get the names for a guild, building them from guild.members the first time
+        """
+
+        names = self.__guilds.get(guild.id)
+
+        if names == None:
+            names = {member.id: member.display_name for member in guild.members}
+            self.__guilds[guild.id] = names
+
+        return names
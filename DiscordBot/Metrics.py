@@ -0,0 +1,275 @@
+import asyncio
+import functools
+import inspect
+import time
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Metric:
+    """
+    Base class of the metrics; one value (or set of buckets) per combination of label values
+
+    Attributes
+    __________
+    name (str): Name of the metric in the Prometheus output
+    help (str): Description of the metric
+    labelNames (tuple(str)): Names of the labels every observation is made with
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name, help, labelNames=()):
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+        self._values = {}
+
+    def render(self):
+        """
+        The metric in the Prometheus text format
+
+        Returns
+        ----------
+        list(str)
+            The lines of the metric
+        """
+
+        lines = ['# HELP {0} {1}'.format(self.name, self.help), '# TYPE {0} {1}'.format(self.name, self.kind)]
+
+        for labels, value in sorted(self._values.items()):
+            lines += self._renderValue(labels, value)
+
+        return lines
+
+    def _renderValue(self, labels, value):
+        return ['{0}{1} {2}'.format(self.name, _labelString(self.labelNames, labels), _number(value))]
+
+
+class Counter(Metric):
+    """
+    A value that only goes up
+
+    Functions
+    __________
+    inc(amount, *labels)
+        Adds amount to the counter for the label values
+    """
+
+    kind = 'counter'
+
+    def inc(self, amount=1, *labels):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down
+
+    Functions
+    __________
+    set(value, *labels)
+        Sets the gauge for the label values
+    """
+
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Counts observations (e.g. latencies in seconds) in cumulative buckets
+
+    Functions
+    __________
+    observe(value, *labels)
+        Adds an observation for the label values
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelNames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelNames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        entry = self._values.get(labels)
+
+        if entry == None:
+            # [count per bucket (+Inf last), sum]
+            entry = [[0] * (len(self.buckets) + 1), 0.0]
+            self._values[labels] = entry
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        else:
+            entry[0][-1] += 1
+
+        entry[1] += value
+
+    def _renderValue(self, labels, value):
+        counts, total = value
+        names = self.labelNames + ('le',)
+        lines = []
+        cumulative = 0
+
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _number(bound)
+            lines.append('{0}_bucket{1} {2}'.format(self.name, _labelString(names, labels + (le,)), cumulative))
+
+        labelString = _labelString(self.labelNames, labels)
+        lines.append('{0}_sum{1} {2}'.format(self.name, labelString, _number(total)))
+        lines.append('{0}_count{1} {2}'.format(self.name, labelString, cumulative))
+
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics exposed by the metrics endpoint
+
+    Functions
+    __________
+    counter(name, help, labelNames) -> Counter
+    gauge(name, help, labelNames) -> Gauge
+    histogram(name, help, labelNames, buckets) -> Histogram
+        Create and register a metric
+    render() -> str
+        All metrics in the Prometheus text format
+    """
+
+    def __init__(self):
+        self.__metrics = []
+
+    def counter(self, name, help, labelNames=()):
+        return self.__add(Counter(name, help, labelNames))
+
+    def gauge(self, name, help, labelNames=()):
+        return self.__add(Gauge(name, help, labelNames))
+
+    def histogram(self, name, help, labelNames=(), buckets=DEFAULT_BUCKETS):
+        return self.__add(Histogram(name, help, labelNames, buckets))
+
+    def render(self):
+        lines = []
+
+        for metric in self.__metrics:
+            lines += metric.render()
+
+        return '\n'.join(lines) + '\n'
+
+    def __add(self, metric):
+        self.__metrics.append(metric)
+        return metric
+
+
+class MetricsServer:
+    """
+    Serves a MetricsRegistry at /metrics over HTTP (aiohttp, on the bot's event loop)
+
+    Attributes
+    __________
+    registry (MetricsRegistry obj): The metrics to serve
+    host (str): Address to listen on (local only by default)
+    port (int): Port to listen on
+
+    Functions
+    __________
+    async start()
+        Starts listening
+    async stop()
+        Stops listening
+    """
+
+    def __init__(self, registry, port, host='127.0.0.1'):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.__runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.__metrics)
+
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        await web.TCPSite(self.__runner, self.host, self.port).start()
+        print('Serving metrics on http://{0}:{1}/metrics'.format(self.host, self.port))
+
+    async def stop(self):
+        if self.__runner != None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    async def __metrics(self, request):
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+
+def instrument(obj, histogram):
+    """
+    Times every public coroutine method of obj (on the instance only)
+
+    Parameters
+    ----------
+    obj : object
+        e.g. the Fire instance
+    histogram : Histogram
+        Observed with the seconds every call took, labelled by the method name
+    """
+
+    for name, method in inspect.getmembers(obj, inspect.iscoroutinefunction):
+        if not name.startswith('_'):
+            setattr(obj, name, _timed(method, name, histogram))
+
+
+async def monitorLoopLag(gauge, interval=1.0):
+    """
+    Sets gauge to how late the event loop wakes up from a sleep of interval seconds
+
+    Parameters
+    ----------
+    gauge : Gauge
+    interval : float
+    """
+
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        gauge.set(max(0.0, time.perf_counter() - start - interval))
+
+
+# ---------- MARK: - Private Functions ----------
+def _timed(method, name, histogram):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, name)
+
+    return wrapper
+
+
+def _labelString(names, values):
+    if not names:
+        return ''
+
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append('{0}="{1}"'.format(name, value))
+
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return str(value)
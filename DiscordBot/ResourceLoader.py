@@ -0,0 +1,88 @@
+import os
+import time
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+class ResourceLoader:
+    """
+    Reads the bundled data files (data/) once and keeps them in memory
+
+    Paths are resolved relative to this module, so it does not matter which directory
+    the bot is started from. With hotReload the file's mtime is checked (at most every
+    checkInterval seconds) and the file is read again when it changed.
+
+    Attributes
+    __________
+    directory (str): Directory the files are read from
+    hotReload (bool): Whether changed files are read again (env RESOURCE_HOT_RELOAD=1)
+    checkInterval (float): Seconds between two mtime checks of the same file
+
+    Functions
+    __________
+    preload(*names)
+        Reads the files now (at startup) instead of on first use
+    lines(name) -> list(str)
+        The stripped, non-empty lines of the file
+    text(name) -> str
+        The contents of the file
+    """
+
+    def __init__(self, directory=DATA_DIRECTORY, hotReload=None, checkInterval=5):
+        if hotReload == None:
+            hotReload = os.getenv('RESOURCE_HOT_RELOAD') == '1'
+
+        self.directory = directory
+        self.hotReload = hotReload
+        self.checkInterval = checkInterval
+        # { name: (text, lines, mtime, lastCheck) }
+        self.__files = {}
+
+    def preload(self, *names):
+        for name in names:
+            self.__get(name)
+
+    def lines(self, name):
+        return self.__get(name)[1]
+
+    def text(self, name):
+        return self.__get(name)[0]
+
+    # ---------- MARK: - Private Functions ----------
+    def __get(self, name):
+        entry = self.__files.get(name)
+
+        if entry == None:
+            return self.__read(name)
+
+        if self.hotReload:
+            now = time.monotonic()
+
+            if now - entry[3] >= self.checkInterval:
+                if self.__mtime(name) != entry[2]:
+                    return self.__read(name)
+                self.__files[name] = entry[:3] + (now,)
+
+        return entry
+
+    def __read(self, name):
+        path = os.path.join(self.directory, name)
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        except OSError as e:
+            print(e)
+            print('Error reading resource ' + name)
+            text = ''
+
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        entry = (text, lines, self.__mtime(name), time.monotonic())
+        self.__files[name] = entry
+
+        return entry
+
+    def __mtime(self, name):
+        try:
+            return os.stat(os.path.join(self.directory, name)).st_mtime
+        except OSError:
+            return None
@@ -0,0 +1,125 @@
+import multiprocessing
+import signal
+import time
+
+class ShardSupervisor:
+    """
+    Runs the shards of the bot in several worker processes and restarts workers that die
+
+    Every worker runs a ShardedDiscordClient for a contiguous range of shard ids and
+    has its own Fire. Guilds belong to exactly one shard, so the workers never cache the
+    same guild, and all time and point updates reach Firestore as server-side
+    increments, so the workers can share the database without coordinating.
+
+    Attributes
+    __________
+    token (str): The discord API token
+    shardCount (int): Total number of shards over all workers
+    processes (int): Number of worker processes
+    identifyDelay (float): Seconds to wait per shard before starting the next worker,
+        so the workers do not identify with the gateway at the same time
+    maxRestartDelay (float): Most seconds to wait before restarting a worker (the wait doubles
+        with every restart in a row)
+    healthyRunTime (float): Seconds a worker has to run before its restarts in a row start over
+
+    Functions
+    __________
+    shardRanges() -> list(list(int))
+        The shard ids run by every worker
+    run()
+        Starts the workers and supervises them until SIGINT / SIGTERM
+    """
+
+    identifyDelay = 5.5
+    maxRestartDelay = 60
+    healthyRunTime = 600
+
+    def __init__(self, token, shardCount, processes):
+        self.token = token
+        self.shardCount = shardCount
+        self.processes = max(1, min(processes, shardCount))
+        self.__context = multiprocessing.get_context('spawn')
+        self.__workers = {}
+        self.__restarts = {}
+        self.__stopping = False
+
+    def shardRanges(self):
+        return [
+            list(range(i * self.shardCount // self.processes, (i + 1) * self.shardCount // self.processes))
+            for i in range(self.processes)
+        ]
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.__stop)
+        signal.signal(signal.SIGINT, self.__stop)
+
+        for worker, shardIds in enumerate(self.shardRanges()):
+            if self.__stopping:
+                break
+
+            self.__start(worker, shardIds)
+            time.sleep(self.identifyDelay * len(shardIds))
+
+        while not self.__stopping:
+            for worker, (process, shardIds, started) in list(self.__workers.items()):
+                if process.is_alive():
+                    continue
+
+                # An occasional crash after a long healthy run restarts right away again
+                if time.monotonic() - started >= self.healthyRunTime:
+                    self.__restarts[worker] = 0
+
+                restarts = self.__restarts.get(worker, 0)
+                delay = min(self.maxRestartDelay, 2 ** restarts)
+                print("ERROR: worker {0} (shards {1}) exited with {2}, restarting in {3}s".format(
+                    worker, shardIds, process.exitcode, delay))
+
+                time.sleep(delay)
+                self.__restarts[worker] = restarts + 1
+                if not self.__stopping:
+                    self.__start(worker, shardIds)
+
+            time.sleep(1)
+
+        for process, shardIds, started in self.__workers.values():
+            process.terminate()
+        for process, shardIds, started in self.__workers.values():
+            process.join()
+
+    # ---------- MARK: - Private Functions ----------
+    def __start(self, worker, shardIds):
+        process = self.__context.Process(
+            target=runShardWorker,
+            args=(self.token, shardIds, self.shardCount),
+            name='shard-worker-{0}'.format(worker),
+        )
+        process.start()
+        self.__workers[worker] = (process, shardIds, time.monotonic())
+        print('Started worker {0} for shards {1}'.format(worker, shardIds))
+
+    def __stop(self, signum, frame):
+        self.__stopping = True
+
+
+def runShardWorker(token, shardIds, shardCount):
+    """
+    Entry point of a worker process: runs the given shards until the client is closed
+
+    Parameters
+    ----------
+    token : str
+        The discord API token
+    shardIds : list(int)
+        The shards this worker runs
+    shardCount : int
+        Total number of shards over all workers
+    """
+
+    from DiscordClient import defaultIntents
+    from ShardedDiscordClient import ShardedDiscordClient
+
+    # The supervisor stops the workers with SIGTERM; let discord.py shut down cleanly
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    client = ShardedDiscordClient(intents=defaultIntents(), shard_ids=shardIds, shard_count=shardCount)
+    client.run(token)
@@ -0,0 +1,52 @@
+import discord
+
+from DiscordClient import DiscordClient
+
+class ShardedDiscordClient(DiscordClient, discord.AutoShardedClient):
+    """
+    The "Bot" running several gateway shards in one process
+
+    Behaves exactly like DiscordClient; discord.AutoShardedClient opens one gateway
+    connection per shard and on_ready is called once every shard is ready. Pass
+    shard_ids and shard_count to only run part of the shards in this process (see
+    ShardSupervisor).
+
+    Functions
+    __________
+    async on_shard_ready(shard_id) / on_shard_resumed(shard_id)
+        Reconciles the voice sessions of the shard's guilds after it (re)connects
+    async on_shard_disconnect(shard_id)
+        Pauses the voice sessions of the shard's guilds while it is disconnected
+    """
+
+    async def on_shard_ready(self, shard_id):
+        """
+            Implementing discord.AutoShardedClient on_shard_ready() that is called when a
+            single shard is ready
+
+            A shard that reconnected may have missed voice state events for its guilds
+        """
+
+        print('Shard {0} ready'.format(shard_id))
+
+        for guild in self.guilds:
+            if guild.shard_id == shard_id:
+                self.voiceSessions.scanGuild(guild)
+
+    async def on_shard_resumed(self, shard_id):
+        for guild in self.guilds:
+            if guild.shard_id == shard_id:
+                self.voiceSessions.scanGuild(guild)
+
+    async def on_shard_disconnect(self, shard_id):
+        for guild in self.guilds:
+            if guild.shard_id == shard_id:
+                self.voiceSessions.pauseGuild(guild.id)
+
+    # A disconnect or resume of one shard is also dispatched as on_disconnect / on_resumed,
+    # which must not touch the guilds of the other shards
+    async def on_disconnect(self):
+        pass
+
+    async def on_resumed(self):
+        pass
@@ -0,0 +1,94 @@
+import contextvars
+
+# What the current task is doing for the bot (a command name, 'tick', 'flush', ...), so every
+# database call can be charged to it; set with currentActivity.set() / reset()
+currentActivity = contextvars.ContextVar('currentActivity', default='background')
+
+class Accounting:
+    """
+    Counts the documents Fire reads and writes (and their bytes) per guild, document and activity
+
+    Used as one of Fire's ioListeners, so every __db call is counted without touching the
+    functions that make them. Day documents are counted together as 'dayIndex/days/*'.
+
+    Functions
+    __________
+    record(kind, path, size)
+        Counts one document read or written ('read' or 'write')
+    guildUsage(guildId) -> dict: { 'reads': int, 'writes': int, 'bytes': int }
+        Everything counted for the guild
+    topDocuments(guildId, n) -> [(document, usage)]
+        The guild's documents with the most reads and writes
+    topActivities(guildId, n) -> [(activity, usage)]
+        The commands / activities with the most reads and writes for the guild (all guilds if None)
+    guildRank(guildId) -> (rank(int), guilds(int))
+        The guild's position among all guilds by reads and writes
+    """
+
+    def __init__(self):
+        # { guildId(str): { 'usage': [reads, writes, bytes], 'documents': {...}, 'activities': {...} } }
+        self.__guilds = {}
+        self.__activities = {}
+
+    def record(self, kind, path, size):
+        guildId, document = _splitPath(path)
+        activity = currentActivity.get()
+
+        guild = self.__guilds.get(guildId)
+        if guild == None:
+            guild = {'usage': [0, 0, 0], 'documents': {}, 'activities': {}}
+            self.__guilds[guildId] = guild
+
+        for usage in (guild['usage'],
+                      guild['documents'].setdefault(document, [0, 0, 0]),
+                      guild['activities'].setdefault(activity, [0, 0, 0]),
+                      self.__activities.setdefault(activity, [0, 0, 0])):
+            usage[0 if kind == 'read' else 1] += 1
+            usage[2] += size
+
+    def guildUsage(self, guildId):
+        guild = self.__guilds.get(str(guildId))
+        return _usageDict(guild['usage'] if guild != None else [0, 0, 0])
+
+    def topDocuments(self, guildId, n=5):
+        guild = self.__guilds.get(str(guildId))
+        return _top(guild['documents'] if guild != None else {}, n)
+
+    def topActivities(self, guildId=None, n=5):
+        if guildId == None:
+            return _top(self.__activities, n)
+
+        guild = self.__guilds.get(str(guildId))
+        return _top(guild['activities'] if guild != None else {}, n)
+
+    def guildRank(self, guildId):
+        operations = sorted((usage['usage'][0] + usage['usage'][1] for usage in self.__guilds.values()), reverse=True)
+        guild = self.__guilds.get(str(guildId))
+
+        if guild == None:
+            return None, len(operations)
+
+        return operations.index(guild['usage'][0] + guild['usage'][1]) + 1, len(operations)
+
+
+# ---------- MARK: - Private Functions ----------
+def _splitPath(path):
+    """
+    'guildId/document[/...]' -> (guildId, document), with the last part of deeper paths as '*'
+    """
+
+    parts = path.split('/')
+
+    if len(parts) > 2:
+        parts[-1] = '*'
+
+    return parts[0], '/'.join(parts[1:])
+
+
+def _top(usages, n):
+    ordered = sorted(usages.items(), key=lambda item: (-(item[1][0] + item[1][1]), item[0]))
+    return [(key, _usageDict(usage)) for key, usage in ordered[:n]]
+
+
+def _usageDict(usage):
+    return {'reads': usage[0], 'writes': usage[1], 'bytes': usage[2]}
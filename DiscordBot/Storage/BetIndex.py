@@ -0,0 +1,158 @@
+from collections import OrderedDict
+
+class BetIndex:
+    """
+    A guild's bets indexed by id, by creator and by status, kept current by the bet mutations
+
+    Built from the active-bets index (so every active bet is listed, at first only by its
+    summary: id, title, creator and closed); whole bets are added as they are read or
+    created. Completed bets are only known once they were completed or looked up, and
+    only the maxCompleted most recent of them are kept.
+
+    Stored bets are never changed in place (a change stores a new dict), so the dicts
+    returned by the lookups stay as they were, and they must not be modified. Wagers and
+    closing are applied as changes rather than by storing the bet a transaction returned,
+    because transactions that finished at the same moment may report back in any order.
+
+    Attributes
+    __________
+    maxCompleted (int): Maximum number of completed bets kept
+
+    Functions
+    __________
+    put(bet, revision)
+        Adds the bet (a whole bet or a summary) or replaces it, unless it changed since revision
+    revision(betId) -> int
+        Counts the changes to a bet (taken before reading a bet that is then put)
+    close(betId)
+        Marks an active bet as closed
+    addWager(betId, userId, optionName, amount)
+        Adds a user's wager to the whole bet (if it is stored)
+    bet(betId) -> dict
+        The whole bet (None if only its summary or nothing is known)
+    byCreator(creatorId) -> [dict]
+        The creator's active bets, ordered by id
+    byStatus(*statuses) -> [dict]
+        The bets with one of the statuses ('open', 'closed', 'completed'), ordered by id
+    """
+
+    def __init__(self, summaries=(), maxCompleted=100):
+        """
+        Parameters
+        ----------
+        summaries : iterable(dict)
+            The active bets from the active-bets index
+        maxCompleted : int
+            Maximum number of completed bets kept
+        """
+
+        self.maxCompleted = maxCompleted
+        # { betId(str): dict }
+        self.__bets = {}
+        # { betId(str): int } for the bets in __bets
+        self.__revisions = {}
+        # Ids of the bets in __bets that are whole bets rather than summaries
+        self.__whole = set()
+        # { creatorId(str): set(betId) } active bets only
+        self.__byCreator = {}
+        # { status: set(betId) }, completed ones in the order they were added
+        self.__byStatus = {'open': set(), 'closed': set(), 'completed': OrderedDict()}
+
+        for summary in summaries:
+            self.put(summary)
+
+    def __len__(self):
+        return len(self.__bets)
+
+    def put(self, bet, revision=None):
+        betId = str(bet['betId'])
+        if revision != None and revision != self.revision(betId):
+            return
+
+        nextRevision = self.revision(betId) + 1
+        self.__remove(betId)
+
+        self.__bets[betId] = bet
+        self.__revisions[betId] = nextRevision
+        if 'options' in bet:
+            self.__whole.add(betId)
+
+        status = _status(bet)
+        if status == 'completed':
+            completed = self.__byStatus['completed']
+            completed[betId] = None
+            while len(completed) > self.maxCompleted:
+                self.__remove(next(iter(completed)))
+        else:
+            self.__byStatus[status].add(betId)
+            self.__byCreator.setdefault(str(bet['startedBy']), set()).add(betId)
+
+    def revision(self, betId):
+        return self.__revisions.get(str(betId), 0)
+
+    def close(self, betId):
+        bet = self.__bets.get(str(betId))
+        if bet != None and _status(bet) == 'open':
+            self.put(dict(bet, closed=True))
+
+    def addWager(self, betId, userId, optionName, amount):
+        betId = str(betId)
+        bet = self.__bets.get(betId)
+
+        if bet == None or _status(bet) == 'completed':
+            return
+        if not betId in self.__whole:
+            # Only the summary is known, nothing of it changes
+            self.__revisions[betId] += 1
+            return
+
+        options = dict(bet['options'])
+        options[optionName] = options.get(optionName, 0) + amount
+        acceptedBy = dict(bet['acceptedBy'])
+        wager = acceptedBy.get(userId, {'betOption': optionName, 'amount': 0})
+        acceptedBy[userId] = {'betOption': wager['betOption'], 'amount': wager['amount'] + amount}
+
+        self.put(dict(bet, options=options, acceptedBy=acceptedBy))
+
+    def bet(self, betId):
+        betId = str(betId)
+        return self.__bets[betId] if betId in self.__whole else None
+
+    def byCreator(self, creatorId):
+        return self.__sorted(self.__byCreator.get(str(creatorId), ()))
+
+    def byStatus(self, *statuses):
+        betIds = []
+        for status in statuses:
+            betIds.extend(self.__byStatus[status])
+        return self.__sorted(betIds)
+
+    # ---------- MARK: - Private Functions ----------
+    def __remove(self, betId):
+        bet = self.__bets.pop(betId, None)
+        if bet == None:
+            return
+
+        del self.__revisions[betId]
+        self.__whole.discard(betId)
+        self.__byStatus['open'].discard(betId)
+        self.__byStatus['closed'].discard(betId)
+        self.__byStatus['completed'].pop(betId, None)
+
+        creator = self.__byCreator.get(str(bet['startedBy']))
+        if creator != None:
+            creator.discard(betId)
+            if not creator:
+                del self.__byCreator[str(bet['startedBy'])]
+
+    def __sorted(self, betIds):
+        return [self.__bets[betId] for betId in sorted(betIds, key=int)]
+
+
+# ---------- MARK: - Private Functions ----------
+def _status(bet):
+    if bet.get('completed'):
+        return 'completed'
+    if bet.get('closed'):
+        return 'closed'
+    return 'open'
@@ -0,0 +1,37 @@
+from firebase_admin import firestore
+
+def documentSize(value):
+    """
+    Approximate number of bytes Firestore stores for a value, following its storage size rules
+
+    Strings count their UTF-8 length plus one, numbers eight bytes, maps and arrays the sum
+    of their entries (map keys count like strings). Transforms count as the value they write.
+
+    Parameters
+    ----------
+    value : any firestore value (usually the dict of a document)
+
+    Returns
+    ----------
+    int
+    """
+
+    if value == None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(documentSize(str(key)) + documentSize(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(documentSize(item) for item in value)
+    if isinstance(value, (firestore.ArrayUnion, firestore.ArrayRemove)):
+        return sum(documentSize(item) for item in value.values)
+    if value is firestore.DELETE_FIELD:
+        return 0
+
+    # Increment, SERVER_TIMESTAMP, timestamps
+    return 8
@@ -0,0 +1,69 @@
+import firebase_admin
+from firebase_admin import credentials, firestore
+from Storage.StorageBackend import StorageBackend, Transaction
+
+class FirestoreBackend(StorageBackend):
+    """
+    Google Firestore, through the Firebase app configured in firebase_config.py
+
+    transaction() uses Firestore's own transactions, which the server retries on contention
+
+    Attributes
+    __________
+    client (firestore.client obj): The client every call is passed on to
+    """
+
+    def __init__(self, client=None):
+        if client == None:
+            from firebase_config import firebase_config_dict
+
+            # Checks to see if Firebase was already initialized in the applicaiton
+            if not firebase_admin._apps:
+                cred = credentials.Certificate(firebase_config_dict)
+                firebase_admin.initialize_app(cred)
+            client = firestore.client()
+        super().__init__()
+        self.client = client
+
+    def collection(self, name):
+        return self.client.collection(name)
+
+    def get_all(self, references, field_paths=None):
+        return self.client.get_all(references, field_paths=field_paths)
+
+    def transaction(self, func, maxAttempts=5):
+        @firestore.transactional
+        def run(transaction):
+            return func(FirestoreTransaction(transaction))
+
+        return run(self.client.transaction(max_attempts=maxAttempts))
+
+    def close(self):
+        close = getattr(self.client, 'close', None)
+        if close != None:
+            close()
+
+
+class FirestoreTransaction(Transaction):
+    """
+    Transaction that reads and writes through a firestore.Transaction
+    """
+
+    def __init__(self, transaction):
+        super().__init__(None)
+        self.transaction = transaction
+
+    def set(self, doc_ref, data, merge=False):
+        super().set(doc_ref, data, merge)
+        self.transaction.set(doc_ref, data, merge=merge)
+
+    def update(self, doc_ref, data):
+        super().update(doc_ref, data)
+        self.transaction.update(doc_ref, data)
+
+    def delete(self, doc_ref):
+        super().delete(doc_ref)
+        self.transaction.delete(doc_ref)
+
+    def _read(self, doc_ref, field_paths):
+        return doc_ref.get(field_paths=field_paths, transaction=self.transaction)
@@ -0,0 +1,281 @@
+import asyncio
+import time
+from collections import OrderedDict
+from Storage.LeaderboardIndex import LeaderboardIndex
+
+class GuildState:
+    """
+    In-memory copy of the tick-driven documents for a single guild
+
+    Attributes
+    __________
+    totals (dict): { discord.member.id(str): int } mirror of the *total* document
+    dayKey (str): The '%Y-%m-%d' day that *today* belongs to
+    today (dict): { discord.member.id(str): int } times for dayKey
+    points (dict): { discord.member.id(str): int } mirror of the *discordPoints* document
+    userStats (dict): { discord.member.id(str): dict } mirror of the *userStats* shard documents (see UserStats)
+    statsShards (int): Number of *userStats* shard documents
+    pendingTotals (dict): { discord.member.id(str): int } increments not yet written to *total*
+    pendingDays (dict): { dayKey: { discord.member.id(str): int } } increments not yet written to the day documents
+    indexedDays (set): Day keys already listed in the *dayIndex* document
+    pendingPoints (dict): { discord.member.id(str): int } increments not yet written to *discordPoints*
+    flushingPoints (dict): { discord.member.id(str): int } increments a flush is writing to *discordPoints* right now
+    pointsWritten (asyncio.Event): Set while no flush is writing to *discordPoints*
+    pendingStats (set): Ids of the members whose *userStats* record has not been written yet
+    lastAccess (float): time.monotonic() of the last read or write
+    lastFlush (float): time.monotonic() of the last flush to the database
+    flushLock (asyncio.Lock): Held while the pending increments are written, so flushes of the guild never overlap
+    """
+
+    def __init__(self, totals, dayKey, today, points, userStats):
+        self.totals = totals
+        self.dayKey = dayKey
+        self.today = today
+        self.points = points
+        self.userStats = userStats
+        self.statsShards = 1
+        self.pendingTotals = {}
+        self.pendingDays = {}
+        self.pendingPoints = {}
+        self.flushingPoints = {}
+        self.pointsWritten = asyncio.Event()
+        self.pointsWritten.set()
+        self.pendingStats = set()
+        self.indexedDays = set()
+        self.windows = {}
+        self.lastAccess = time.monotonic()
+        self.lastFlush = self.lastAccess
+        self.flushLock = asyncio.Lock()
+        self.__leaderboards = {}
+
+    @property
+    def dirty(self):
+        """
+        Whether the state has increments that have not been flushed yet
+
+        Returns
+        ----------
+        bool
+        """
+        return bool(self.pendingTotals or self.pendingDays or self.pendingPoints or self.pendingStats)
+
+    def leaderboard(self, metric):
+        """
+        The ranking for a metric, built from the cached values the first time it is needed
+
+        Parameters
+        ----------
+        metric : str
+            'total', 'today' or 'points'
+
+        Returns
+        ----------
+        LeaderboardIndex
+        """
+
+        board = self.__leaderboards.get(metric)
+
+        if board == None:
+            values = {'total': self.totals, 'today': self.today, 'points': self.points}[metric]
+            board = LeaderboardIndex({userId: int(value) for userId, value in values.items()})
+            self.__leaderboards[metric] = board
+
+        return board
+
+    def scoreChanged(self, metric, userId, score):
+        """
+        Moves the user in the ranking for the metric (if it has been built) after their value changed
+
+        Parameters
+        ----------
+        metric : str
+            'total', 'today' or 'points'
+        userId : str
+            The id of the member
+        score : int
+            The member's new value
+        """
+
+        board = self.__leaderboards.get(metric)
+
+        if board != None:
+            board.set(userId, int(score))
+
+    def startDay(self, dayKey):
+        """
+        Rolls *today* over to a new day
+
+        Parameters
+        ----------
+        dayKey : str
+            The '%Y-%m-%d' day that starts
+        """
+
+        self.dayKey = dayKey
+        self.today = {}
+        self.__leaderboards.pop('today', None)
+
+        for window in self.windows.values():
+            window.advance(dayKey)
+
+    def timeAdded(self, userId, minutes):
+        """
+        Adds minutes logged today to the rolling windows
+
+        Parameters
+        ----------
+        userId : str
+            The id of the member
+        minutes : int
+            The minutes that were added to *today*
+        """
+
+        for window in self.windows.values():
+            window.add(self.dayKey, userId, minutes)
+
+    def takePending(self):
+        """
+        Hand the pending increments to a flush and start collecting new ones
+
+        The points are taken separately by takePendingPoints(), right before they are written
+
+        Returns
+        ----------
+        (pendingTotals, pendingDays, pendingStats)
+        """
+
+        pending = (self.pendingTotals, self.pendingDays, self.pendingStats)
+        self.pendingTotals = {}
+        self.pendingDays = {}
+        self.pendingStats = set()
+
+        return pending
+
+    def restorePending(self, pendingTotals, pendingDays, pendingStats):
+        """
+        Put increments from a failed flush back so the next flush retries them
+
+        Parameters
+        ----------
+        pendingTotals : dict: { discord.member.id(str): int }
+        pendingDays : dict: { dayKey: { discord.member.id(str): int } }
+        pendingStats : set(discord.member.id(str))
+        """
+
+        for userId, amount in pendingTotals.items():
+            self.pendingTotals[userId] = self.pendingTotals.get(userId, 0) + amount
+        for dayKey, users in pendingDays.items():
+            day = self.pendingDays.setdefault(dayKey, {})
+            for userId, amount in users.items():
+                day[userId] = day.get(userId, 0) + amount
+        self.pendingStats |= pendingStats
+
+    def takePendingPoints(self):
+        """
+        Move the pending points to flushingPoints while a flush writes them
+
+        Returns
+        ----------
+        dict: { discord.member.id(str): int }
+        """
+
+        self.flushingPoints = self.pendingPoints
+        self.pendingPoints = {}
+        self.pointsWritten.clear()
+
+        return self.flushingPoints
+
+    def pointsFlushed(self, written):
+        """
+        End the write of flushingPoints, putting them back in pendingPoints if it failed
+
+        Parameters
+        ----------
+        written : bool
+            Whether the points reached *discordPoints*
+        """
+
+        if not written:
+            for userId, amount in self.flushingPoints.items():
+                self.pendingPoints[userId] = self.pendingPoints.get(userId, 0) + amount
+
+        self.flushingPoints = {}
+        self.pointsWritten.set()
+
+    def size(self):
+        """
+        Number of entries held in memory for the guild
+
+        Returns
+        ----------
+        int
+        """
+        return len(self.totals) + len(self.today) + len(self.points) + len(self.userStats)
+
+
+class GuildCache:
+    """
+    Per-guild write-behind cache used by Fire for the minute tick
+
+    Attributes
+    __________
+    maxGuilds (int): Maximum number of guilds kept in memory
+    maxEntries (int): Maximum number of member entries kept in memory over all guilds
+
+    Functions
+    __________
+    get(guildId) -> GuildState
+        Gets the cached state for the guild (None if it is not cached)
+    put(guildId, state)
+        Adds the state for the guild to the cache
+    pop(guildId) -> GuildState
+        Removes the state for the guild from the cache
+    dirtyStates() -> list((guildId, GuildState))
+        All cached states with unflushed changes
+    overCapacity() -> bool
+        Whether the cache holds more than maxGuilds or maxEntries
+    leastRecentlyUsed() -> guildId
+        The guild that was accessed the longest time ago
+    """
+
+    def __init__(self, maxGuilds, maxEntries):
+        self.maxGuilds = maxGuilds
+        self.maxEntries = maxEntries
+        self.__states = OrderedDict()
+
+    def __len__(self):
+        return len(self.__states)
+
+    def __contains__(self, guildId):
+        return guildId in self.__states
+
+    def get(self, guildId):
+        state = self.__states.get(guildId)
+
+        if state != None:
+            state.lastAccess = time.monotonic()
+            self.__states.move_to_end(guildId)
+
+        return state
+
+    def put(self, guildId, state):
+        self.__states[guildId] = state
+        self.__states.move_to_end(guildId)
+
+    def pop(self, guildId):
+        return self.__states.pop(guildId, None)
+
+    def dirtyStates(self):
+        return [(guildId, state) for guildId, state in self.__states.items() if state.dirty]
+
+    def overCapacity(self):
+        if len(self.__states) > self.maxGuilds:
+            return True
+
+        return sum(state.size() for state in self.__states.values()) > self.maxEntries
+
+    def leastRecentlyUsed(self):
+        if not self.__states:
+            return None
+
+        return next(iter(self.__states))
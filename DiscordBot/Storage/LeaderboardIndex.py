@@ -0,0 +1,217 @@
+from bisect import bisect_left, insort
+
+class LeaderboardIndex:
+    """
+    Members of a guild ordered by a score (highest first), kept sorted as scores change
+
+    Entries live in sorted buckets of at most 2 * LOAD keys, with a Fenwick tree over the
+    bucket sizes, so updates, "rank of user X" and "page k" cost O(log n) plus the size of
+    the answer instead of a full sort. Ties are ordered by user id.
+
+    Functions
+    __________
+    set(userId, score)
+        Adds the user or moves them to their new score
+    remove(userId)
+        Removes the user
+    score(userId) -> int
+        The user's current score (None if not ranked)
+    rank(userId) -> int
+        The user's 1-based rank (None if not ranked)
+    page(page, pageSize) -> ([(rank, userId, score)], page, pages)
+        One page of the leaderboard
+    top(n) -> [(rank, userId, score)]
+        The n highest scores
+    """
+
+    LOAD = 256
+
+    def __init__(self, scores=None):
+        self.__scores = {}
+        self.__buckets = []
+        self.__maxes = []
+        self.__tree = []
+
+        if scores:
+            self.__scores = {str(userId): score for userId, score in scores.items()}
+            keys = sorted((-score, userId) for userId, score in self.__scores.items())
+            self.__buckets = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+            self.__maxes = [bucket[-1] for bucket in self.__buckets]
+            self.__buildTree()
+
+    def __len__(self):
+        return len(self.__scores)
+
+    def __contains__(self, userId):
+        return str(userId) in self.__scores
+
+    def set(self, userId, score):
+        userId = str(userId)
+        old = self.__scores.get(userId)
+
+        if old == score:
+            return
+        if old != None:
+            self.__removeKey((-old, userId))
+
+        self.__scores[userId] = score
+        self.__insertKey((-score, userId))
+
+    def remove(self, userId):
+        userId = str(userId)
+        old = self.__scores.pop(userId, None)
+
+        if old != None:
+            self.__removeKey((-old, userId))
+
+    def score(self, userId):
+        return self.__scores.get(str(userId))
+
+    def rank(self, userId):
+        userId = str(userId)
+        score = self.__scores.get(userId)
+
+        if score == None:
+            return None
+
+        key = (-score, userId)
+        i = bisect_left(self.__maxes, key)
+        return self.__prefix(i) + bisect_left(self.__buckets[i], key) + 1
+
+    def page(self, page, pageSize):
+        """
+        One page of the leaderboard
+
+        Parameters
+        ----------
+        page : int
+            1-based page number (out of range pages show the first page)
+        pageSize : int
+            Number of entries per page
+
+        Returns
+        ----------
+        rows: [(rank, userId, score)]
+        page: int
+            The page that was actually returned
+        pages: int
+            The total number of pages
+        """
+
+        pages = max(1, (len(self.__scores) + pageSize - 1) // pageSize)
+
+        if page > pages or page < 1:
+            page = 1
+
+        return self.__slice((page - 1) * pageSize, pageSize), page, pages
+
+    def top(self, n):
+        return self.__slice(0, n)
+
+    # ---------- MARK: - Private Functions ----------
+    def __slice(self, start, count):
+        """
+        Entries [start, start + count) in rank order
+        """
+
+        rows = []
+
+        if start >= len(self.__scores):
+            return rows
+
+        i, offset = self.__locate(start)
+        rank = start + 1
+
+        while i < len(self.__buckets) and len(rows) < count:
+            for negScore, userId in self.__buckets[i][offset:offset + count - len(rows)]:
+                rows.append((rank, userId, -negScore))
+                rank += 1
+            i += 1
+            offset = 0
+
+        return rows
+
+    def __insertKey(self, key):
+        if not self.__buckets:
+            self.__buckets.append([key])
+            self.__maxes.append(key)
+            self.__buildTree()
+            return
+
+        i = bisect_left(self.__maxes, key)
+        if i == len(self.__buckets):
+            i -= 1
+
+        bucket = self.__buckets[i]
+        insort(bucket, key)
+        self.__maxes[i] = bucket[-1]
+
+        if len(bucket) > 2 * self.LOAD:
+            self.__buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self.__maxes[i:i + 1] = [self.__buckets[i][-1], self.__buckets[i + 1][-1]]
+            self.__buildTree()
+        else:
+            self.__add(i, 1)
+
+    def __removeKey(self, key):
+        i = bisect_left(self.__maxes, key)
+        bucket = self.__buckets[i]
+        del bucket[bisect_left(bucket, key)]
+
+        if bucket:
+            self.__maxes[i] = bucket[-1]
+            self.__add(i, -1)
+        else:
+            del self.__buckets[i]
+            del self.__maxes[i]
+            self.__buildTree()
+
+    def __buildTree(self):
+        """
+        Rebuild the Fenwick tree over the bucket sizes (only when buckets split or disappear)
+        """
+
+        tree = [0] * (len(self.__buckets) + 1)
+
+        for i, bucket in enumerate(self.__buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+
+        self.__tree = tree
+
+    def __add(self, i, delta):
+        i += 1
+        while i < len(self.__tree):
+            self.__tree[i] += delta
+            i += i & -i
+
+    def __prefix(self, i):
+        """
+        Number of entries in the buckets before bucket i
+        """
+
+        total = 0
+        while i > 0:
+            total += self.__tree[i]
+            i -= i & -i
+        return total
+
+    def __locate(self, index):
+        """
+        The (bucket, offset) holding the entry at position index
+        """
+
+        pos = 0
+        step = 1
+        while step * 2 < len(self.__tree):
+            step *= 2
+
+        while step > 0:
+            if pos + step < len(self.__tree) and self.__tree[pos + step] <= index:
+                pos += step
+                index -= self.__tree[pos]
+            step //= 2
+
+        return pos, index
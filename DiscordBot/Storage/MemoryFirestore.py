@@ -0,0 +1,235 @@
+import copy
+import uuid
+from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.api_core import exceptions
+from Storage.StorageBackend import StorageBackend
+
+class MemoryFirestore(StorageBackend):
+    """
+    In-process storage backend so Fire can run without Google credentials (nothing is persisted)
+
+    Only the parts of the client API that Fire uses are implemented. Writes are applied
+    immediately and every call is guarded by one lock, so it is safe to use from the
+    Fire executor threads.
+
+    Functions
+    __________
+    collection(name) -> MemoryCollection
+        Gets a top-level collection
+    get_all(references) -> iterator(MemorySnapshot)
+        Reads several documents in one call
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._documents = {}
+
+    def collection(self, name):
+        return MemoryCollection(self, (name,))
+
+    def get_all(self, references, field_paths=None):
+        for doc_ref in references:
+            yield doc_ref.get(field_paths=field_paths)
+
+
+class MemoryCollection:
+    """
+    A collection of MemoryFirestore documents
+
+    Functions
+    __________
+    document(name) -> MemoryDocumentReference
+        Gets a reference to the document with the given id
+    add(data) -> (None, MemoryDocumentReference)
+        Adds a document with a random id
+    stream() -> iterator(MemorySnapshot)
+        Iterates over every existing document in the collection
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+
+    def document(self, name=None):
+        if name == None:
+            name = uuid.uuid4().hex
+        return MemoryDocumentReference(self._client, self._path + (str(name),))
+
+    def add(self, data):
+        doc_ref = self.document()
+        doc_ref.set(data)
+        return None, doc_ref
+
+    def stream(self):
+        with self._client._lock:
+            paths = [path for path in self._client._documents
+                     if len(path) == len(self._path) + 1 and path[:-1] == self._path]
+
+        for path in sorted(paths):
+            yield MemoryDocumentReference(self._client, path).get()
+
+
+class MemoryDocumentReference:
+    """
+    A reference to a single MemoryFirestore document
+
+    Functions
+    __________
+    get(field_paths=None) -> MemorySnapshot
+        Reads the document (optionally only the given top-level fields)
+    set(data, merge=False)
+        Replaces the document, or merges data into it when merge is True
+    update(data)
+        Updates dotted field paths of an existing document
+    delete()
+        Deletes the document
+    collection(name) -> MemoryCollection
+        Gets a subcollection of the document
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    @property
+    def path(self):
+        return '/'.join(self._path)
+
+    def collection(self, name):
+        return MemoryCollection(self._client, self._path + (name,))
+
+    def get(self, field_paths=None):
+        with self._client._lock:
+            data = self._client._documents.get(self._path)
+
+            if data == None:
+                return MemorySnapshot(self, None)
+            if field_paths != None:
+                data = {key: data[key] for key in _fieldNames(field_paths) if key in data}
+
+            return MemorySnapshot(self, copy.deepcopy(data))
+
+    def set(self, data, merge=False):
+        with self._client._lock:
+            current = self._client._documents.get(self._path)
+
+            if merge and current != None:
+                _merge(current, data)
+            else:
+                current = {}
+                _merge(current, data)
+                self._client._documents[self._path] = current
+            self._client._touch(self.path)
+
+    def update(self, data):
+        with self._client._lock:
+            current = self._client._documents.get(self._path)
+
+            if current == None:
+                raise exceptions.NotFound('No document to update: ' + '/'.join(self._path))
+
+            _update(current, data)
+            self._client._touch(self.path)
+
+    def delete(self):
+        with self._client._lock:
+            self._client._documents.pop(self._path, None)
+            self._client._touch(self.path)
+
+
+class MemorySnapshot:
+    """
+    The result of MemoryDocumentReference.get()
+
+    Functions
+    __________
+    to_dict() -> dict
+        The document data (None if the document does not exist)
+    """
+
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data != None
+
+    def to_dict(self):
+        return self._data
+
+
+# ---------- MARK: - Private Functions ----------
+def _merge(target, data):
+    """
+    Deep merge data into target, applying firestore transforms on the way
+    """
+
+    for key, value in data.items():
+        if isinstance(value, dict) and value:
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            _merge(target[key], value)
+        else:
+            _assign(target, key, value)
+
+
+def _update(target, data):
+    """
+    Apply an update() to target: the keys are dotted field paths, the values may be transforms
+    """
+
+    for key, value in data.items():
+        parts = _fieldPathParts(key)
+        parent = target
+        for part in parts[:-1]:
+            if not isinstance(parent.get(part), dict):
+                parent[part] = {}
+            parent = parent[part]
+        _assign(parent, parts[-1], value)
+
+
+def _fieldPathParts(key):
+    """
+    The parts of a field path given to update() ('a.`b c`' or a FieldPath)
+    """
+
+    return key.parts if isinstance(key, FieldPath) else FieldPath.from_api_repr(key).parts
+
+
+def _fieldNames(field_paths):
+    """
+    The top-level field names read by get(field_paths=...) ('numBets' or '`1234`')
+    """
+
+    return [_fieldPathParts(path)[0] for path in field_paths]
+
+
+def _assign(target, key, value):
+    """
+    Set a single field, applying firestore transforms (Increment, ArrayUnion, DELETE_FIELD)
+    """
+
+    if value is firestore.DELETE_FIELD:
+        target.pop(key, None)
+    elif isinstance(value, firestore.Increment):
+        current = target.get(key)
+        if not isinstance(current, (int, float)):
+            current = 0
+        target[key] = current + value.value
+    elif isinstance(value, firestore.ArrayUnion):
+        current = list(target.get(key) or [])
+        target[key] = current + [item for item in value.values if item not in current]
+    elif isinstance(value, firestore.ArrayRemove):
+        target[key] = [item for item in (target.get(key) or []) if item not in value.values]
+    else:
+        target[key] = copy.deepcopy(value)
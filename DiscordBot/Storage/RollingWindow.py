@@ -0,0 +1,103 @@
+import datetime as dt
+from Storage.LeaderboardIndex import LeaderboardIndex
+
+class RollingWindow:
+    """
+    Running per-member sum of the last numDays days, ranked like a leaderboard
+
+    The tick adds minutes to the newest day; when a new day starts, the day that falls
+    out of the window is subtracted again, so the sum never has to be rebuilt from history
+
+    Attributes
+    __________
+    numDays (int): Length of the window in days
+    lastDay (str): The '%Y-%m-%d' day at the end of the window
+    leaderboard (LeaderboardIndex obj): Members ranked by their sum over the window
+
+    Functions
+    __________
+    add(dayKey, userId, minutes)
+        Adds minutes for the user on a day inside (or after) the window
+    advance(dayKey)
+        Moves the end of the window to dayKey and drops the days that fall out
+    firstDay() -> str
+        The '%Y-%m-%d' day at the start of the window
+    """
+
+    def __init__(self, numDays, lastDay, days):
+        """
+        Parameters
+        ----------
+        numDays : int
+            Length of the window in days
+        lastDay : str
+            The '%Y-%m-%d' day at the end of the window
+        days : dict: { dayKey: { discord.member.id(str): int } }
+            The stored times for the days inside the window
+        """
+
+        self.numDays = numDays
+        self.lastDay = lastDay
+        self.__firstDay = windowDays(lastDay, numDays)[-1]
+        self.__days = {}
+        self.__sums = {}
+
+        for dayKey, users in days.items():
+            if self.__firstDay <= dayKey <= lastDay:
+                self.__days[dayKey] = dict(users)
+                for userId, minutes in users.items():
+                    self.__sums[userId] = self.__sums.get(userId, 0) + int(minutes)
+
+        self.leaderboard = LeaderboardIndex(self.__sums)
+
+    def firstDay(self):
+        return self.__firstDay
+
+    def add(self, dayKey, userId, minutes):
+        if dayKey > self.lastDay:
+            self.advance(dayKey)
+        elif dayKey < self.__firstDay:
+            return
+
+        day = self.__days.setdefault(dayKey, {})
+        day[userId] = day.get(userId, 0) + minutes
+
+        self.__sums[userId] = self.__sums.get(userId, 0) + minutes
+        self.leaderboard.set(userId, self.__sums[userId])
+
+    def advance(self, dayKey):
+        if dayKey <= self.lastDay:
+            return
+
+        self.lastDay = dayKey
+        self.__firstDay = windowDays(dayKey, self.numDays)[-1]
+
+        for expired in [key for key in self.__days if key < self.__firstDay]:
+            for userId, minutes in self.__days.pop(expired).items():
+                self.__sums[userId] -= int(minutes)
+
+                if self.__sums[userId] <= 0:
+                    del self.__sums[userId]
+                    self.leaderboard.remove(userId)
+                else:
+                    self.leaderboard.set(userId, self.__sums[userId])
+
+
+def windowDays(lastDay, numDays):
+    """
+    The day keys of a window, newest first
+
+    Parameters
+    ----------
+    lastDay : str
+        The '%Y-%m-%d' day at the end of the window
+    numDays : int
+        Length of the window in days
+
+    Returns
+    ----------
+    list(str)
+    """
+
+    end = dt.date.fromisoformat(lastDay)
+    return [(end - dt.timedelta(days=i)).isoformat() for i in range(numDays)]
@@ -0,0 +1,49 @@
+import heapq
+
+def parimutuelPayouts(acceptedBy, options, winningOption):
+    """
+    Splits a bet's pool between the members who bet on the winning option
+
+    Every winner gets their share of the pool in proportion to their amount, computed
+    with integers only: first the rounded-down share, then the points lost to rounding
+    (fewer than the number of winners) go one each to the winners with the largest
+    remainders, ties broken by the lower user id. So the whole pool is paid out, and the
+    same bet always pays out the same way.
+
+    Parameters
+    ----------
+    acceptedBy : dict: { discord.member.id(str): { 'betOption': str, 'amount': int } }
+        The members' bets
+    options : dict: { betOption(str): int }
+        The total amount bet on every option (the pool is their sum)
+    winningOption : str
+        The option that won
+
+    Returns
+    ----------
+    dict: { discord.member.id(str): int } the points every winner gets (empty if nobody won)
+    """
+
+    pool = sum(int(amount) for amount in options.values())
+    userIds = []
+    amounts = []
+
+    for userId, userBet in acceptedBy.items():
+        if userBet['betOption'] == winningOption and int(userBet['amount']) > 0:
+            userIds.append(str(userId))
+            amounts.append(int(userBet['amount']))
+
+    stake = sum(amounts)
+    if stake == 0:
+        return {}
+
+    shares = [divmod(amount * pool, stake) for amount in amounts]
+    payouts = {userId: share for userId, (share, _) in zip(userIds, shares)}
+
+    leftover = pool - sum(payouts.values())
+    if leftover > 0:
+        largest = heapq.nsmallest(leftover, range(len(userIds)), key=lambda i: (-shares[i][1], int(userIds[i])))
+        for i in largest:
+            payouts[userIds[i]] += 1
+
+    return payouts
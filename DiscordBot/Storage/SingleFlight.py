@@ -0,0 +1,75 @@
+import asyncio
+import copy
+
+class SingleFlight:
+    """
+    Lets concurrent callers asking for the same thing share one call and its result
+
+    The first caller for a key starts the call; everyone who asks for the same key while it
+    is still running waits for that call instead of starting their own. The key is
+    forgotten as soon as the call finishes, so later callers always get fresh data.
+
+    Functions
+    __________
+    async do(key, func, copyResult) -> result of func()
+        Runs func() unless a call for key is already in flight, then waits for that one
+    forget(key)
+        Lets the next caller for key start a new call even if one is still in flight
+    """
+
+    def __init__(self):
+        self.__calls = {}
+
+    async def do(self, key, func, copyResult=True):
+        """
+        Runs func() unless a call for key is already in flight, then waits for that one
+
+        Parameters
+        ----------
+        key : hashable
+            Identifies the call, e.g. ('read', document path)
+        func : coroutine function
+            Called without arguments
+        copyResult : bool
+            Give callers that joined a running call a deep copy of the result, so nobody
+            can change the dict another caller is using (False to share the object)
+
+        Returns
+        ----------
+        The result of func() (exceptions are raised for every caller)
+        """
+
+        future = self.__calls.get(key)
+
+        if future != None:
+            result = await asyncio.shield(future)
+            return copy.deepcopy(result) if copyResult else result
+
+        future = asyncio.ensure_future(func())
+        self.__calls[key] = future
+        future.add_done_callback(lambda done: self.__forget(key, done))
+
+        # A cancelled caller must not cancel the call the others are waiting for
+        return await asyncio.shield(future)
+
+    def forget(self, key):
+        """
+        Lets the next caller for key start a new call even if one is still in flight
+
+        Used after a write, so reads that come after it never get the result of a read
+        that started before it (the callers already waiting still get that result)
+
+        Parameters
+        ----------
+        key : hashable
+        """
+
+        self.__calls.pop(key, None)
+
+    def __forget(self, key, future):
+        if self.__calls.get(key) is future:
+            del self.__calls[key]
+
+        # Retrieve the exception so it is not reported as never retrieved when nobody waited
+        if not future.cancelled():
+            future.exception()
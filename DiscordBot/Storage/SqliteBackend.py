@@ -0,0 +1,462 @@
+import json
+import sqlite3
+import uuid
+from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.api_core import exceptions
+from Storage.StorageBackend import StorageBackend
+from Storage.MemoryFirestore import MemorySnapshot, _merge, _update, _assign, _fieldPathParts, _fieldNames
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS totals (
+    guild TEXT NOT NULL, user TEXT NOT NULL, minutes INTEGER NOT NULL,
+    PRIMARY KEY (guild, user)
+);
+CREATE TABLE IF NOT EXISTS day_times (
+    guild TEXT NOT NULL, day TEXT NOT NULL, user TEXT NOT NULL, minutes INTEGER NOT NULL,
+    PRIMARY KEY (guild, day, user)
+);
+CREATE TABLE IF NOT EXISTS points (
+    guild TEXT NOT NULL, user TEXT NOT NULL, points INTEGER NOT NULL,
+    PRIMARY KEY (guild, user)
+);
+CREATE TABLE IF NOT EXISTS rewards (
+    guild TEXT NOT NULL, title TEXT NOT NULL, cost INTEGER NOT NULL,
+    PRIMARY KEY (guild, title)
+);
+CREATE TABLE IF NOT EXISTS bets (
+    guild TEXT NOT NULL, collection TEXT NOT NULL, bet_id TEXT NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (guild, collection, bet_id)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY, data TEXT NOT NULL
+);
+'''
+
+# Returned by the tables for a field that has no row
+_MISSING = object()
+
+class SqliteBackend(StorageBackend):
+    """
+    Storage backend in an embedded SQLite database file, for small deployments and offline profiling
+
+    The documents Fire keeps per member are stored as tables with one row per member
+    (*total*, the day documents, *discordPoints*) and *rewards* has a row per reward.
+    Increments are applied with an upsert, so a tick never reads the document it adds
+    to. The bet documents (bets/active/{id} and bets/archive/{id}) are rows of the bets
+    table, the bet as JSON. Bets are only ever read by id (lookups by creator and status
+    go through Fire's in-memory BetIndex), so the table has no other indexes. Every other
+    document is kept as JSON in the documents table.
+
+    A document that is stored as rows exists while it has at least one row. All calls
+    share one connection behind a lock, each write (and each commit of transaction())
+    runs in its own SQLite transaction.
+
+    Attributes
+    __________
+    path (str): The database file (':memory:' for a database that is not saved)
+
+    Functions
+    __________
+    collection(name) -> SqliteCollection
+        Gets a top-level collection
+    get_all(references) -> iterator(MemorySnapshot)
+        Reads several documents in one call
+    close()
+        Closes the database
+    """
+
+    def __init__(self, path='kirbec.sqlite3'):
+        super().__init__()
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+        if path != ':memory:':
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+
+        self._tables = {
+            'total': _FieldDocuments(_FieldTable('totals', ('guild',), 'user', 'minutes'), prefix='users'),
+            'discordPoints': _FieldDocuments(_FieldTable('points', ('guild',), 'user', 'points')),
+            'rewards': _FieldDocuments(_FieldTable('rewards', ('guild',), 'title', 'cost')),
+        }
+        self._days = _FieldDocuments(_FieldTable('day_times', ('guild', 'day'), 'user', 'minutes'))
+        self._bets = _JsonDocuments('bets', ('guild', 'collection', 'bet_id'))
+        self._documents = _JsonDocuments('documents', ('path',))
+
+    def collection(self, name):
+        return SqliteCollection(self, (name,))
+
+    def get_all(self, references, field_paths=None):
+        with self._lock:
+            snapshots = [doc_ref.get(field_paths=field_paths) for doc_ref in references]
+
+        for snapshot in snapshots:
+            yield snapshot
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    # ---------- MARK: - Private Functions ----------
+    def _commit(self, writes):
+        """
+        Apply the writes of a transaction() in one SQLite transaction, so either all or none land
+        """
+
+        with self._connection as connection:
+            for kind, doc_ref, data, merge in writes:
+                documents, keys = self._route(doc_ref._path)
+
+                if kind == 'set':
+                    documents.set(connection, keys, data, merge)
+                elif kind == 'delete':
+                    documents.delete(connection, keys)
+                elif documents.exists(connection, keys):
+                    documents.update(connection, keys, data)
+                else:
+                    raise exceptions.NotFound('No document to update: ' + doc_ref.path)
+
+        for kind, doc_ref, data, merge in writes:
+            self._touch(doc_ref.path)
+
+    def _route(self, path):
+        """
+        The storage of the document at path
+
+        Returns
+        ----------
+        (documents, keys): the _FieldDocuments / _JsonDocuments and the values of its key columns
+        """
+
+        if len(path) == 2 and path[1] in self._tables:
+            return self._tables[path[1]], (path[0],)
+        if len(path) == 4 and path[1:3] == ('dayIndex', 'days'):
+            return self._days, (path[0], path[3])
+        if len(path) == 4 and path[1] == 'bets' and path[2] in ('active', 'archive'):
+            return self._bets, (path[0], path[2], path[3])
+
+        return self._documents, ('/'.join(path),)
+
+    def _documentIds(self, path):
+        """
+        Ids of the existing documents in the collection at path
+        """
+
+        connection = self._connection
+
+        if len(path) == 3 and path[1:] == ('dayIndex', 'days'):
+            rows = connection.execute('SELECT DISTINCT day FROM day_times WHERE guild = ?', (path[0],))
+            return [row[0] for row in rows]
+        if len(path) == 3 and path[1] == 'bets' and path[2] in ('active', 'archive'):
+            rows = connection.execute('SELECT bet_id FROM bets WHERE guild = ? AND collection = ?', (path[0], path[2]))
+            return sorted((row[0] for row in rows), key=lambda betId: (len(betId), betId))
+
+        prefix = '/'.join(path) + '/'
+        rows = connection.execute("SELECT path FROM documents WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+        ids = [row[0][len(prefix):] for row in rows if not '/' in row[0][len(prefix):]]
+
+        if len(path) == 1:
+            ids += [name for name, documents in self._tables.items() if documents.exists(connection, (path[0],))]
+
+        return sorted(ids)
+
+
+class SqliteCollection:
+    """
+    A collection of SqliteBackend documents
+
+    Functions
+    __________
+    document(name) -> SqliteDocumentReference
+        Gets a reference to the document with the given id
+    add(data) -> (None, SqliteDocumentReference)
+        Adds a document with a random id
+    stream() -> iterator(MemorySnapshot)
+        Iterates over every existing document in the collection
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+
+    def document(self, name=None):
+        if name == None:
+            name = uuid.uuid4().hex
+        return SqliteDocumentReference(self._client, self._path + (str(name),))
+
+    def add(self, data):
+        doc_ref = self.document()
+        doc_ref.set(data)
+        return None, doc_ref
+
+    def stream(self):
+        with self._client._lock:
+            snapshots = [self.document(name).get() for name in self._client._documentIds(self._path)]
+
+        for snapshot in snapshots:
+            yield snapshot
+
+
+class SqliteDocumentReference:
+    """
+    A reference to a single SqliteBackend document
+
+    Functions
+    __________
+    get(field_paths=None) -> MemorySnapshot
+        Reads the document (optionally only the given top-level fields)
+    set(data, merge=False)
+        Replaces the document, or merges data into it when merge is True
+    update(data)
+        Updates dotted field paths of an existing document
+    delete()
+        Deletes the document
+    collection(name) -> SqliteCollection
+        Gets a subcollection of the document
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    @property
+    def path(self):
+        return '/'.join(self._path)
+
+    def collection(self, name):
+        return SqliteCollection(self._client, self._path + (name,))
+
+    def get(self, field_paths=None):
+        documents, keys = self._client._route(self._path)
+
+        with self._client._lock:
+            return MemorySnapshot(self, documents.get(self._client._connection, keys, field_paths))
+
+    def set(self, data, merge=False):
+        documents, keys = self._client._route(self._path)
+
+        with self._client._lock, self._client._connection as connection:
+            documents.set(connection, keys, data, merge)
+            self._client._touch(self.path)
+
+    def update(self, data):
+        documents, keys = self._client._route(self._path)
+
+        with self._client._lock, self._client._connection as connection:
+            if not documents.exists(connection, keys):
+                raise exceptions.NotFound('No document to update: ' + self.path)
+            documents.update(connection, keys, data)
+            self._client._touch(self.path)
+
+    def delete(self):
+        documents, keys = self._client._route(self._path)
+
+        with self._client._lock, self._client._connection as connection:
+            documents.delete(connection, keys)
+            self._client._touch(self.path)
+
+
+# ---------- MARK: - Tables ----------
+class _FieldTable:
+    """
+    Rows of (document key columns, field, value): one row per top-level field of a document
+    """
+
+    def __init__(self, table, documentColumns, fieldColumn, valueColumn):
+        where = ' AND '.join(column + ' = ?' for column in documentColumns)
+        columns = ', '.join(documentColumns + (fieldColumn, valueColumn))
+        conflict = ', '.join(documentColumns + (fieldColumn,))
+        values = ', '.join('?' * (len(documentColumns) + 2))
+
+        self.__exists = 'SELECT 1 FROM {0} WHERE {1} LIMIT 1'.format(table, where)
+        self.__fields = 'SELECT {0}, {1} FROM {2} WHERE {3}'.format(fieldColumn, valueColumn, table, where)
+        self.__load = 'SELECT {0} FROM {1} WHERE {2} AND {3} = ?'.format(valueColumn, table, where, fieldColumn)
+        self.__save = 'INSERT INTO {0} ({1}) VALUES ({2}) ON CONFLICT ({3}) DO UPDATE SET {4} = excluded.{4}'.format(
+            table, columns, values, conflict, valueColumn)
+        self.__increment = 'INSERT INTO {0} ({1}) VALUES ({2}) ON CONFLICT ({3}) DO UPDATE SET {4} = {4} + excluded.{4}'.format(
+            table, columns, values, conflict, valueColumn)
+        self.__delete = 'DELETE FROM {0} WHERE {1} AND {2} = ?'.format(table, where, fieldColumn)
+        self.__clear = 'DELETE FROM {0} WHERE {1}'.format(table, where)
+
+    def exists(self, connection, keys):
+        return connection.execute(self.__exists, keys).fetchone() != None
+
+    def fields(self, connection, keys):
+        return dict(connection.execute(self.__fields, keys).fetchall())
+
+    def load(self, connection, keys, field):
+        row = connection.execute(self.__load, keys + (field,)).fetchone()
+        return row[0] if row != None else _MISSING
+
+    def save(self, connection, keys, field, value):
+        connection.execute(self.__save, keys + (field, value))
+
+    def increment(self, connection, keys, field, amount):
+        """
+        Add amount in SQL without reading the row
+        """
+
+        connection.execute(self.__increment, keys + (field, amount))
+
+    def delete(self, connection, keys, field):
+        connection.execute(self.__delete, keys + (field,))
+
+    def clear(self, connection, keys):
+        connection.execute(self.__clear, keys)
+
+
+class _FieldDocuments:
+    """
+    The document operations (get / set / update / delete) on top of a _FieldTable
+
+    With a prefix the document is { prefix: { field: value } } (e.g. *total* is { 'users': {...} })
+    """
+
+    def __init__(self, table, prefix=None):
+        self.table = table
+        self.prefix = prefix
+
+    def exists(self, connection, keys):
+        return self.table.exists(connection, keys)
+
+    def get(self, connection, keys, field_paths=None):
+        if not self.table.exists(connection, keys):
+            return None
+
+        if self.prefix != None:
+            if field_paths != None and not self.prefix in _fieldNames(field_paths):
+                return {}
+            return {self.prefix: self.table.fields(connection, keys)}
+
+        if field_paths == None:
+            return self.table.fields(connection, keys)
+
+        data = {}
+        for field in _fieldNames(field_paths):
+            value = self.table.load(connection, keys, field)
+            if value is not _MISSING:
+                data[field] = value
+        return data
+
+    def set(self, connection, keys, data, merge=False):
+        if not merge:
+            self.table.clear(connection, keys)
+
+        for field, value in self.__unwrap(data).items():
+            self.__write(connection, keys, field, value, _merge)
+
+    def update(self, connection, keys, data):
+        for path, value in data.items():
+            parts = _fieldPathParts(path)
+
+            if self.prefix != None:
+                if parts[0] != self.prefix:
+                    raise ValueError('Unknown field ' + parts[0])
+                if len(parts) == 1:
+                    self.set(connection, keys, {self.prefix: value})
+                    continue
+                parts = parts[1:]
+
+            if len(parts) == 1:
+                self.__write(connection, keys, parts[0], value, _assignField)
+            else:
+                current = self.table.load(connection, keys, parts[0])
+                container = {parts[0]: current} if current is not _MISSING else {}
+                _update(container, {FieldPath(*parts): value})
+                self.table.save(connection, keys, parts[0], container[parts[0]])
+
+    def delete(self, connection, keys):
+        self.table.clear(connection, keys)
+
+    def __unwrap(self, data):
+        if self.prefix == None:
+            return data
+
+        unknown = [key for key in data if key != self.prefix]
+        if unknown:
+            raise ValueError('Unknown fields ' + ', '.join(unknown))
+
+        return data.get(self.prefix) or {}
+
+    def __write(self, connection, keys, field, value, apply):
+        """
+        Write one top-level field; apply is _merge for set() and _assignField for update()
+        """
+
+        if value is firestore.DELETE_FIELD:
+            self.table.delete(connection, keys, field)
+            return
+        if isinstance(value, firestore.Increment):
+            self.table.increment(connection, keys, field, value.value)
+            return
+        if not isinstance(value, (dict, firestore.Increment, firestore.ArrayUnion, firestore.ArrayRemove)):
+            self.table.save(connection, keys, field, value)
+            return
+
+        current = self.table.load(connection, keys, field)
+        container = {field: current} if current is not _MISSING else {}
+        apply(container, {field: value})
+
+        if field in container:
+            self.table.save(connection, keys, field, container[field])
+        else:
+            self.table.delete(connection, keys, field)
+
+
+class _JsonDocuments:
+    """
+    Whole documents as JSON, one row per document (the documents table holds every document without a table of its own)
+    """
+
+    def __init__(self, table, keyColumns):
+        where = ' AND '.join(column + ' = ?' for column in keyColumns)
+        columns = keyColumns + ('data',)
+
+        self.__get = 'SELECT data FROM {0} WHERE {1}'.format(table, where)
+        self.__upsert = 'INSERT INTO {0} ({1}) VALUES ({2}) ON CONFLICT ({3}) DO UPDATE SET data = excluded.data'.format(
+            table, ', '.join(columns), ', '.join('?' * len(columns)), ', '.join(keyColumns))
+        self.__delete = 'DELETE FROM {0} WHERE {1}'.format(table, where)
+
+    def exists(self, connection, keys):
+        return self.get(connection, keys) != None
+
+    def get(self, connection, keys, field_paths=None):
+        row = connection.execute(self.__get, keys).fetchone()
+
+        if row == None:
+            return None
+
+        data = json.loads(row[0])
+        if field_paths != None:
+            data = {key: data[key] for key in _fieldNames(field_paths) if key in data}
+
+        return data
+
+    def set(self, connection, keys, data, merge=False):
+        current = (self.get(connection, keys) if merge else None) or {}
+        _merge(current, data)
+        self.__save(connection, keys, current)
+
+    def update(self, connection, keys, data):
+        current = self.get(connection, keys)
+        _update(current, data)
+        self.__save(connection, keys, current)
+
+    def delete(self, connection, keys):
+        connection.execute(self.__delete, keys)
+
+    def __save(self, connection, keys, data):
+        connection.execute(self.__upsert, keys + (json.dumps(data, default=str),))
+
+
+# ---------- MARK: - Private Functions ----------
+def _assignField(container, data):
+    for key, value in data.items():
+        _assign(container, key, value)
+
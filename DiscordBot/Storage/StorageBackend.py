@@ -0,0 +1,199 @@
+import os
+import random
+import threading
+import time
+from google.api_core import exceptions
+
+class StorageBackend:
+    """
+    The storage Fire reads and writes its documents through
+
+    The interface is the part of the firestore client API that Fire uses: documents are
+    addressed as collection(name).document(name)[.collection(name).document(name)...] and
+    written with set(data, merge) / update(data), where the values may be firestore
+    transforms (Increment, ArrayUnion, ArrayRemove, DELETE_FIELD). Every call blocks, so
+    Fire runs them on its executor; implementations have to be safe to call from
+    several threads.
+
+    transaction() is optimistic: the reads remember the version of every document they
+    saw, the writes are kept back, and at commit the writes are only applied if none
+    of those documents changed in the meantime (otherwise the function runs again).
+    The versions live in this object, which is enough because every guild is handled
+    by exactly one process.
+
+    Implementations: FirestoreBackend (Google Firestore), SqliteBackend (an embedded
+    database file) and MemoryFirestore (in-process, nothing is persisted)
+
+    Attributes
+    __________
+    retryDelay (float): Seconds of the first wait before a conflicting transaction runs again
+
+    Functions
+    __________
+    collection(name) -> collection reference
+        Gets a top-level collection
+    get_all(references) -> iterator(snapshot)
+        Reads several documents in one call
+    transaction(func, maxAttempts) -> result of func(transaction)
+        Runs func as an optimistic transaction, retried when a document it read changed
+    close()
+        Releases the connection (the backend is not used afterwards)
+    """
+
+    retryDelay = 0.005
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # { document path: number of writes }
+        self._versions = {}
+
+    def collection(self, name):
+        raise NotImplementedError
+
+    def get_all(self, references, field_paths=None):
+        raise NotImplementedError
+
+    def transaction(self, func, maxAttempts=5):
+        """
+        Runs func(transaction) as an optimistic transaction
+
+        Parameters
+        ----------
+        func : callable
+            Called with a Transaction; it has to do all of its reads before its first write and
+            may run several times, so it must not change anything outside of the transaction
+        maxAttempts : int
+            Number of times func runs before giving up (with a random, doubling wait in between
+            so the transactions that conflicted do not collide again)
+
+        Returns
+        ----------
+        The return value of func (exceptions from func abort the transaction without writing)
+        """
+
+        for attempt in range(maxAttempts):
+            if attempt > 0:
+                time.sleep(random.uniform(0, self.retryDelay * 2 ** attempt))
+
+            transaction = Transaction(self)
+            result = func(transaction)
+
+            with self._lock:
+                if all(self._versions.get(path, 0) == version for path, version in transaction.versions.items()):
+                    self._commit(transaction.writes)
+                    return result
+
+        raise exceptions.Aborted('Transaction still conflicting after {0} attempts'.format(maxAttempts))
+
+    def close(self):
+        pass
+
+    # ---------- MARK: - Private Functions ----------
+    def _touch(self, path):
+        """
+        Count a write to the document at path (called by the references, with _lock held)
+        """
+
+        self._versions[path] = self._versions.get(path, 0) + 1
+
+    def _commit(self, writes):
+        """
+        Apply the writes of a transaction (called with _lock held)
+        """
+
+        written = set()
+        for kind, doc_ref, data, merge in writes:
+            if kind == 'update' and not doc_ref.path in written and not doc_ref.get().exists:
+                raise exceptions.NotFound('No document to update: ' + doc_ref.path)
+            written.add(doc_ref.path)
+
+        for kind, doc_ref, data, merge in writes:
+            if kind == 'set':
+                doc_ref.set(data, merge=merge)
+            elif kind == 'delete':
+                doc_ref.delete()
+            else:
+                doc_ref.update(data)
+
+
+class Transaction:
+    """
+    The reads and the pending writes of one attempt of StorageBackend.transaction()
+
+    Attributes
+    __________
+    snapshots (list): Every snapshot read by the attempt
+    writes (list): The writes to apply at commit, as (kind('set', 'update' or 'delete'), doc_ref, data, merge)
+    versions (dict): { document path: version when it was read }
+
+    Functions
+    __________
+    get(doc_ref, field_paths) -> snapshot
+        Reads a document (all reads have to come before the first write)
+    set(doc_ref, data, merge)
+        Replaces (or merges data into) the document at commit
+    update(doc_ref, data)
+        Updates dotted field paths of the document at commit
+    delete(doc_ref)
+        Deletes the document at commit
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.snapshots = []
+        self.writes = []
+        self.versions = {}
+
+    def get(self, doc_ref, field_paths=None):
+        if self.writes:
+            raise ValueError('A transaction has to do all of its reads before its first write')
+
+        snapshot = self._read(doc_ref, field_paths)
+        self.snapshots.append(snapshot)
+
+        return snapshot
+
+    def set(self, doc_ref, data, merge=False):
+        self.writes.append(('set', doc_ref, data, merge))
+
+    def update(self, doc_ref, data):
+        self.writes.append(('update', doc_ref, data, None))
+
+    def delete(self, doc_ref):
+        self.writes.append(('delete', doc_ref, None, None))
+
+    def _read(self, doc_ref, field_paths):
+        with self._backend._lock:
+            self.versions.setdefault(doc_ref.path, self._backend._versions.get(doc_ref.path, 0))
+            return doc_ref.get(field_paths=field_paths)
+
+
+def createBackend(name=None):
+    """
+    Creates the storage backend selected by name or the FIRE_BACKEND environment variable
+
+    Parameters
+    ----------
+    name : str (optional)
+        'firestore' (default), 'sqlite' or 'memory'; the sqlite file is FIRE_SQLITE_PATH
+        (default kirbec.sqlite3 in the working directory)
+
+    Returns
+    ----------
+    StorageBackend
+    """
+
+    if name == None:
+        name = os.getenv('FIRE_BACKEND', 'firestore')
+
+    if name == 'firestore':
+        from Storage.FirestoreBackend import FirestoreBackend
+        return FirestoreBackend()
+    elif name == 'sqlite':
+        from Storage.SqliteBackend import SqliteBackend
+        return SqliteBackend(os.getenv('FIRE_SQLITE_PATH', 'kirbec.sqlite3'))
+    elif name == 'memory':
+        from Storage.MemoryFirestore import MemoryFirestore
+        return MemoryFirestore()
+
+    raise ValueError('Unknown storage backend: ' + name)
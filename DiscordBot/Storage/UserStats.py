@@ -0,0 +1,154 @@
+import datetime as dt
+
+class UserStats:
+    """
+    Helpers for the per-user stats records kept in the *userStats* shard documents
+
+    A record is a plain dict so it can be stored as-is:
+    { total: int, today: int, todayDate: str, maxDay: int, maxDate: str, streak: int, lastSeen: str }
+    where the dates are '%Y-%m-%d' day keys and lastSeen is an ISO timestamp
+
+    The records are spread over userStats/shards/{shard} by member id, so no document
+    grows with the guild (a record is roughly 120 bytes, a single document would pass
+    Firestore's 1 MiB limit at about 8000 members). The *userStats* document only holds
+    the number of shards, a power of two that doubles once the guild outgrows it.
+
+    Attributes
+    __________
+    membersPerShard (int): Records per shard (on average) at which the number of shards doubles
+
+    Functions
+    __________
+    new() -> dict
+        An empty record
+    addMinutes(record, dayKey, minutes, lastSeen)
+        Adds minutes logged on dayKey to the record
+    fromHistory(total, days) -> dict
+        Builds a record from a total and the member's times per day
+    currentStreak(record, dayKey) -> int
+        The streak that is still alive on dayKey
+    shardCount(records) -> int
+        The number of shards for a guild with that many records
+    shardName(userId, shards) -> str
+        The shard document a member's record is kept in
+    shardNames(shards) -> list(str)
+        All shard documents
+    """
+
+    membersPerShard = 2000
+
+    @staticmethod
+    def new():
+        return {
+            'total': 0,
+            'today': 0,
+            'todayDate': '',
+            'maxDay': 0,
+            'maxDate': '',
+            'streak': 0,
+            'lastSeen': '',
+        }
+
+    @staticmethod
+    def addMinutes(record, dayKey, minutes, lastSeen):
+        """
+        Adds minutes logged on dayKey to the record
+
+        Parameters
+        ----------
+        record : dict
+            The record to update in place
+        dayKey : str
+            The '%Y-%m-%d' day the minutes belong to
+        minutes : int
+        lastSeen : str
+            ISO timestamp of when the minutes were logged
+        """
+
+        if record['todayDate'] != dayKey:
+            if record['todayDate'] == _previousDay(dayKey):
+                record['streak'] += 1
+            else:
+                record['streak'] = 1
+            record['todayDate'] = dayKey
+            record['today'] = 0
+
+        record['today'] += minutes
+        record['total'] += minutes
+        record['lastSeen'] = lastSeen
+
+        if record['today'] > record['maxDay']:
+            record['maxDay'] = record['today']
+            record['maxDate'] = dayKey
+
+    @staticmethod
+    def fromHistory(total, days):
+        """
+        Builds a record from a total and the member's times per day (used once per guild)
+
+        Parameters
+        ----------
+        total : int
+            The member's total time
+        days : dict: { dayKey: int }
+            The member's time on every day they were logged
+
+        Returns
+        ----------
+        dict
+        """
+
+        record = UserStats.new()
+
+        for dayKey in sorted(days):
+            UserStats.addMinutes(record, dayKey, int(days[dayKey]), '')
+
+        record['total'] = int(total)
+        if record['todayDate'] != '':
+            record['lastSeen'] = record['todayDate']
+
+        return record
+
+    @staticmethod
+    def currentStreak(record, dayKey):
+        """
+        The streak that is still alive on dayKey (a streak survives until a full day is missed)
+
+        Returns
+        ----------
+        int
+        """
+
+        if record['todayDate'] in (dayKey, _previousDay(dayKey)):
+            return record['streak']
+
+        return 0
+
+
+    @staticmethod
+    def shardCount(records):
+        """
+        The number of shards for a guild with that many records (new shards are half full)
+
+        Returns
+        ----------
+        int
+        """
+
+        shards = 1
+        while records > shards * UserStats.membersPerShard // 2:
+            shards *= 2
+
+        return shards
+
+    @staticmethod
+    def shardName(userId, shards):
+        return '{0}of{1}'.format(int(userId) % shards, shards)
+
+    @staticmethod
+    def shardNames(shards):
+        return ['{0}of{1}'.format(shard, shards) for shard in range(shards)]
+
+
+def _previousDay(dayKey):
+    return (dt.date.fromisoformat(dayKey) - dt.timedelta(days=1)).isoformat()
@@ -0,0 +1,139 @@
+import asyncio
+import time
+import zlib
+
+class TickScheduler:
+    """
+    Runs a callback for every guild once per interval on the monotonic clock
+
+    Tick n starts at start + n * interval no matter how long earlier ticks took, so the
+    cadence does not drift. Inside a tick every guild runs at its own offset (a hash of
+    its id), which spreads the database traffic over the whole interval. When the loop
+    falls behind, the ticks that could not run are skipped and counted in missedTicks
+    (the callback works out what happened since its last call itself).
+
+    Attributes
+    __________
+    interval (float): Seconds between two ticks of the same guild
+    concurrency (int): Maximum number of guild callbacks running at the same time
+    ticks (int): Number of ticks that ran
+    missedTicks (int): Number of ticks that were skipped because the loop fell behind
+    guildTickTimes (dict: { guild.id: float }): Seconds each guild took in its last tick
+    lastTickTime (float): Seconds the last tick took from its start to its last guild
+    listeners (list): Functions called as listener(guild.id, seconds) after every guild's tick
+
+    Functions
+    __________
+    slot(guildId) -> float
+        Offset into the interval at which the guild runs
+    async run(guilds, tickGuild, afterTick, isClosed)
+        Runs ticks until isClosed() returns True
+    """
+
+    def __init__(self, interval=60, concurrency=16, clock=time.monotonic):
+        self.interval = interval
+        self.concurrency = concurrency
+        self.ticks = 0
+        self.missedTicks = 0
+        self.guildTickTimes = {}
+        self.lastTickTime = 0.0
+        self.listeners = []
+        self.__clock = clock
+
+    def slot(self, guildId):
+        """
+        Offset into the interval at which the guild runs
+
+        Parameters
+        ----------
+        guildId : int
+
+        Returns
+        ----------
+        float
+            Seconds after the start of a tick
+        """
+
+        return (zlib.crc32(str(guildId).encode()) % 1000) / 1000 * self.interval
+
+    async def run(self, guilds, tickGuild, afterTick=None, isClosed=lambda: False):
+        """
+        Runs ticks until isClosed() returns True
+
+        Parameters
+        ----------
+        guilds : function() -> list(discord.Guild)
+            The guilds to tick, asked again at the start of every tick
+        tickGuild : coroutine function(guild)
+            Called once per guild and tick
+        afterTick : coroutine function() (optional)
+            Called after every guild of a tick has finished
+        isClosed : function() -> bool
+            Stops the loop when it returns True
+        """
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = self.__clock()
+        tick = 0
+
+        while not isClosed():
+            tickStart = start + tick * self.interval
+            tasks = []
+
+            current = sorted(guilds(), key=lambda guild: self.slot(guild.id))
+
+            for guild in current:
+                await self.__sleepUntil(tickStart + self.slot(guild.id))
+                tasks.append(asyncio.ensure_future(self.__runGuild(guild, tickGuild, semaphore)))
+
+            await asyncio.gather(*tasks)
+
+            # Forget guilds the bot is no longer in
+            ids = set(guild.id for guild in current)
+            for guildId in [guildId for guildId in self.guildTickTimes if not guildId in ids]:
+                del self.guildTickTimes[guildId]
+
+            self.lastTickTime = self.__clock() - tickStart
+            self.ticks += 1
+
+            if afterTick != None:
+                try:
+                    await afterTick()
+                except Exception as e:
+                    print("ERROR: ", str(e))
+
+            # Skip the ticks whose time has already passed instead of running them back to back
+            tick += 1
+            behind = int((self.__clock() - start) // self.interval) - tick
+            if behind > 0:
+                self.missedTicks += behind
+                tick += behind
+                print("WARNING: tick loop fell behind, skipped {0} tick(s)".format(behind))
+
+            await self.__sleepUntil(start + tick * self.interval)
+
+    # ---------- MARK: - Private Functions ----------
+    async def __runGuild(self, guild, tickGuild, semaphore):
+        """
+        Calls tickGuild for one guild and records how long it took
+        """
+
+        async with semaphore:
+            begin = self.__clock()
+
+            try:
+                await tickGuild(guild)
+            except Exception as e:
+                print("ERROR: tick failed for guild " + str(guild.id) + ": ", str(e))
+
+            elapsed = self.__clock() - begin
+            self.guildTickTimes[guild.id] = elapsed
+
+            for listener in self.listeners:
+                listener(guild.id, elapsed)
+
+    async def __sleepUntil(self, deadline):
+        delay = deadline - self.__clock()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,171 @@
+import time
+
+class VoiceSessions:
+    """
+    Tracks how long every member spends in voice from the gateway voice state events
+
+    A member has an open session while they are in a voice channel and not deafened
+    (by themselves or the server) or in the AFK channel. Closing or pausing a session
+    credits the elapsed seconds to the member; the minute tick takes the whole minutes
+    that were credited and leaves the remaining seconds for the next tick, so nothing
+    depends on when the tick actually runs.
+
+    Functions
+    __________
+    update(member)
+        Opens or closes the member's session after their voice state changed
+    scanGuild(guild)
+        Reconciles the sessions of a guild with its voice channels (on ready / resume / join)
+    pauseGuild(guildId)
+        Credits and closes the open sessions of a guild while its gateway connection is down
+    takeMinutes(guildId) -> dict: { discord.member.id(str): int }
+        The whole minutes credited since the last call
+    restoreMinutes(guildId, minutes)
+        Gives minutes from takeMinutes back, e.g. when writing them failed
+    removeGuild(guildId)
+        Forgets everything about a guild
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.__clock = clock
+        # { guild.id: { discord.member.id(str): start(float) } }
+        self.__open = {}
+        # { guild.id: { discord.member.id(str): seconds(float) } }
+        self.__seconds = {}
+
+    def update(self, member):
+        """
+        Opens or closes the member's session after their voice state changed
+
+        Parameters
+        ----------
+        member : discord.Member
+            The member as it is after the change
+        """
+
+        if self.__eligible(member):
+            self.__start(member.guild.id, str(member.id))
+        else:
+            self.__stop(member.guild.id, str(member.id))
+
+    def scanGuild(self, guild):
+        """
+        Reconciles the sessions of a guild with its voice channels
+
+        Needed when the bot (re)connects, because members already in voice do not
+        send a voice state event
+
+        Parameters
+        ----------
+        guild : discord.Guild
+        """
+
+        eligible = set()
+
+        for channel in guild.voice_channels:
+            for member in channel.members:
+                if self.__eligible(member):
+                    eligible.add(str(member.id))
+                    self.__start(guild.id, str(member.id))
+
+        for memberId in [memberId for memberId in self.__open.get(guild.id, {}) if not memberId in eligible]:
+            self.__stop(guild.id, memberId)
+
+    def pauseGuild(self, guildId):
+        """
+        Credits the open sessions of a guild up to now and closes them
+
+        Voice state events are not received while the gateway connection is down, so
+        nobody can be credited for that time; scanGuild opens the sessions again for the
+        members that are still in voice once the connection is back
+
+        Parameters
+        ----------
+        guildId : int
+        """
+
+        for memberId in list(self.__open.get(guildId, {})):
+            self.__stop(guildId, memberId)
+
+    def takeMinutes(self, guildId):
+        """
+        The whole minutes credited since the last call
+
+        Open sessions are credited up to now; seconds that do not add up to a full
+        minute stay with the member
+
+        Parameters
+        ----------
+        guildId : int
+
+        Returns
+        ----------
+        dict: { discord.member.id(str): int }
+        """
+
+        now = self.__clock()
+        sessions = self.__open.get(guildId, {})
+        seconds = self.__seconds.setdefault(guildId, {})
+
+        for memberId, start in sessions.items():
+            seconds[memberId] = seconds.get(memberId, 0) + now - start
+            sessions[memberId] = now
+
+        minutes = {}
+
+        for memberId in list(seconds):
+            whole = int(seconds[memberId] // 60)
+
+            if whole > 0:
+                minutes[memberId] = whole
+                seconds[memberId] -= whole * 60
+
+            if seconds[memberId] <= 0:
+                del seconds[memberId]
+
+        return minutes
+
+    def restoreMinutes(self, guildId, minutes):
+        """
+        Gives minutes from takeMinutes back, e.g. when writing them failed
+
+        Parameters
+        ----------
+        guildId : int
+        minutes : dict: { discord.member.id(str): int }
+        """
+
+        seconds = self.__seconds.setdefault(guildId, {})
+
+        for memberId, amount in minutes.items():
+            seconds[memberId] = seconds.get(memberId, 0) + amount * 60
+
+    def removeGuild(self, guildId):
+        self.__open.pop(guildId, None)
+        self.__seconds.pop(guildId, None)
+
+    # ---------- MARK: - Private Functions ----------
+    def __eligible(self, member):
+        """
+        We do not track individuals that are deafened or afk
+        """
+
+        voice = member.voice
+
+        if voice == None or voice.channel == None:
+            return False
+
+        return not voice.self_deaf and not voice.afk and not voice.deaf
+
+    def __start(self, guildId, memberId):
+        sessions = self.__open.setdefault(guildId, {})
+
+        if not memberId in sessions:
+            sessions[memberId] = self.__clock()
+
+    def __stop(self, guildId, memberId):
+        start = self.__open.get(guildId, {}).pop(memberId, None)
+
+        if start != None:
+            seconds = self.__seconds.setdefault(guildId, {})
+            seconds[memberId] = seconds.get(memberId, 0) + self.__clock() - start
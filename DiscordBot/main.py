@@ -1,5 +1,4 @@
-import discord
-from DiscordClient import DiscordClient
+from DiscordClient import DiscordClient, defaultIntents
 import os
 
 # from dotenv import load_dotenv
@@ -9,7 +8,27 @@ import os
 # Main script to start the DiscordClient
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 
-intents = discord.Intents.default()
-intents.members = True
-client = DiscordClient(intents=intents)
-client.run(DISCORD_TOKEN)
+# Sharded mode: SHARD_COUNT shards, split over SHARD_PROCESSES worker processes
+SHARD_COUNT = os.getenv('SHARD_COUNT')
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', 1))
+
+if __name__ == '__main__':
+    if SHARD_COUNT == None:
+        client = DiscordClient(intents=defaultIntents())
+        client.run(DISCORD_TOKEN)
+    elif SHARD_PROCESSES <= 1:
+        from ShardedDiscordClient import ShardedDiscordClient
+
+        # SHARD_COUNT=auto lets Discord pick the number of shards
+        shardCount = None if SHARD_COUNT == 'auto' else int(SHARD_COUNT)
+        client = ShardedDiscordClient(intents=defaultIntents(), shard_count=shardCount)
+        client.run(DISCORD_TOKEN)
+    else:
+        from ShardSupervisor import ShardSupervisor
+
+        # The workers are given their shard ids up front, so the total has to be known
+        if not SHARD_COUNT.isdigit() or int(SHARD_COUNT) < 1:
+            raise SystemExit('SHARD_COUNT has to be a number of shards when SHARD_PROCESSES is more than 1 '
+                             '(SHARD_COUNT=auto only works with a single process), got: ' + SHARD_COUNT)
+
+        ShardSupervisor(DISCORD_TOKEN, int(SHARD_COUNT), SHARD_PROCESSES).run()